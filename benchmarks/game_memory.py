@@ -0,0 +1,103 @@
+"""Memory benchmark for the Game representation.
+
+Builds many finished-looking games with the original dataclass layout and
+with the compact Game class, and reports the bytes allocated per game.
+
+Usage:
+    python -m benchmarks.game_memory [--games N] [--attempts N]
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set, Tuple
+
+from src.core.game import Game, get_feedback
+
+
+@dataclass
+class LegacyGame:
+    """The original Game dataclass layout, kept for comparison."""
+    word_setter_username: str
+    guesser_username: str
+    word_setter_chat_id: int
+    guesser_chat_id: int
+    secret_word: str = ""
+    state: str = "waiting_for_word"
+    attempts: List[Tuple[str, str]] = field(default_factory=list)
+    max_attempts: int = 6
+    language: Optional[str] = None
+    correct_letters: Set[str] = field(default_factory=set)
+    used_letters: Set[str] = field(default_factory=set)
+
+
+RUSSIAN_LETTERS = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    """Generate a random Russian word of the given length."""
+    return "".join(rng.choice(RUSSIAN_LETTERS) for _ in range(length))
+
+
+def build_legacy(index: int, secret_word: str, guesses: List[str]) -> LegacyGame:
+    """Build a game the way the old handler code filled it in."""
+    game = LegacyGame(f"setter{index}", f"guesser{index}", index, index + 1)
+    game.secret_word = secret_word
+    game.state = "waiting_for_guess"
+    game.language = "russian"
+    for guess in guesses:
+        result, feedback, correct_letters, used_letters = get_feedback(secret_word, guess)
+        game.attempts.append((result, feedback))
+        game.correct_letters.update(correct_letters - game.used_letters)
+        game.used_letters.update(used_letters - game.correct_letters)
+    return game
+
+
+def build_compact(index: int, secret_word: str, guesses: List[str]) -> Game:
+    """Build a game with the compact representation."""
+    game = Game(f"setter{index}", f"guesser{index}", index, index + 1)
+    game.secret_word = secret_word
+    game.state = "waiting_for_guess"
+    game.language = "russian"
+    for guess in guesses:
+        game.add_attempt(guess)
+    return game
+
+
+def measure(builder: Callable, workload: List[Tuple[str, List[str]]]) -> float:
+    """Return the bytes allocated per game while building the workload."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    games = [builder(index, secret_word, guesses) for index, (secret_word, guesses) in enumerate(workload)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return (after - before) / len(workload)
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=20_000, help="number of games to build")
+    parser.add_argument('--attempts', type=int, default=6, help="attempts recorded per game")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    workload = []
+    for _ in range(args.games):
+        length = rng.randint(4, 8)
+        workload.append((random_word(rng, length), [random_word(rng, length) for _ in range(args.attempts)]))
+
+    legacy = measure(build_legacy, workload)
+    compact = measure(build_compact, workload)
+    print(f"games: {args.games}, attempts per game: {args.attempts}")
+    print(f"legacy dataclass: {legacy:,.0f} bytes/game")
+    print(f"compact Game:     {compact:,.0f} bytes/game")
+    print(f"reduction:        {1 - compact / legacy:.0%}")
+
+
+if __name__ == '__main__':
+    main()
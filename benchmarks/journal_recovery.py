@@ -0,0 +1,86 @@
+"""Recovery benchmark for the game journal.
+
+Journals many games in progress, then measures how long it takes to
+recover them by replaying the raw event journal and by loading a
+compacted snapshot.
+
+Usage:
+    python -m benchmarks.journal_recovery [--games N] [--attempts N]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.game import Game, GameRegistry
+from src.core.journal import GameJournal
+
+
+RUSSIAN_LETTERS = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    """Generate a random Russian word of the given length."""
+    return "".join(rng.choice(RUSSIAN_LETTERS) for _ in range(length))
+
+
+def journal_games(directory: Path, count: int, attempts: int) -> GameRegistry:
+    """Journal a registry of games that are waiting for guesses."""
+    rng = random.Random(0)
+    registry = GameRegistry()
+    journal = GameJournal(directory, commit_interval=0.05, compact_events=0)
+    journal.attach(registry)
+    for index in range(count):
+        game = Game(f"setter{index}", f"guesser{index}", index, index + 1)
+        key = (game.word_setter_username, game.guesser_username)
+        registry[key] = game
+        registry.record('create', game, chat_ids=[index, index + 1], max_attempts=game.max_attempts)
+        length = rng.randint(4, 8)
+        game.set_word(random_word(rng, length), 'russian')
+        for _ in range(rng.randint(0, attempts)):
+            game.add_attempt(random_word(rng, length))
+    journal.flush()
+    journal.close()
+    return registry
+
+
+def time_recovery(directory: Path, expected: GameRegistry) -> float:
+    """Recover a registry from a journal directory and return the seconds taken."""
+    registry = GameRegistry()
+    started = time.perf_counter()
+    GameJournal(directory).replay(registry)
+    elapsed = time.perf_counter() - started
+    assert len(registry) == len(expected)
+    return elapsed
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=100_000, help="number of games to recover")
+    parser.add_argument('--attempts', type=int, default=5, help="maximum attempts per game")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        registry = journal_games(directory, args.games, args.attempts)
+        events = sum(1 for path in directory.glob('events-*.jsonl') for _ in open(path, encoding='utf-8'))
+        replay_seconds = time_recovery(directory, registry)
+
+        journal = GameJournal(directory, commit_interval=0)
+        journal.replay(GameRegistry())
+        journal.attach(registry)
+        journal.compact()
+        journal.flush()
+        journal.close()
+        snapshot_seconds = time_recovery(directory, registry)
+
+    print(f"games: {args.games}, journaled events: {events}")
+    print(f"replay from journal:  {replay_seconds:.2f} s")
+    print(f"load from snapshot:   {snapshot_seconds:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
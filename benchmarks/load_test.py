@@ -0,0 +1,226 @@
+"""End-to-end load test of the bot against a fake Telegram Bot API.
+
+Runs the real application, with every handler registered, on a request
+backend that answers Bot API calls in-process. Pairs of players play full
+games concurrently: /start, /new_game, inviting the guesser and setting
+the word, then guesses until a win or a loss; some games are cancelled
+before the word is set. Every update goes through
+Application.process_update, and the time it takes is the update's handler
+latency.
+
+The report gives updates per second, handler latency percentiles and the
+peak RSS, together with the commit and the parameters. Games are scripted
+from a fixed seed and the outbound rate limits are lifted, so runs on
+different commits do the same work and measure the bot itself. State goes
+to a temporary directory; STATE_BACKEND and REDIS_URL are honoured.
+
+Usage:
+    python -m benchmarks.load_test [--pairs N] [--games N] [--seed N] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from scripts.shard_benchmark import GUESSES, SECRET_WORD, OfflineRequest
+
+# Weights of the ways a scripted game ends
+OUTCOMES = {'win': 6, 'loss': 3, 'cancel': 1}
+
+# A step of a pair's script: 0 for the word setter or 1 for the guesser, and the text sent
+Step = Tuple[int, str]
+
+
+def _configure_environment(directory: Path) -> None:
+    """Point the bot at a temporary directory and lift the send limits."""
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123:offline',
+        'DATA_DIR': str(directory),
+        'SEND_CHAT_RATE': '1000000',
+        'SEND_CHAT_BURST': '1000000',
+        'SEND_GLOBAL_RATE': '1000000',
+        'SEND_GLOBAL_BURST': '1000000',
+    })
+
+
+def script_pair(rng: random.Random, guesser: str, games: int, max_attempts: int) -> Tuple[List[Step], Counter]:
+    """
+    Script the updates one pair of players sends.
+    
+    Args:
+        rng: Source of the outcomes and guess counts.
+        guesser: Username of the guesser, whom the word setter invites.
+        games: Number of games the pair plays.
+        max_attempts: Attempts per game.
+    
+    Returns:
+        Tuple[List[Step], Counter]: The steps and the number of games per outcome.
+    """
+    steps: List[Step] = [(0, '/start'), (1, '/start')]
+    outcomes: Counter = Counter()
+    wrong_guesses = [word.lower() for word in GUESSES]
+    for _ in range(games):
+        outcome = rng.choices(list(OUTCOMES), weights=list(OUTCOMES.values()))[0]
+        outcomes[outcome] += 1
+        steps += [(0, '/new_game'), (0, f'@{guesser}')]
+        if outcome == 'cancel':
+            # Only the setup conversation can be cancelled
+            steps.append((0, '/cancel'))
+            continue
+        steps.append((0, SECRET_WORD.lower()))
+        misses = max_attempts if outcome == 'loss' else rng.randrange(max_attempts)
+        steps += [(1, rng.choice(wrong_guesses)) for _ in range(misses)]
+        if outcome == 'win':
+            steps.append((1, SECRET_WORD.lower()))
+    return steps, outcomes
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank p50, p95, p99 and the maximum of the values, in milliseconds."""
+    values = sorted(values)
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    pick = lambda fraction: values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': values[-1] * 1000}
+
+
+def current_commit() -> str:
+    """The checked-out commit, marked dirty when the tree has changes."""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parents[1]
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+async def run(pairs: int, games: int, seed: int) -> Dict[str, Any]:
+    """
+    Play the scripted games and measure them.
+    
+    Args:
+        pairs: Number of pairs playing concurrently.
+        games: Games per pair.
+        seed: Seed of the game scripts.
+    
+    Returns:
+        Dict[str, Any]: The report.
+    """
+    # Imported here, the settings are read from the environment on import
+    from telegram import Update
+    from scripts.webhook_client import synthetic_update
+    from src.config.settings import MAX_ATTEMPTS, STATE_BACKEND
+    from src.core.game import games as registry
+    from src.core.journal import open_game_journal
+    from src.core.state import state
+    from src.core.user import start_user_data_flusher, stop_user_data_flusher
+    from src.main import build_application
+    from src.utils.logger import setup_logger
+
+    setup_logger()
+    logging.getLogger().setLevel(logging.WARNING)
+    journal = None
+    if STATE_BACKEND == 'memory':
+        start_user_data_flusher()
+        journal = open_game_journal(registry)
+
+    rng = random.Random(seed)
+    scripts = []
+    outcomes: Counter = Counter()
+    for pair in range(pairs):
+        players = [(100000 + pair, f'setter{pair}'), (200000 + pair, f'guesser{pair}')]
+        steps, pair_outcomes = script_pair(rng, players[1][1], games, MAX_ATTEMPTS)
+        scripts.append((players, steps))
+        outcomes.update(pair_outcomes)
+
+    request = OfflineRequest()
+    application = build_application(request)
+    update_ids = iter(range(1, 10 ** 9))
+    latencies: List[float] = []
+
+    async def play(players: List[Tuple[int, str]], steps: List[Step]) -> None:
+        for player, text in steps:
+            user_id, username = players[player]
+            update = Update.de_json(synthetic_update(next(update_ids), user_id, username, text), application.bot)
+            started = time.perf_counter()
+            await application.process_update(update)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        async with application:
+            started = time.perf_counter()
+            await asyncio.gather(*(play(players, steps) for players, steps in scripts))
+            elapsed = time.perf_counter() - started
+            unfinished = sum(
+                [await state.find_game(players[0][1]) is not None for players, _ in scripts]
+            )
+    finally:
+        if journal is not None:
+            stop_user_data_flusher()
+            journal.close()
+        await state.close()
+
+    return {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'state_backend': STATE_BACKEND,
+        'pairs': pairs,
+        'games': games,
+        'seed': seed,
+        'updates': len(latencies),
+        'seconds': elapsed,
+        'updates_per_second': len(latencies) / elapsed,
+        'latency_ms': percentiles(latencies),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'outcomes': dict(outcomes),
+        'unfinished_games': unfinished,
+        'api_calls': sum(request.calls.values()),
+    }
+
+
+def main() -> None:
+    """Parse the arguments, run the load test and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=200, help="pairs of players playing concurrently")
+    parser.add_argument('--games', type=int, default=5, help="games per pair")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the game scripts")
+    parser.add_argument('--output', type=Path, help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        _configure_environment(Path(directory))
+        report = asyncio.run(run(args.pairs, args.games, args.seed))
+
+    latency = report['latency_ms']
+    print(f"commit {report['commit']}, {report['state_backend']} state, Python {report['python']}")
+    print(f"{report['pairs']} pairs x {report['games']} games: {report['outcomes']}")
+    print(
+        f"{report['updates']} updates in {report['seconds']:.2f} s: "
+        f"{report['updates_per_second']:.0f} updates/s, {report['api_calls']} Bot API calls"
+    )
+    print(
+        f"handler latency: p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, "
+        f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms"
+    )
+    print(f"peak RSS: {report['peak_rss_mib']:.1f} MiB")
+    if report['unfinished_games']:
+        print(f"warning: {report['unfinished_games']} games did not finish")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Microbenchmarks of the game hot paths, checked against a JSON baseline.
+
+Covers guess scoring, the language check of words and guesses, scoring a
+guess and rendering the board, registry lookups, get_user_role and the
+user store's updates and flushes (what update_user_data and
+save_user_data do), with registries and user stores of realistic sizes.
+
+Each benchmark reports the best time per operation out of several runs.
+Results are compared with the baseline file and the command fails if a
+benchmark got slower than the threshold allows. Baselines depend on the
+machine, so save one before comparing changes on a new machine.
+
+Usage:
+    python -m benchmarks.micro                 # compare with the baseline
+    python -m benchmarks.micro --save          # store the results as the baseline
+    python -m benchmarks.micro --full          # also use 1M games and users
+    python -m benchmarks.micro --filter registry --threshold 0.1
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core import game as game_module
+from src.core.dictionary import detect_language
+from src.core.game import Game, GameRegistry, get_feedback, get_user_role
+from src.core.user import UserStore
+
+BASELINE_FILE = Path(__file__).with_name('baselines') / 'micro.json'
+
+# Fraction by which a benchmark may be slower than its baseline
+REGRESSION_THRESHOLD = 0.25
+
+SIZES = (1_000, 100_000)
+FULL_SIZES = (1_000, 100_000, 1_000_000)
+
+# Operations per batch of lookups or updates
+BATCH = 1_000
+
+RUSSIAN_LETTERS = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+ENGLISH_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# A benchmark runs one batch of operations and returns how many it ran
+Batch = Callable[[], int]
+
+
+def random_word(rng: random.Random, letters: str, length: int = 5) -> str:
+    """Generate a random word of the given letters."""
+    return "".join(rng.choice(letters) for _ in range(length))
+
+
+def measure(batch: Batch, min_time: float = 0.2, repeat: int = 5) -> float:
+    """
+    Time a batch until it ran for min_time, repeat times.
+    
+    Args:
+        batch: The benchmark.
+        min_time: Seconds of batches per run.
+        repeat: Number of runs.
+    
+    Returns:
+        float: The best time per operation, in nanoseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        operations = 0
+        started = time.perf_counter()
+        while True:
+            operations += batch()
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / operations)
+    return best * 1e9
+
+
+def scoring_benchmarks(rng: random.Random) -> Iterator[Tuple[str, Batch]]:
+    """Benchmarks of guess scoring, language checks and board rendering."""
+    pairs = [(random_word(rng, RUSSIAN_LETTERS), random_word(rng, RUSSIAN_LETTERS)) for _ in range(BATCH)]
+
+    def feedback() -> int:
+        for secret_word, guess in pairs:
+            get_feedback(secret_word, guess)
+        return len(pairs)
+
+    yield 'get_feedback', feedback
+
+    # Mostly Russian, some English and a few mixed words, as players send them
+    words = [
+        random_word(rng, rng.choices([RUSSIAN_LETTERS, ENGLISH_LETTERS, RUSSIAN_LETTERS + 'abc'], [14, 5, 1])[0])
+        for _ in range(BATCH)
+    ]
+
+    def language() -> int:
+        for word in words:
+            detect_language(word)
+        return len(words)
+
+    yield 'detect_language', language
+
+    games = [
+        (random_word(rng, RUSSIAN_LETTERS), [random_word(rng, RUSSIAN_LETTERS) for _ in range(6)])
+        for _ in range(100)
+    ]
+
+    def render() -> int:
+        for secret_word, guesses in games:
+            game = Game("setter", "guesser", 1, 2, secret_word, 'waiting_for_guess', 6, 'russian')
+            for guess in guesses:
+                game.add_attempt(guess)
+                game.render_board()
+        return len(games) * 6
+
+    yield 'add_attempt_and_render_board', render
+
+
+def build_registry(size: int) -> GameRegistry:
+    """Build a registry of size games, half of them waiting for guesses."""
+    registry = GameRegistry()
+    for index in range(size):
+        word_setter_username, guesser_username = f"setter{index}", f"guesser{index}"
+        state = 'waiting_for_guess' if index % 2 else 'waiting_for_word'
+        registry[(word_setter_username, guesser_username)] = Game(
+            word_setter_username, guesser_username, index, index + 1, "слово", state, 6, 'russian'
+        )
+    return registry
+
+
+def registry_benchmarks(rng: random.Random, size: int) -> Iterator[Tuple[str, Batch]]:
+    """Benchmarks of game lookups in a registry of the given size."""
+    registry = build_registry(size)
+    indexes = [rng.randrange(size) for _ in range(BATCH)]
+    guessers = [f"guesser{index}" for index in indexes]
+    participants = [f"setter{index}" if index % 3 else f"guesser{index}" for index in indexes]
+    keys = [(f"setter{index}", f"guesser{index}") for index in indexes]
+
+    def get() -> int:
+        for key in keys:
+            registry.get(key)
+        return len(keys)
+
+    def find_by_guesser() -> int:
+        for username in guessers:
+            registry.find_by_guesser(username, state='waiting_for_guess')
+        return len(guessers)
+
+    def find_by_participant() -> int:
+        for username in participants:
+            registry.find_by_participant(username, state='waiting_for_guess')
+        return len(participants)
+
+    def user_role() -> int:
+        saved, game_module.games = game_module.games, registry
+        try:
+            for username in participants:
+                get_user_role(username)
+        finally:
+            game_module.games = saved
+        return len(participants)
+
+    yield f'registry.get[{size}]', get
+    yield f'registry.find_by_guesser[{size}]', find_by_guesser
+    yield f'registry.find_by_participant[{size}]', find_by_participant
+    yield f'get_user_role[{size}]', user_role
+
+
+def user_benchmarks(rng: random.Random, size: int, directory: Path) -> Iterator[Tuple[str, Batch]]:
+    """Benchmarks of user updates and flushes on a store of the given size."""
+    store = UserStore(directory / f'users-{size}.sqlite3')
+    for index in range(size):
+        store.update_user(f"user{index}", index, f"user{index + 1}")
+    store.flush()
+    usernames = [f"user{rng.randrange(size)}" for _ in range(BATCH)]
+
+    def update() -> int:
+        for chat_id, username in enumerate(usernames):
+            store.update_user(username, chat_id, "partner")
+        return len(usernames)
+
+    def save() -> int:
+        update()
+        store.flush()
+        return len(usernames)
+
+    try:
+        yield f'update_user_data[{size}]', update
+        yield f'save_user_data[{size}]', save
+    finally:
+        store.close()
+
+
+def run(sizes: Sequence[int], pattern: Optional[str] = None) -> Dict[str, float]:
+    """
+    Run the benchmarks.
+    
+    Args:
+        sizes: Numbers of games and users to benchmark with.
+        pattern: Only run benchmarks whose name contains it.
+    
+    Returns:
+        Dict[str, float]: Nanoseconds per operation by benchmark name.
+    """
+    results: Dict[str, float] = {}
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        suites: List[Iterator[Tuple[str, Batch]]] = [scoring_benchmarks(rng)]
+        for size in sizes:
+            suites.append(registry_benchmarks(rng, size))
+            suites.append(user_benchmarks(rng, size, Path(directory)))
+        for suite in suites:
+            for name, batch in suite:
+                if pattern and pattern not in name:
+                    continue
+                results[name] = measure(batch)
+                print(f"{name:45} {results[name]:12.0f} ns/op", flush=True)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Compare results with a baseline.
+    
+    Args:
+        results: Nanoseconds per operation by benchmark name.
+        baseline: The baseline results.
+        threshold: Allowed slowdown as a fraction of the baseline.
+    
+    Returns:
+        List[str]: Names of the benchmarks that regressed.
+    """
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:45} {'-':>12} {current:12.0f} {'new':>8}")
+            continue
+        change = current / previous - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:45} {previous:12.0f} {current:12.0f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    """Parse the arguments, run the benchmarks and check or save the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--full', action='store_true', help="also benchmark 1M games and users")
+    parser.add_argument('--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="allowed slowdown, 0.25 is 25%%")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help="baseline file")
+    args = parser.parse_args()
+
+    results = run(FULL_SIZES if args.full else SIZES, args.filter)
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))['results']
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        document = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            # Keep baselines of benchmarks that were not run this time
+            'results': {**baseline, **{name: round(value, 1) for name, value in results.items()}},
+        }
+        args.baseline.write_text(json.dumps(document, indent=2) + '\n', encoding='utf-8')
+        print(f"\nSaved the baseline to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}, run with --save to create one")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
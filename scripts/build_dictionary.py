@@ -0,0 +1,45 @@
+"""Build a word dictionary from a plain text word list.
+
+The word list has one word per line. The dictionary is written to
+DICTIONARY_DIR/<language>.dict, where the bot looks for it when
+DICTIONARY_CHECK is enabled.
+
+Usage:
+    python scripts/build_dictionary.py russian words_ru.txt
+    python scripts/build_dictionary.py english words_en.txt --output en.dict
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config.settings import DICTIONARY_DIR, MAX_WORD_LENGTH, MIN_WORD_LENGTH
+from src.core.dictionary import ALPHABETS, WordDictionary, build_dictionary
+
+
+def main() -> None:
+    """Build the dictionary and report its size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('language', choices=sorted(ALPHABETS), help="language of the words")
+    parser.add_argument('words', type=Path, help="plain text word list, one word per line")
+    parser.add_argument('--output', type=Path, help="dictionary file to write")
+    parser.add_argument('--min-length', type=int, default=MIN_WORD_LENGTH)
+    parser.add_argument('--max-length', type=int, default=MAX_WORD_LENGTH)
+    args = parser.parse_args()
+
+    output = args.output or DICTIONARY_DIR / f'{args.language}.dict'
+    with open(args.words, 'r', encoding='utf-8') as f:
+        count = build_dictionary(f, ALPHABETS[args.language], output, args.min_length, args.max_length)
+
+    started = time.perf_counter()
+    dictionary = WordDictionary(output, ALPHABETS[args.language])
+    load_ms = (time.perf_counter() - started) * 1000
+    dictionary.close()
+    print(f"{output}: {count} words, {output.stat().st_size} bytes, loads in {load_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
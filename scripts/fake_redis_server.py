@@ -0,0 +1,295 @@
+"""In-memory server speaking the Redis protocol, for tests and local runs.
+
+It implements the commands the Redis state backend uses (strings, hashes,
+sets, MULTI/EXEC transactions and the checked transaction script) plus a few for
+inspection, keeps everything in memory and counts the commands it served.
+It has no Lua interpreter: EVAL and EVALSHA run the Python equivalent of
+the client's checked transaction script and reject any other script.
+
+Usage:
+    python scripts/fake_redis_server.py --port 6379
+    STATE_BACKEND=redis REDIS_URL=redis://127.0.0.1:6379/0 python run.py
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.core.resp import CHECKED_TRANSACTION_SCRIPT, CHECKED_TRANSACTION_SHA, read_reply
+
+
+class Status(str):
+    """Simple string reply such as OK."""
+
+
+def encode_reply(value: Any) -> bytes:
+    """
+    Encode a reply.
+    
+    Args:
+        value: None, int, str, Status, list or Exception (an error reply).
+    
+    Returns:
+        bytes: The encoded reply.
+    """
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, Exception):
+        return b'-%s\r\n' % str(value).encode('utf-8')
+    if isinstance(value, Status):
+        return b'+%s\r\n' % value.encode('ascii')
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode_reply(item) for item in value)
+    value = value.encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+OK = Status('OK')
+QUEUED = Status('QUEUED')
+
+
+class FakeRedisServer:
+    """
+    Redis protocol server keeping its data in dictionaries.
+    
+    Attributes:
+        data: Keys mapped to str values, hash dictionaries or sets.
+        commands: Number of commands served.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self.data: Dict[str, Any] = {}
+        self.commands = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Dict[str, Callable[..., Any]] = {
+            'PING': lambda *args: args[0] if args else Status('PONG'),
+            'ECHO': lambda message: message,
+            'SELECT': lambda db: OK,
+            'AUTH': lambda *args: OK,
+            'FLUSHDB': self._flushdb,
+            'FLUSHALL': self._flushdb,
+            'KEYS': lambda pattern: [key for key in self.data if fnmatch.fnmatchcase(key, pattern)],
+            'EXISTS': lambda *keys: sum(key in self.data for key in keys),
+            'DEL': lambda *keys: sum(self.data.pop(key, None) is not None for key in keys),
+            'GET': lambda key: self._string(key),
+            'SET': self._set,
+            'HSET': self._hset,
+            'HGET': lambda key, field: self._hash(key).get(field),
+            'HMGET': lambda key, *fields: [self._hash(key).get(field) for field in fields],
+            'HGETALL': lambda key: [item for pair in self._hash(key).items() for item in pair],
+            'HSETNX': self._hsetnx,
+            'HINCRBY': self._hincrby,
+            'HDEL': self._hdel,
+            'HLEN': lambda key: len(self._hash(key)),
+            'SADD': self._sadd,
+            'SCARD': lambda key: len(self._members(key)),
+            'SCAN': self._scan,
+            'EVAL': self._eval,
+            'EVALSHA': self._evalsha,
+        }
+        self._scripts: set = set()
+
+    def _flushdb(self, *args: str) -> Status:
+        self.data.clear()
+        return OK
+
+    def _scan(self, cursor: str, *options: str) -> List[Any]:
+        """Return all matching keys at once, with the cursor of a finished scan."""
+        arguments = dict(zip((option.upper() for option in options[::2]), options[1::2]))
+        pattern = arguments.get('MATCH', '*')
+        return ['0', [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]]
+
+    def _eval(self, script: str, numkeys: str, *args: str) -> Any:
+        if script != CHECKED_TRANSACTION_SCRIPT:
+            raise ValueError("ERR the fake server only runs the checked transaction script")
+        self._scripts.add(CHECKED_TRANSACTION_SHA)
+        return self._checked_transaction(int(numkeys), args)
+
+    def _evalsha(self, sha: str, numkeys: str, *args: str) -> Any:
+        if sha not in self._scripts:
+            raise ValueError("NOSCRIPT No matching script. Please use EVAL.")
+        return self._checked_transaction(int(numkeys), args)
+
+    def _checked_transaction(self, numkeys: int, args: tuple) -> Any:
+        """Run the checked transaction script: compare hash fields, then run the commands."""
+        keys, argv = args[:numkeys], args[numkeys:]
+        for index, key in enumerate(keys):
+            if self._hash(key).get(argv[2 * index], '') != argv[2 * index + 1]:
+                return 0
+        position = 2 * numkeys
+        while position < len(argv):
+            count = int(argv[position])
+            command = argv[position + 1:position + 1 + count]
+            reply = self._handlers[command[0].upper()](*command[1:])
+            if isinstance(reply, Exception):
+                return reply
+            position += count + 1
+        return 1
+
+    def _string(self, key: str) -> Optional[str]:
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, str):
+            raise ValueError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _hash(self, key: str, create: bool = False) -> Dict[str, str]:
+        value = self.data.get(key)
+        if value is None:
+            value = {}
+            if create:
+                self.data[key] = value
+        elif not isinstance(value, dict):
+            raise ValueError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _set(self, key: str, value: str) -> Status:
+        self.data[key] = value
+        return OK
+
+    def _hset(self, key: str, *pairs: str) -> int:
+        if not pairs or len(pairs) % 2:
+            raise ValueError("ERR wrong number of arguments for 'hset' command")
+        fields = self._hash(key, create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def _hsetnx(self, key: str, field: str, value: str) -> int:
+        fields = self._hash(key, create=True)
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def _hincrby(self, key: str, field: str, increment: str) -> int:
+        fields = self._hash(key, create=True)
+        value = int(fields.get(field, 0)) + int(increment)
+        fields[field] = str(value)
+        return value
+
+    def _members(self, key: str, create: bool = False) -> set:
+        value = self.data.get(key)
+        if value is None:
+            value = set()
+            if create:
+                self.data[key] = value
+        elif not isinstance(value, set):
+            raise ValueError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _sadd(self, key: str, *members: str) -> int:
+        if not members:
+            raise ValueError("ERR wrong number of arguments for 'sadd' command")
+        values = self._members(key, create=True)
+        added = len(set(members) - values)
+        values.update(members)
+        return added
+
+    def _hdel(self, key: str, *names: str) -> int:
+        fields = self._hash(key)
+        removed = sum(fields.pop(name, None) is not None for name in names)
+        if not fields:
+            self.data.pop(key, None)
+        return removed
+
+    def execute(self, args: List[str]) -> Any:
+        """
+        Run one command.
+        
+        Args:
+            args: The command name and its arguments.
+        
+        Returns:
+            Any: The reply value; errors are returned as exceptions.
+        """
+        self.commands += 1
+        handler = self._handlers.get(args[0].upper())
+        if handler is None:
+            return ValueError(f"ERR unknown command '{args[0]}'")
+        try:
+            return handler(*args[1:])
+        except TypeError:
+            return ValueError(f"ERR wrong number of arguments for '{args[0].lower()}' command")
+        except ValueError as e:
+            return e
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one client connection."""
+        transaction: Optional[List[List[str]]] = None
+        try:
+            while True:
+                args = await read_reply(reader)
+                name = args[0].upper()
+                if name == 'MULTI':
+                    transaction, reply = [], OK
+                elif name == 'EXEC':
+                    if transaction is None:
+                        reply = ValueError("ERR EXEC without MULTI")
+                    else:
+                        reply = [self.execute(command) for command in transaction]
+                        transaction = None
+                elif name == 'DISCARD':
+                    transaction, reply = None, OK
+                elif transaction is not None:
+                    transaction.append(args)
+                    reply = QUEUED
+                else:
+                    reply = self.execute(args)
+                writer.write(encode_reply(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """Start listening; the port is chosen by the system if it was 0."""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening and close the connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def url(self) -> str:
+        """URL for clients of this server."""
+        return f'redis://{self.host}:{self.port}/0'
+
+
+async def serve(host: str, port: int) -> None:
+    """Run a server until interrupted."""
+    server = FakeRedisServer(host, port)
+    await server.start()
+    print(f"Fake Redis listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    """Parse the arguments and run the server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=6379, help="port to listen on")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
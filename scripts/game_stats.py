@@ -0,0 +1,365 @@
+"""Player and language statistics from the game logs.
+
+Reads the game log and its rotated segments, plain or gzipped, oldest
+first, one line at a time, and aggregates per-player, per-language and
+per-word-length statistics. Both the JSON-lines events and the older text
+lines (Game started / Guess attempt / Game won / Game lost) are
+understood.
+
+A checkpoint stores how far each file was read, together with the
+aggregates, so a later run only reads lines added since. Files are
+recognised by their first line, so a segment that was the live log at
+the last run and has since been rotated and compressed is resumed where
+reading stopped. Compressed segments never change, so once one has been
+read to the end it is recorded by name and size and not opened again.
+
+Usage:
+    python scripts/game_stats.py
+    python scripts/game_stats.py --log data/logs/game_logs.log --top 50 --json
+    python scripts/game_stats.py --reset
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.config.settings import DATA_DIR, GAME_LOGS_FILE
+from src.core.dictionary import detect_language
+
+CHECKPOINT_VERSION = 1
+
+# Text lines written before game events were logged as JSON
+_TEXT_EVENTS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('game_started', re.compile(
+        r'Game started - Word setter: (?P<word_setter>.*?), Guesser: (?P<guesser>.*?), '
+        r'Secret word: (?P<secret_word>.*?), Language: (?P<language>\w+)'
+    )),
+    ('guess', re.compile(
+        r'Guess attempt - Player: (?P<guesser>.*?), Secret word: (?P<secret_word>.*?), '
+        r'Guess: (?P<guess>.*?), Attempt #(?P<attempt>\d+)'
+    )),
+    ('game_won', re.compile(
+        r'Game won - Guesser: (?P<guesser>.*?) won against (?P<word_setter>.*?), '
+        r'Secret word: (?P<secret_word>.*?), Attempts used: (?P<attempts>\d+)/(?P<max_attempts>\d+)'
+    )),
+    ('game_lost', re.compile(
+        r'Game lost - Guesser: (?P<guesser>.*?) lost against (?P<word_setter>.*?), '
+        r'Secret word: (?P<secret_word>.*?), All (?P<max_attempts>\d+) attempts used'
+    )),
+)
+
+_INTEGER_FIELDS = ('attempt', 'attempts', 'max_attempts', 'word_length')
+
+
+def parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a game log line into an event.
+    
+    Args:
+        line: A line of the game log, JSON or text.
+    
+    Returns:
+        Optional[Dict[str, Any]]: The event with its type under 'event', or
+            None if the line is not a game event.
+    """
+    if line.startswith('{'):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        return event if isinstance(event, dict) and 'event' in event else None
+    for event_type, pattern in _TEXT_EVENTS:
+        match = pattern.search(line)
+        if match:
+            event: Dict[str, Any] = {'event': event_type, **match.groupdict()}
+            for name in _INTEGER_FIELDS:
+                if name in event:
+                    event[name] = int(event[name])
+            if event_type == 'game_lost':
+                event['attempts'] = event['max_attempts']
+            return event
+    return None
+
+
+class GameStats:
+    """
+    Aggregated statistics of the events read so far.
+    
+    Attributes:
+        totals: Counts of events and unparsed lines.
+        players: Per-player counters: games, wins, losses and attempts
+            to win as the guesser; words set and words not guessed as the
+            word setter; guesses made.
+        languages: Per-language counters of finished games.
+        word_lengths: Per-word-length counters of finished games.
+    """
+
+    def __init__(self) -> None:
+        self.totals: Counter = Counter()
+        self.players: Dict[str, Counter] = {}
+        self.languages: Dict[str, Counter] = {}
+        self.word_lengths: Dict[str, Counter] = {}
+
+    def _player(self, username: str) -> Counter:
+        return self.players.setdefault(username, Counter())
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """
+        Add one event.
+        
+        Args:
+            event: An event from parse_line.
+        """
+        event_type = event['event']
+        self.totals[event_type] += 1
+        if event_type == 'guess':
+            self._player(event['guesser'])['guesses'] += 1
+            return
+        if event_type not in ('game_won', 'game_lost'):
+            return
+
+        won = event_type == 'game_won'
+        outcome = 'wins' if won else 'losses'
+        secret_word = event.get('secret_word', '')
+        language = event.get('language') or detect_language(secret_word.lower()) or 'unknown'
+        word_length = str(event.get('word_length') or len(secret_word))
+        attempts = event.get('attempts', 0)
+
+        for counters in (
+            self._player(event['guesser']),
+            self.languages.setdefault(language, Counter()),
+            self.word_lengths.setdefault(word_length, Counter()),
+        ):
+            counters['games'] += 1
+            counters[outcome] += 1
+            if won:
+                counters['win_attempts'] += attempts
+        word_setter = self._player(event['word_setter'])
+        word_setter['words_set'] += 1
+        if not won:
+            word_setter['words_not_guessed'] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The aggregates as JSON-compatible data."""
+        return {
+            'totals': dict(self.totals),
+            'players': {name: dict(counters) for name, counters in self.players.items()},
+            'languages': {name: dict(counters) for name, counters in self.languages.items()},
+            'word_lengths': {name: dict(counters) for name, counters in self.word_lengths.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GameStats':
+        """Restore aggregates saved with to_dict."""
+        stats = cls()
+        stats.totals = Counter(data.get('totals', {}))
+        for name in ('players', 'languages', 'word_lengths'):
+            setattr(stats, name, {key: Counter(value) for key, value in data.get(name, {}).items()})
+        return stats
+
+
+def log_segments(log_file: Path) -> List[Path]:
+    """
+    Find a log file and its rotated segments, oldest first.
+    
+    Segments are named after the log file plus a suffix, optionally with
+    .gz. Numbered suffixes (.1, .2, ...) count up with age, as the standard
+    rotating handler names them; other suffixes, such as timestamps, sort
+    in the order they were written.
+    
+    Args:
+        log_file: The live log file.
+    
+    Returns:
+        List[Path]: The segments, then the live file if it exists.
+    """
+    prefix = log_file.name + '.'
+
+    def order(path: Path) -> Tuple[int, Any]:
+        suffix = path.name[len(prefix):]
+        if suffix.endswith('.gz'):
+            suffix = suffix[:-3]
+        return (0, -int(suffix)) if suffix.isdigit() else (1, suffix)
+
+    segments = sorted(
+        (path for path in log_file.parent.glob(prefix + '*') if path.is_file()),
+        key=order
+    )
+    if log_file.is_file():
+        segments.append(log_file)
+    return segments
+
+
+def _open(path: Path) -> Any:
+    """Open a segment for binary reading, decompressing gzipped ones."""
+    return gzip.open(path, 'rb') if path.suffix == '.gz' else open(path, 'rb')
+
+
+def _fingerprint(path: Path) -> Optional[str]:
+    """Identify a file by its first line, or None while it has no complete line."""
+    with _open(path) as f:
+        first_line = f.readline()
+    if not first_line.endswith(b'\n'):
+        return None
+    return hashlib.sha1(first_line).hexdigest()
+
+
+def read_new_lines(path: Path, offset: int) -> Iterator[Tuple[str, int]]:
+    """
+    Read the complete lines of a file after an offset.
+    
+    Args:
+        path: The file, plain or gzipped.
+        offset: Offset in the uncompressed content to start at.
+    
+    Yields:
+        Tuple[str, int]: Each line and the offset just past it.
+    """
+    with _open(path) as f:
+        f.seek(offset)
+        for raw in f:
+            # A line still being written is read on the next run
+            if not raw.endswith(b'\n'):
+                return
+            offset += len(raw)
+            yield raw.decode('utf-8', errors='replace'), offset
+
+
+def update_stats(log_file: Path, checkpoint: Optional[Dict[str, Any]] = None) -> Tuple[GameStats, Dict[str, Any]]:
+    """
+    Read what was added to the logs since a checkpoint.
+    
+    Args:
+        log_file: The live game log.
+        checkpoint: A checkpoint from an earlier run, or None to read everything.
+    
+    Returns:
+        Tuple[GameStats, Dict[str, Any]]: The statistics and the new checkpoint.
+    """
+    if checkpoint and checkpoint.get('version') == CHECKPOINT_VERSION:
+        stats = GameStats.from_dict(checkpoint['stats'])
+        offsets = checkpoint['offsets']
+        done = checkpoint.get('done', {})
+    else:
+        stats, offsets, done = GameStats(), {}, {}
+
+    new_offsets: Dict[str, int] = {}
+    new_done: Dict[str, int] = {}
+    for path in log_segments(log_file):
+        compressed = path.suffix == '.gz'
+        size = path.stat().st_size
+        if compressed and done.get(path.name) == size:
+            new_done[path.name] = size
+            continue
+        fingerprint = _fingerprint(path)
+        if fingerprint is None:
+            continue
+        start = offset = new_offsets.get(fingerprint, offsets.get(fingerprint, 0))
+        for line, offset in read_new_lines(path, offset):
+            event = parse_line(line)
+            if event is None:
+                stats.totals['unparsed_lines'] += 1
+                continue
+            try:
+                stats.add(event)
+            except (KeyError, TypeError, ValueError):
+                stats.totals['unparsed_lines'] += 1
+        stats.totals['bytes_read'] += offset - start
+        if compressed:
+            # Read to the end; nothing is ever appended to a compressed segment
+            new_done[path.name] = size
+            new_offsets.pop(fingerprint, None)
+        else:
+            new_offsets[fingerprint] = offset
+
+    # Files deleted by retention are dropped from the checkpoint
+    return stats, {
+        'version': CHECKPOINT_VERSION,
+        'offsets': new_offsets,
+        'done': new_done,
+        'stats': stats.to_dict(),
+    }
+
+
+def _rate(part: int, whole: int) -> str:
+    return f"{part / whole:.1%}" if whole else "-"
+
+
+def _average(total: int, count: int) -> str:
+    return f"{total / count:.2f}" if count else "-"
+
+
+def format_report(stats: GameStats, top: int) -> str:
+    """
+    Format the statistics as text.
+    
+    Args:
+        stats: The statistics.
+        top: Number of players to list, by finished games.
+    
+    Returns:
+        str: The report.
+    """
+    totals = stats.totals
+    finished = totals['game_won'] + totals['game_lost']
+    lines = [
+        f"Games: {totals['game_started']} started, {finished} finished "
+        f"({totals['game_won']} won, {totals['game_lost']} lost), {totals['guess']} guesses",
+    ]
+    for title, groups in (("By language", stats.languages), ("By word length", stats.word_lengths)):
+        lines.append(f"\n{title}:")
+        for name, counters in sorted(groups.items()):
+            lines.append(
+                f"  {name:10} games {counters['games']:6}  win rate {_rate(counters['wins'], counters['games']):>6}  "
+                f"attempts to win {_average(counters['win_attempts'], counters['wins']):>5}"
+            )
+    ranked = sorted(stats.players.items(), key=lambda item: (-item[1]['games'], item[0]))[:top]
+    lines.append(f"\nPlayers (top {len(ranked)} of {len(stats.players)} by games guessed):")
+    for name, counters in ranked:
+        lines.append(
+            f"  {name:20} guessed {counters['games']:5}  win rate {_rate(counters['wins'], counters['games']):>6}  "
+            f"attempts to win {_average(counters['win_attempts'], counters['wins']):>5}  "
+            f"words set {counters['words_set']:5}  not guessed {counters['words_not_guessed']:5}"
+        )
+    if totals['unparsed_lines']:
+        lines.append(f"\n{totals['unparsed_lines']} lines were not game events")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Parse the arguments, update the statistics and print them."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--log', type=Path, default=GAME_LOGS_FILE, help="live game log file")
+    parser.add_argument('--checkpoint', type=Path, default=DATA_DIR / 'game_stats.json', help="checkpoint file")
+    parser.add_argument('--reset', action='store_true', help="ignore the checkpoint and read all logs again")
+    parser.add_argument('--top', type=int, default=20, help="number of players to list")
+    parser.add_argument('--json', action='store_true', help="print the statistics as JSON")
+    args = parser.parse_args()
+
+    checkpoint = None
+    if not args.reset and args.checkpoint.exists():
+        checkpoint = json.loads(args.checkpoint.read_text(encoding='utf-8'))
+    read_before = checkpoint['stats']['totals'].get('bytes_read', 0) if checkpoint else 0
+
+    stats, checkpoint = update_stats(args.log, checkpoint)
+    tmp_path = args.checkpoint.with_name(args.checkpoint.name + '.tmp')
+    tmp_path.write_text(json.dumps(checkpoint, ensure_ascii=False), encoding='utf-8')
+    tmp_path.replace(args.checkpoint)
+
+    if args.json:
+        print(json.dumps(stats.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(stats, args.top))
+        print(f"\nRead {stats.totals['bytes_read'] - read_before} new bytes")
+
+
+if __name__ == '__main__':
+    main()
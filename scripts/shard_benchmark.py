@@ -0,0 +1,198 @@
+"""Measure guess throughput of the sharded bot for several worker counts.
+
+For each worker count the script starts a router with that many worker
+processes, plays the game setup through them (/start, /new_game, inviting
+the guesser and setting the word) and then times how long the workers take
+to process a burst of guesses. Bot API calls are answered in-process with
+canned responses, and the outbound rate limits are lifted, so the result is
+the bot's own processing rate. State goes to a temporary directory.
+
+Usage:
+    python scripts/shard_benchmark.py --workers 1 2 4 --pairs 40 --guesses 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from telegram.request import BaseRequest, RequestData
+
+SECRET_WORD = 'СЛОВО'
+GUESSES = ('КНИГА', 'ПЕСНЯ', 'ГОРОД', 'ВЕТЕР', 'СОСНА')
+
+
+class OfflineRequest(BaseRequest):
+    """
+    Request backend that answers Bot API calls without a network.
+    
+    Attributes:
+        calls: Number of calls per Bot API method.
+    """
+
+    def __init__(self) -> None:
+        self._message_ids = 0
+        self.calls: Counter = Counter()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = None,
+        write_timeout: Any = None,
+        connect_timeout: Any = None,
+        pool_timeout: Any = None
+    ) -> Tuple[int, bytes]:
+        """Answer a Bot API call with a minimal successful result."""
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] += 1
+        parameters = request_data.parameters if request_data is not None else {}
+        result: Any = True
+        if endpoint == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bot', 'username': 'offline_bot'}
+        elif endpoint in ('sendMessage', 'editMessageText', 'sendAnimation'):
+            self._message_ids += 1
+            chat_id = int(parameters.get('chat_id', 0))
+            result = {
+                'message_id': parameters.get('message_id', self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': parameters.get('text', ''),
+            }
+            if endpoint == 'sendAnimation':
+                # A file_id lets the media cache skip later uploads, as with Telegram
+                result['animation'] = {
+                    'file_id': f'animation{self._message_ids}',
+                    'file_unique_id': f'animation{self._message_ids}',
+                    'width': 1, 'height': 1, 'duration': 1,
+                }
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
+
+
+def _configure_environment() -> None:
+    """Use a fake token and lift the send limits for this and the worker processes."""
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123:offline',
+        'USER_DATA_FLUSH_INTERVAL': '0.05',
+        'MAX_ATTEMPTS': '1000000',
+        'SEND_CHAT_RATE': '1000000',
+        'SEND_CHAT_BURST': '1000000',
+        'SEND_GLOBAL_RATE': '1000000',
+        'SEND_GLOBAL_BURST': '1000000',
+    })
+
+
+def _wait_processed(router: Any, total: int, timeout: float = 120.0) -> None:
+    """Wait until the workers have processed the given number of updates."""
+    deadline = time.monotonic() + timeout
+    while sum(router.processed) < total:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Workers processed {sum(router.processed)} of {total} updates")
+        time.sleep(0.01)
+
+
+def run(directory: Path, workers: int, pairs: int, guesses: int) -> Dict[str, float]:
+    """
+    Set up games on a router with the given number of workers and time the guesses.
+    
+    Args:
+        directory: Data directory of this run.
+        workers: Number of worker processes.
+        pairs: Number of games, each with its own pair of players.
+        guesses: Guesses sent by every guesser.
+    
+    Returns:
+        Dict[str, float]: Worker count, updates, seconds and updates per second.
+    """
+    # The workers read their settings from the environment when they start
+    os.environ['DATA_DIR'] = str(directory)
+    from scripts.webhook_client import synthetic_update
+    from src.bot.sharding import ShardRouter
+
+    router = ShardRouter(workers, OfflineRequest)
+    router.start()
+    update_ids = iter(range(1, 10 ** 9))
+    sent = 0
+
+    def send_all(messages: List[Tuple[int, str, str]]) -> None:
+        nonlocal sent
+        for user_id, username, text in messages:
+            router.dispatch(synthetic_update(next(update_ids), user_id, username, text))
+        sent += len(messages)
+
+    setters = [(100000 + index, f'setter{workers}_{index}') for index in range(pairs)]
+    guessers = [(200000 + index, f'guesser{workers}_{index}') for index in range(pairs)]
+
+    try:
+        send_all([(user_id, name, '/start') for user_id, name in setters + guessers])
+        _wait_processed(router, sent)
+        # Let the write-behind make the users visible to every worker
+        time.sleep(0.5)
+        send_all([(user_id, name, '/new_game') for user_id, name in setters])
+        _wait_processed(router, sent)
+        send_all([(user_id, name, f'@{guessers[index][1]}') for index, (user_id, name) in enumerate(setters)])
+        _wait_processed(router, sent)
+        send_all([(user_id, name, SECRET_WORD) for user_id, name in setters])
+        _wait_processed(router, sent)
+
+        burst = [
+            (user_id, name, GUESSES[round_number % len(GUESSES)])
+            for round_number in range(guesses)
+            for user_id, name in guessers
+        ]
+        started = time.perf_counter()
+        send_all(burst)
+        _wait_processed(router, sent)
+        elapsed = time.perf_counter() - started
+    finally:
+        router.stop()
+
+    return {
+        'workers': workers,
+        'updates': len(burst),
+        'seconds': elapsed,
+        'updates_per_second': len(burst) / elapsed,
+    }
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark for every worker count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="worker counts to measure")
+    parser.add_argument('--pairs', type=int, default=40, help="number of games")
+    parser.add_argument('--guesses', type=int, default=50, help="guesses per game")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        _configure_environment()
+        print(f"CPUs: {os.cpu_count()}")
+        baseline = None
+        for workers in args.workers:
+            result = run(Path(directory) / f'workers-{workers}', workers, args.pairs, args.guesses)
+            baseline = baseline or result['updates_per_second']
+            print(
+                f"{workers} workers: {result['updates']} guesses in {result['seconds']:.2f}s, "
+                f"{result['updates_per_second']:.0f}/s ({result['updates_per_second'] / baseline:.2f}x)"
+            )
+
+
+if __name__ == '__main__':
+    main()
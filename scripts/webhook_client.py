@@ -0,0 +1,148 @@
+"""Post synthetic Telegram updates to a webhook server.
+
+Each update is a private text message, as Telegram would post it. The
+client reports the response codes and acknowledgement latency. With
+--local it starts a webhook server in-process on a free port and drains
+its update queue itself, so the webhook path can be checked without a
+bot token or network access.
+
+Usage:
+    python scripts/webhook_client.py --url http://127.0.0.1:8080/telegram --secret s3cret
+    python scripts/webhook_client.py --local --count 1000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import aiohttp
+from telegram.ext import ApplicationBuilder
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.bot.webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+
+def synthetic_update(update_id: int, user_id: int, username: str, text: str) -> Dict[str, Any]:
+    """
+    Build the JSON of a private text message update.
+
+    Args:
+        update_id: The update ID, also used as the message ID.
+        user_id: The sender's user ID, also used as the chat ID.
+        username: The sender's username.
+        text: The message text.
+
+    Returns:
+        Dict[str, Any]: The update as Telegram would post it.
+    """
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private', 'username': username},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': username, 'username': username},
+        'text': text,
+    }
+    if text.startswith('/'):
+        # Telegram marks commands with an entity, which command handlers require
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+async def post_updates(
+    url: str,
+    secret: str,
+    updates: List[Dict[str, Any]],
+    concurrency: int
+) -> List[Tuple[int, float]]:
+    """
+    Post updates to a webhook URL.
+
+    Args:
+        url: The webhook URL.
+        secret: The secret token to send, or an empty string.
+        updates: The updates to post.
+        concurrency: Number of requests in flight at once.
+
+    Returns:
+        List[Tuple[int, float]]: Response status and latency in seconds per update.
+    """
+    headers = {SECRET_TOKEN_HEADER: secret} if secret else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Tuple[int, float]] = []
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def post(update: Dict[str, Any]) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json=update) as response:
+                    results.append((response.status, time.perf_counter() - started))
+
+        await asyncio.gather(*(post(update) for update in updates))
+    return results
+
+
+def _free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Post the updates, optionally to an in-process server, and report."""
+    updates = [
+        synthetic_update(index + 1, 10000 + index % args.users, f'user{index % args.users}', args.text)
+        for index in range(args.count)
+    ]
+
+    server = None
+    url = args.url
+    secret = args.secret
+    if args.local:
+        application = ApplicationBuilder().token('0:local').build()
+        server = WebhookServer(application, secret_token=args.secret, host='127.0.0.1', port=_free_port())
+        await server.start()
+        url = f'http://127.0.0.1:{server.port}{server.path}'
+        # The server generates a token when none is given
+        secret = server.secret_token
+
+    started = time.perf_counter()
+    results = await post_updates(url, secret, updates, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    print(f"Posted {len(results)} updates to {url} in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+    print(f"Status codes: {dict(statuses)}")
+    print(
+        f"Acknowledgement latency: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+        f"max {latencies[-1] * 1000:.1f} ms"
+    )
+
+    if server is not None:
+        print(f"Queued updates: {server.application.update_queue.qsize()}")
+        await server.stop()
+
+
+def main() -> None:
+    """Parse the arguments and post the updates."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080/telegram', help="webhook URL")
+    parser.add_argument('--secret', default='', help="secret token to send")
+    parser.add_argument('--local', action='store_true', help="post to an in-process webhook server")
+    parser.add_argument('--count', type=int, default=100, help="number of updates")
+    parser.add_argument('--users', type=int, default=10, help="number of distinct senders")
+    parser.add_argument('--concurrency', type=int, default=10, help="requests in flight at once")
+    parser.add_argument('--text', default='/start', help="message text")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
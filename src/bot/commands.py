@@ -1,14 +1,15 @@
 """Bot command definitions and descriptions."""
 
+import asyncio
 import logging
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
 
 from telegram import Update, BotCommand as TgBotCommand
 from telegram.ext import ContextTypes
-from telegram._botcommandscope import BotCommandScopeChat
 
-from src.core.game import get_user_role
+from src.bot.dispatcher import set_chat_commands
+from src.core.state import state
 
 
 @dataclass
@@ -53,10 +54,44 @@ GUESSER_COMMANDS: List[CommandDef] = [
 ]
 
 
+@dataclass
+class CommandScopeStats:
+    """
+    Counters of the per-chat command menu cache.
+    
+    Attributes:
+        hits: Updates skipped because the chat already showed the right menu.
+        misses: Updates that called Telegram to change the menu.
+        errors: Telegram calls that failed.
+    """
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+
+def _build_commands(command_defs: List[CommandDef]) -> Tuple[TgBotCommand, ...]:
+    """Build the Telegram command list for a command group."""
+    return tuple(TgBotCommand(command=cmd.command, description=cmd.description) for cmd in command_defs)
+
+
+# Prebuilt command menus by role; 'default' is used outside of active games
+DEFAULT_SCOPE = "default"
+SCOPE_COMMANDS: Dict[str, Tuple[TgBotCommand, ...]] = {
+    DEFAULT_SCOPE: _build_commands(DEFAULT_COMMANDS),
+    "word_setter": _build_commands(WORD_SETTER_COMMANDS),
+    "guesser": _build_commands(GUESSER_COMMANDS),
+}
+
+scope_stats = CommandScopeStats()
+
+
 async def update_user_commands(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Update the bot commands shown to a user based on their role.
     
+    The menu last applied to each chat is remembered in the user store, so
+    Telegram is only called when the user's role actually changed.
+    
     Args:
         update: The update object from Telegram.
         context: The context object for the callback.
@@ -65,20 +100,21 @@ async def update_user_commands(update: Update, context: ContextTypes.DEFAULT_TYP
     if not user or not user.username:
         return
 
-    role = get_user_role(user.username)
-    commands = []
-
-    if role == "word_setter":
-        commands = [TgBotCommand(command=cmd.command, description=cmd.description) for cmd in WORD_SETTER_COMMANDS]
-    elif role == "guesser":
-        commands = [TgBotCommand(command=cmd.command, description=cmd.description) for cmd in GUESSER_COMMANDS]
-    else:
-        commands = [TgBotCommand(command=cmd.command, description=cmd.description) for cmd in DEFAULT_COMMANDS]
+    chat_id = update.effective_chat.id
+    role, applied_scope = await asyncio.gather(
+        state.get_user_role(user.username),
+        state.get_command_scope(chat_id)
+    )
+    scope = role or DEFAULT_SCOPE
+    if applied_scope == scope:
+        scope_stats.hits += 1
+        return
 
+    scope_stats.misses += 1
     try:
-        await context.bot.set_my_commands(
-            commands=commands,
-            scope=BotCommandScopeChat(chat_id=update.effective_chat.id),
-        )
+        await set_chat_commands(context.bot, chat_id, SCOPE_COMMANDS[scope])
     except Exception as e:
-        logging.error(f"Failed to update commands for user {user.username}: {e}") 
\ No newline at end of file
+        scope_stats.errors += 1
+        logging.error(f"Failed to update commands for user {user.username}: {e}")
+        return
+    await state.set_command_scope(chat_id, scope)
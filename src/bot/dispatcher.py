@@ -0,0 +1,445 @@
+"""Rate-limited dispatcher for outbound Telegram calls."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+import telegram
+
+from src.config.settings import (
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GLOBAL_BURST,
+    SEND_GLOBAL_RATE,
+    SEND_MAX_RETRIES,
+    SEND_RETRY_BASE_DELAY
+)
+from src.utils.metrics import DISPATCHER_LATENCY
+
+
+class Priority(IntEnum):
+    """Priority lanes for outbound calls; lower values go first."""
+    BOARD = 0
+    NOTIFY = 1
+    CHATTER = 2
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+    
+    Attributes:
+        rate: Tokens added per second.
+        capacity: Maximum number of stored tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available; zero if one is available now."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Consume one token."""
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the given number of seconds."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def is_full(self) -> bool:
+        """Whether the bucket is back to its full burst."""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and time.monotonic() >= self.blocked_until
+
+
+@dataclass
+class DispatcherStats:
+    """
+    Counters and recent latencies of the dispatcher.
+    
+    Attributes:
+        sent: Calls that completed.
+        retries: Calls that were retried after RetryAfter or a network error.
+        failures: Calls that failed for good.
+        latencies: Seconds from enqueueing to completion of recent calls.
+    """
+    sent: int = 0
+    retries: int = 0
+    failures: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+
+@dataclass
+class _ChatQueue:
+    """Pending calls of one chat and its rate limiter."""
+    bucket: TokenBucket
+    jobs: List[Any] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None
+
+
+class MessageDispatcher:
+    """
+    Central dispatcher for outbound Telegram calls.
+    
+    Every chat has a queue ordered by priority lane and then by arrival, and
+    its own token bucket. A chat's calls run one at a time, while different
+    chats run concurrently under a shared global token bucket that serves
+    waiting calls by priority. RetryAfter pauses the chat for the requested
+    time, and network errors are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        global_rate: float = SEND_GLOBAL_RATE,
+        global_burst: float = SEND_GLOBAL_BURST,
+        max_retries: int = SEND_MAX_RETRIES,
+        retry_base_delay: float = SEND_RETRY_BASE_DELAY
+    ) -> None:
+        self.configure(chat_rate, chat_burst, global_rate, global_burst, max_retries, retry_base_delay)
+        self.stats = DispatcherStats()
+        self._chats: Dict[Hashable, _ChatQueue] = {}
+        self._global_waiters: List[Any] = []
+        self._global_pump: Optional[asyncio.Task] = None
+        self._sequence = itertools.count()
+        self._depth = [0] * len(Priority)
+        self._latency_series = [DISPATCHER_LATENCY.labels(priority.name.lower()) for priority in Priority]
+
+    def configure(
+        self,
+        chat_rate: float,
+        chat_burst: float,
+        global_rate: float,
+        global_burst: float,
+        max_retries: int,
+        retry_base_delay: float
+    ) -> None:
+        """Set the rate limits and retry policy."""
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        if hasattr(self, '_chats'):
+            self._chats.clear()
+
+    def share_global_limit(self, processes: int) -> None:
+        """
+        Keep an equal share of the global limit.
+        
+        Bot API limits apply to the bot, so each of several processes sending
+        as the same bot gets its share of the rate and the burst.
+        
+        Args:
+            processes: Number of processes sending as the bot.
+        """
+        bucket = self.global_bucket
+        self.global_bucket = TokenBucket(bucket.rate / processes, max(1.0, bucket.capacity / processes))
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of queued calls per priority lane."""
+        return {priority.name.lower(): self._depth[priority] for priority in Priority}
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Median and 95th percentile latency of recent calls, in seconds."""
+        latencies = sorted(self.stats.latencies)
+        if not latencies:
+            return {'p50': 0.0, 'p95': 0.0}
+        return {
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        }
+
+    async def call(
+        self,
+        chat_id: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.NOTIFY
+    ) -> Any:
+        """
+        Queue a Telegram call for a chat and wait for its result.
+        
+        Args:
+            chat_id: The chat the call targets, or another key of calls that
+                are queued and rate limited together.
+            factory: Function that starts the call; it may be invoked again on retry.
+            priority: The priority lane.
+        
+        Returns:
+            Any: The result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            if len(self._chats) >= 10000:
+                self._prune()
+            queue = self._chats[chat_id] = _ChatQueue(TokenBucket(self.chat_rate, self.chat_burst))
+        heapq.heappush(queue.jobs, (priority, next(self._sequence), factory, future, time.monotonic()))
+        self._depth[priority] += 1
+        if queue.task is None or queue.task.done():
+            queue.task = loop.create_task(self._drain(queue))
+        return await future
+
+    def _prune(self) -> None:
+        """Forget idle chats whose buckets are full again."""
+        for chat_id, queue in list(self._chats.items()):
+            if not queue.jobs and (queue.task is None or queue.task.done()) and queue.bucket.is_full():
+                del self._chats[chat_id]
+
+    async def _drain(self, queue: _ChatQueue) -> None:
+        """Run the queued calls of one chat in priority order."""
+        while queue.jobs:
+            priority, _, factory, future, enqueued = heapq.heappop(queue.jobs)
+            self._depth[priority] -= 1
+            if future.done():
+                continue
+            try:
+                result = await self._execute(queue, factory, priority)
+            except Exception as e:
+                self.stats.failures += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.stats.sent += 1
+                if not future.done():
+                    future.set_result(result)
+            latency = time.monotonic() - enqueued
+            self.stats.latencies.append(latency)
+            self._latency_series[priority].observe(latency)
+
+    async def _acquire_global(self, priority: Priority) -> None:
+        """Wait for a global token; waiting calls are served by priority."""
+        if not self._global_waiters and self.global_bucket.delay() == 0:
+            self.global_bucket.take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._global_waiters, (priority, next(self._sequence), future))
+        if self._global_pump is None or self._global_pump.done():
+            self._global_pump = asyncio.get_running_loop().create_task(self._pump_global())
+        await future
+
+    async def _pump_global(self) -> None:
+        """Hand out global tokens to waiting calls as they become available."""
+        while self._global_waiters:
+            wait = self.global_bucket.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._global_waiters)
+            if not future.done():
+                self.global_bucket.take()
+                future.set_result(None)
+
+    async def _execute(self, queue: _ChatQueue, factory: Callable[[], Awaitable[Any]], priority: Priority) -> Any:
+        """Run one call under the rate limits, retrying transient errors."""
+        attempt = 0
+        while True:
+            wait = queue.bucket.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            queue.bucket.take()
+            await self._acquire_global(priority)
+            try:
+                return await factory()
+            except telegram.error.RetryAfter as e:
+                error = e
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                delay = max(float(retry_after), self._backoff(attempt))
+                queue.bucket.pause(delay)
+                logging.warning(f"Flood limit hit, retrying in {delay:.1f}s")
+            except telegram.error.BadRequest:
+                raise
+            except telegram.error.NetworkError as e:
+                error = e
+                delay = self._backoff(attempt)
+                logging.warning(f"Telegram call failed ({e}), retrying in {delay:.1f}s")
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff delay with jitter for the given retry attempt."""
+        return self.retry_base_delay * (2 ** attempt) * (1 + random.random() / 2)
+
+
+# Global outbound dispatcher
+dispatcher = MessageDispatcher()
+
+
+async def send_message(
+    bot: telegram.Bot,
+    chat_id: int,
+    text: str,
+    priority: Priority = Priority.NOTIFY,
+    **kwargs: Any
+) -> telegram.Message:
+    """
+    Send a message through the dispatcher.
+    
+    Args:
+        bot: The bot to send with.
+        chat_id: The target chat ID.
+        text: The message text.
+        priority: The priority lane.
+        **kwargs: Further arguments for Bot.send_message.
+    
+    Returns:
+        telegram.Message: The sent message.
+    """
+    return await dispatcher.call(
+        chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority
+    )
+
+
+async def reply_text(
+    message: telegram.Message,
+    text: str,
+    priority: Priority = Priority.NOTIFY,
+    **kwargs: Any
+) -> telegram.Message:
+    """
+    Reply to a message through the dispatcher.
+    
+    Args:
+        message: The message to reply to.
+        text: The reply text.
+        priority: The priority lane.
+        **kwargs: Further arguments for Message.reply_text.
+    
+    Returns:
+        telegram.Message: The sent message.
+    """
+    return await dispatcher.call(message.chat_id, lambda: message.reply_text(text, **kwargs), priority)
+
+
+async def reply_animation(
+    message: telegram.Message,
+    animation: Any,
+    priority: Priority = Priority.NOTIFY,
+    **kwargs: Any
+) -> telegram.Message:
+    """
+    Reply to a message with an animation through the dispatcher.
+    
+    Args:
+        message: The message to reply to.
+        animation: The animation file, file ID or URL.
+        priority: The priority lane.
+        **kwargs: Further arguments for Message.reply_animation.
+    
+    Returns:
+        telegram.Message: The sent message.
+    """
+    return await dispatcher.call(
+        message.chat_id, lambda: message.reply_animation(animation=animation, **kwargs), priority
+    )
+
+
+async def delete_message(
+    bot: telegram.Bot,
+    chat_id: int,
+    message_id: int,
+    priority: Priority = Priority.CHATTER
+) -> bool:
+    """
+    Delete a message through the dispatcher.
+    
+    Args:
+        bot: The bot to delete with.
+        chat_id: The chat of the message.
+        message_id: The message ID.
+        priority: The priority lane.
+    
+    Returns:
+        bool: True on success.
+    """
+    return await dispatcher.call(
+        chat_id, lambda: bot.delete_message(chat_id=chat_id, message_id=message_id), priority
+    )
+
+
+async def edit_message_text(
+    bot: telegram.Bot,
+    chat_id: int,
+    message_id: int,
+    text: str,
+    priority: Priority = Priority.BOARD,
+    **kwargs: Any
+) -> Any:
+    """
+    Edit the text of a message through the dispatcher.
+    
+    Args:
+        bot: The bot to edit with.
+        chat_id: The chat of the message.
+        message_id: The message ID.
+        text: The new text.
+        priority: The priority lane.
+        **kwargs: Further arguments for Bot.edit_message_text.
+    
+    Returns:
+        Any: The edited message, or True for inline messages.
+    """
+    return await dispatcher.call(
+        chat_id,
+        lambda: bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id, **kwargs),
+        priority
+    )
+
+
+async def set_chat_commands(
+    bot: telegram.Bot,
+    chat_id: int,
+    commands: Sequence[telegram.BotCommand],
+    priority: Priority = Priority.CHATTER
+) -> bool:
+    """
+    Set the command menu of a chat through the dispatcher.
+    
+    The menu is not a message in the chat, so its calls have their own
+    queue and never hold up the chat's messages.
+    
+    Args:
+        bot: The bot to set the menu with.
+        chat_id: The chat whose menu is set.
+        commands: The commands of the menu.
+        priority: The priority lane.
+    
+    Returns:
+        bool: True on success.
+    """
+    return await dispatcher.call(
+        ('commands', chat_id),
+        lambda: bot.set_my_commands(commands=commands, scope=telegram.BotCommandScopeChat(chat_id=chat_id)),
+        priority
+    )
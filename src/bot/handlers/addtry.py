@@ -1,14 +1,17 @@
 """Add try command handler."""
 
+import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from src.core.game import games
+from src.core.state import GameConflictError, state
 from src.config.strings import (
     NO_ACTIVE_GAME_MESSAGE,
+    GAME_CHANGED_MESSAGE,
     ADDTRY_ADDED_MESSAGE,
     ADDTRY_RECEIVED_MESSAGE
 )
+from src.bot.dispatcher import reply_text, send_message
 
 
 async def addtry_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -21,22 +24,31 @@ async def addtry_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """
     word_setter_username = update.message.from_user.username
     # Find the current game for the word setter
-    game = next(
-        (g for (w_s_username, g_username), g in games.items()
-         if w_s_username == word_setter_username and g.state == 'waiting_for_guess'),
-        None
-    )
+    game = await state.find_game(word_setter_username, role='word_setter', state='waiting_for_guess')
     if not game:
-        await update.message.reply_text(NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
         return
 
-    game.max_attempts += 1
-    await update.message.reply_text(ADDTRY_ADDED_MESSAGE, parse_mode='Markdown')
+    async with state.lock(game) as game:
+        if game is None or game.state != 'waiting_for_guess':
+            await reply_text(update.message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+            return
 
-    # Notify the guessing player
-    guesser_chat_id = game.guesser_chat_id
-    await context.bot.send_message(
-        chat_id=guesser_chat_id,
-        text=ADDTRY_RECEIVED_MESSAGE,
-        parse_mode='Markdown'
-    )
\ No newline at end of file
+        game.add_try()
+        try:
+            await state.save_game(game)
+        except GameConflictError as e:
+            # Another instance handled an update of this game meanwhile; nothing was stored
+            logging.warning(f"Dropped an added try on an outdated game: {e}")
+            await reply_text(update.message, GAME_CHANGED_MESSAGE, parse_mode='Markdown')
+            return
+        await reply_text(update.message, ADDTRY_ADDED_MESSAGE, parse_mode='Markdown')
+
+        # Notify the guessing player
+        guesser_chat_id = game.guesser_chat_id
+        await send_message(
+            context.bot,
+            guesser_chat_id,
+            ADDTRY_RECEIVED_MESSAGE,
+            parse_mode='Markdown'
+        )
\ No newline at end of file
@@ -1,72 +1,44 @@
 """Game-related command handlers."""
 
+import asyncio
 import logging
-import random
-from pathlib import Path
-from typing import Optional
-from telegram import Update
+from typing import Iterable
+from telegram import Bot, Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-from src.core.game import (
-    create_game,
-    get_game,
-    delete_game,
-    get_feedback,
-    games
-)
-from src.core.user import user_data, update_user_data
-from src.config.settings import GIFS_DIR, MAX_WORD_LENGTH, MIN_WORD_LENGTH
+from src.core.game import Game
+from src.core.dictionary import detect_language, is_known_word
+from src.core.state import GameConflictError, state
+from src.config.settings import MAX_WORD_LENGTH, MIN_WORD_LENGTH
 from src.config.strings import (
     NEW_GAME_MESSAGE,
     NO_USERNAME_NEW_GAME_MESSAGE,
     SECOND_PLAYER_NOT_STARTED_MESSAGE,
+    SECOND_PLAYER_HAS_ACTIVE_GAME_MESSAGE,
     SECOND_PLAYER_WAITING_MESSAGE,
     WORD_PROMPT_MESSAGE,
     INVALID_WORD_MESSAGE,
     WORD_SET_MESSAGE,
     GUESS_PROMPT_MESSAGE,
     NO_ACTIVE_GAME_MESSAGE,
-    INVALID_GUESS_MESSAGE,
-    ATTEMPT_MESSAGE,
-    GUESSER_WIN_MESSAGE,
-    WORD_SETTER_WIN_MESSAGE,
-    OUT_OF_ATTEMPTS_MESSAGE,
-    WORD_SETTER_LOSS_MESSAGE,
-    TRY_AGAIN_MESSAGE,
     CANCEL_MESSAGE,
+    GAME_ALREADY_EXISTS_MESSAGE,
+    GAME_CHANGED_MESSAGE,
+    GAME_DROPPED_ON_RESTART_MESSAGE,
     MIXED_LANGUAGE_MESSAGE,
-    INVALID_GUESS_LANGUAGE_MESSAGE,
-    LANGUAGE_STRINGS
+    LANGUAGE_STRINGS,
+    UNKNOWN_WORD_MESSAGE
 )
 from src.bot.keyboards.inline import create_last_partner_keyboard
 from src.bot.commands import update_user_commands
+from src.bot.dispatcher import reply_text, send_message
+from src.bot.sharding import claim_players
+from src.utils.logger import log_game_event
 
 
 # Conversation stages
 WAITING_FOR_SECOND_PLAYER, WAITING_FOR_WORD = range(2)
 
-game_log = logging.getLogger('game')
-
-
-def get_random_gif(directory: str) -> Optional[str]:
-    """
-    Get a random GIF file from the specified directory.
-    
-    Args:
-        directory: Path to the directory containing GIFs.
-        
-    Returns:
-        Optional[str]: Path to the random GIF file or None if no GIFs found.
-    """
-    try:
-        gif_files = list(Path(directory).glob('*.gif'))
-        if gif_files:
-            return str(random.choice(gif_files))
-        return None
-    except Exception as e:
-        logging.error(f"Error getting random GIF: {e}")
-        return None
-
 
 async def new_game_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
@@ -82,15 +54,15 @@ async def new_game_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     user = update.message.from_user
     username = user.username
     if not username:
-        await update.message.reply_text(NO_USERNAME_NEW_GAME_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, NO_USERNAME_NEW_GAME_MESSAGE, parse_mode='Markdown')
         return ConversationHandler.END
 
-    last_partner = user_data.get(username, {}).get('last_partner')
+    last_partner = (await state.get_user(username) or {}).get('last_partner')
     if last_partner:
         keyboard = create_last_partner_keyboard(last_partner)
-        await update.message.reply_text(NEW_GAME_MESSAGE, parse_mode='Markdown', reply_markup=keyboard)
+        await reply_text(update.message, NEW_GAME_MESSAGE, parse_mode='Markdown', reply_markup=keyboard)
     else:
-        await update.message.reply_text(NEW_GAME_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, NEW_GAME_MESSAGE, parse_mode='Markdown')
     return WAITING_FOR_SECOND_PLAYER
 
 
@@ -111,33 +83,59 @@ async def set_player(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     second_player_username = second_player[1:]
 
     word_setter_username = update.message.from_user.username
-    if second_player_username not in user_data or get_game(word_setter_username, second_player_username):
-        await update.message.reply_text(
+    if (
+        await state.get_user(second_player_username) is None
+        or await state.get_game(word_setter_username, second_player_username)
+    ):
+        await reply_text(
+            update.message,
             SECOND_PLAYER_NOT_STARTED_MESSAGE.format(second_player=second_player),
             parse_mode='Markdown'
         )
         return WAITING_FOR_SECOND_PLAYER
 
+    # In sharded mode the guesser may be playing a game owned by another worker
+    if not await claim_players(word_setter_username, second_player_username):
+        await reply_text(
+            update.message,
+            SECOND_PLAYER_HAS_ACTIVE_GAME_MESSAGE.format(second_player=second_player),
+            parse_mode='Markdown'
+        )
+        return WAITING_FOR_SECOND_PLAYER
+
     word_setter_chat_id = update.message.chat_id
     context.user_data['word_setter_username'] = word_setter_username
     context.user_data['guesser_username'] = second_player_username
 
-    # Save the last partner for each user
-    update_user_data(word_setter_username, word_setter_chat_id, second_player_username)
-    guesser_chat_id = user_data[second_player_username]['chat_id']
-    update_user_data(second_player_username, guesser_chat_id, word_setter_username)
-
-    # Create a new game
-    create_game(word_setter_username, second_player_username, word_setter_chat_id, guesser_chat_id)
+    guesser_chat_id = await state.get_user_chat_id(second_player_username)
+    try:
+        async with state.batch():
+            # Save the last partner for each user
+            await state.update_user(word_setter_username, word_setter_chat_id, second_player_username)
+            await state.update_user(second_player_username, guesser_chat_id, word_setter_username)
+
+            # Create a new game
+            await state.create_game(word_setter_username, second_player_username, word_setter_chat_id, guesser_chat_id)
+    except GameConflictError as e:
+        # Another instance created the game meanwhile; nothing was stored
+        logging.warning(f"Did not create a game that already exists: {e}")
+        await reply_text(
+            update.message,
+            GAME_ALREADY_EXISTS_MESSAGE.format(second_player=second_player),
+            parse_mode='Markdown'
+        )
+        return ConversationHandler.END
 
-    await update.message.reply_text(
+    await reply_text(
+        update.message,
         WORD_PROMPT_MESSAGE.format(word_setter_username=word_setter_username),
         parse_mode='Markdown'
     )
     # Notify the second player that the first player is setting a word
-    await context.bot.send_message(
-        chat_id=guesser_chat_id,
-        text=SECOND_PLAYER_WAITING_MESSAGE.format(word_setter_username=word_setter_username),
+    await send_message(
+        context.bot,
+        guesser_chat_id,
+        SECOND_PLAYER_WAITING_MESSAGE.format(word_setter_username=word_setter_username),
         parse_mode='Markdown'
     )
     return WAITING_FOR_WORD
@@ -156,41 +154,57 @@ async def receive_word(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     """
     word = update.message.text.strip().lower()
     if len(word) not in range(MIN_WORD_LENGTH, MAX_WORD_LENGTH + 1) or not word.isalpha():
-        await update.message.reply_text(INVALID_WORD_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, INVALID_WORD_MESSAGE, parse_mode='Markdown')
         return WAITING_FOR_WORD
 
     word_setter_username = context.user_data['word_setter_username']
     guesser_username = context.user_data['guesser_username']
-    game = get_game(word_setter_username, guesser_username)
+    game = await state.get_game(word_setter_username, guesser_username)
 
     # Determine the language
-    if all('а' <= c <= 'я' or c == 'ё' for c in word):
-        game.language = 'russian'
-    elif all('a' <= c <= 'z' for c in word):
-        game.language = 'english'
-    else:
-        await update.message.reply_text(MIXED_LANGUAGE_MESSAGE, parse_mode='Markdown')
+    language = detect_language(word)
+    if language is None:
+        await reply_text(update.message, MIXED_LANGUAGE_MESSAGE, parse_mode='Markdown')
+        return WAITING_FOR_WORD
+
+    if not is_known_word(word, language):
+        await reply_text(update.message, UNKNOWN_WORD_MESSAGE, parse_mode='Markdown')
         return WAITING_FOR_WORD
 
-    if game and game.state == 'waiting_for_word':
-        game.secret_word = word
-        game.state = 'waiting_for_guess'
+    if not game:
+        return
+
+    async with state.lock(game) as game:
+        if game is None or game.state != 'waiting_for_word':
+            return
+
+        game.set_word(word, language)
+        try:
+            await state.save_game(game)
+        except GameConflictError as e:
+            # Another instance handled an update of this game meanwhile; nothing was stored
+            logging.warning(f"Dropped a word set on an outdated game: {e}")
+            await reply_text(update.message, GAME_CHANGED_MESSAGE, parse_mode='Markdown')
+            return WAITING_FOR_WORD
         
         # Log the start of the game
-        game_log.info(
-            f"Game started - Word setter: {word_setter_username}, "
-            f"Guesser: {guesser_username}, "
-            f"Secret word: {word}, "
-            f"Language: {game.language}"
+        log_game_event(
+            'game_started',
+            word_setter=word_setter_username,
+            guesser=guesser_username,
+            secret_word=word,
+            language=game.language,
+            word_length=len(word)
         )
 
-        await update.message.reply_text(WORD_SET_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, WORD_SET_MESSAGE, parse_mode='Markdown')
 
         # Send message to the guesser
         language_str = LANGUAGE_STRINGS[game.language]
-        await context.bot.send_message(
-            chat_id=game.guesser_chat_id,
-            text=GUESS_PROMPT_MESSAGE.format(
+        await send_message(
+            context.bot,
+            game.guesser_chat_id,
+            GUESS_PROMPT_MESSAGE.format(
                 word_setter_username=word_setter_username,
                 language=language_str,
                 length=len(word)
@@ -222,18 +236,25 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """
     username = update.effective_user.username
     # Find and delete the active game involving the user
-    game_key = next(
-        ((w_s_username, g_username) for (w_s_username, g_username) in games
-         if w_s_username == username or g_username == username),
-        None
-    )
-    if game_key:
-        game = games[game_key]
+    game = await state.find_game(username)
+    if game:
+        try:
+            async with state.lock(game) as game:
+                if game is not None:
+                    await state.delete_game(game, reason='cancel')
+        except GameConflictError as e:
+            # Another instance handled an update of this game meanwhile; nothing was stored
+            logging.warning(f"Dropped a cancel of an outdated game: {e}")
+            await reply_text(update.effective_message, GAME_CHANGED_MESSAGE, parse_mode='Markdown')
+            return ConversationHandler.END
+        if game is None:
+            # The game ended while another update of it was handled
+            await reply_text(update.effective_message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+            return ConversationHandler.END
+
         other_username = game.guesser_username if username == game.word_setter_username else game.word_setter_username
         other_chat_id = game.guesser_chat_id if username == game.word_setter_username else game.word_setter_chat_id
-
-        del games[game_key]
-        await update.effective_message.reply_text(CANCEL_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.effective_message, CANCEL_MESSAGE, parse_mode='Markdown')
 
         # Update commands for both players
         await update_user_commands(update, context)
@@ -243,7 +264,7 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         other_update._effective_chat = type('Chat', (), {'id': other_chat_id})()
         await update_user_commands(other_update, context)
     else:
-        await update.effective_message.reply_text(NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.effective_message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
     return ConversationHandler.END
 
 
@@ -264,44 +285,93 @@ async def handle_last_partner(update: Update, context: ContextTypes.DEFAULT_TYPE
     word_setter_username = update.effective_user.username
 
     # Check if the last partner has started the bot
-    if last_partner_username not in user_data:
-        await query.message.reply_text(
+    if await state.get_user(last_partner_username) is None:
+        await reply_text(
+            query.message,
             SECOND_PLAYER_NOT_STARTED_MESSAGE.format(second_player=f"@{last_partner_username}"),
             parse_mode='Markdown'
         )
         return WAITING_FOR_SECOND_PLAYER
 
     # Check if there's already an active game
-    if get_game(word_setter_username, last_partner_username):
-        await query.message.reply_text(
+    if await state.get_game(word_setter_username, last_partner_username):
+        await reply_text(
+            query.message,
             SECOND_PLAYER_NOT_STARTED_MESSAGE.format(second_player=f"@{last_partner_username}"),
             parse_mode='Markdown'
         )
         return WAITING_FOR_SECOND_PLAYER
 
+    # In sharded mode the partner may be playing a game owned by another worker
+    if not await claim_players(word_setter_username, last_partner_username):
+        await reply_text(
+            query.message,
+            SECOND_PLAYER_HAS_ACTIVE_GAME_MESSAGE.format(second_player=f"@{last_partner_username}"),
+            parse_mode='Markdown'
+        )
+        return WAITING_FOR_SECOND_PLAYER
+
     context.user_data['word_setter_username'] = word_setter_username
     context.user_data['guesser_username'] = last_partner_username
 
     # Create a new game
-    word_setter_chat_id = user_data[word_setter_username]['chat_id']
-    guesser_chat_id = user_data[last_partner_username]['chat_id']
-    
-    # Create a new game
-    create_game(word_setter_username, last_partner_username, word_setter_chat_id, guesser_chat_id)
-
-    # Save the last partner for each user
-    update_user_data(word_setter_username, word_setter_chat_id, last_partner_username)
-    update_user_data(last_partner_username, guesser_chat_id, word_setter_username)
+    word_setter_chat_id, guesser_chat_id = await asyncio.gather(
+        state.get_user_chat_id(word_setter_username),
+        state.get_user_chat_id(last_partner_username)
+    )
+    try:
+        async with state.batch():
+            await state.create_game(word_setter_username, last_partner_username, word_setter_chat_id, guesser_chat_id)
+
+            # Save the last partner for each user
+            await state.update_user(word_setter_username, word_setter_chat_id, last_partner_username)
+            await state.update_user(last_partner_username, guesser_chat_id, word_setter_username)
+    except GameConflictError as e:
+        # Another instance created the game meanwhile; nothing was stored
+        logging.warning(f"Did not create a game that already exists: {e}")
+        await reply_text(
+            query.message,
+            GAME_ALREADY_EXISTS_MESSAGE.format(second_player=f"@{last_partner_username}"),
+            parse_mode='Markdown'
+        )
+        return ConversationHandler.END
 
     # Send messages to both players
-    await query.message.reply_text(
+    await reply_text(
+        query.message,
         WORD_PROMPT_MESSAGE.format(word_setter_username=word_setter_username),
         parse_mode='Markdown'
     )
-    await context.bot.send_message(
-        chat_id=guesser_chat_id,
-        text=SECOND_PLAYER_WAITING_MESSAGE.format(word_setter_username=word_setter_username),
+    await send_message(
+        context.bot,
+        guesser_chat_id,
+        SECOND_PLAYER_WAITING_MESSAGE.format(word_setter_username=word_setter_username),
         parse_mode='Markdown'
     )
     
-    return WAITING_FOR_WORD 
\ No newline at end of file
+    return WAITING_FOR_WORD
+
+
+async def notify_dropped_games(bot: Bot, dropped_games: Iterable[Game]) -> None:
+    """
+    Tell both players of games dropped on recovery that they have to start over.
+    
+    Args:
+        bot: The bot to send the messages with.
+        dropped_games: Games dropped while waiting for their word (see
+            open_game_journal).
+    """
+    notifications = []
+    for game in dropped_games:
+        for chat_id, partner_username in (
+            (game.word_setter_chat_id, game.guesser_username),
+            (game.guesser_chat_id, game.word_setter_username),
+        ):
+            notifications.append(send_message(
+                bot, chat_id, GAME_DROPPED_ON_RESTART_MESSAGE.format(partner_username=partner_username)
+            ))
+
+    # One failed notification must not cut the others short
+    for error in await asyncio.gather(*notifications, return_exceptions=True):
+        if isinstance(error, Exception):
+            logging.error("Failed to notify players of a dropped game", exc_info=error)
@@ -1,14 +1,16 @@
 """Guess handling functionality."""
 
+import asyncio
 import logging
-from pathlib import Path
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
 import telegram
 
-from src.core.game import get_feedback, games, delete_game
-from src.core.user import user_data, update_user_data
-from src.config.settings import ENGLISH_ALPHABET, GIFS_DIR, RUSSIAN_ALPHABET
+from src.core.game import Game
+from src.core.dictionary import detect_language, is_known_word
+from src.core.state import GameConflictError, state
+from src.config.settings import GIFS_DIR
 from src.config.strings import (
     NO_ACTIVE_GAME_MESSAGE,
     INVALID_GUESS_MESSAGE,
@@ -18,14 +20,16 @@ from src.config.strings import (
     WORD_SETTER_WIN_MESSAGE,
     OUT_OF_ATTEMPTS_MESSAGE,
     WORD_SETTER_LOSS_MESSAGE,
-    TRY_AGAIN_MESSAGE
+    TRY_AGAIN_MESSAGE,
+    UNKNOWN_GUESS_MESSAGE,
+    GAME_CHANGED_MESSAGE
 )
-from src.bot.handlers.game import get_random_gif
 from src.bot.commands import update_user_commands
+from src.bot.dispatcher import Priority, edit_message_text, reply_text, send_message
+from src.bot.media import media_cache
+from src.utils.logger import log_game_event
 
 
-game_log = logging.getLogger('game')
-
 async def handle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle player's guesses.
@@ -38,25 +42,40 @@ async def handle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     message = update.message.text.strip().lower()
 
     # Find the corresponding game
-    game = next(
-        (g for (w_s_username, g_username), g in games.items()
-         if g_username == guesser_username and g.state == 'waiting_for_guess'),
-        None
-    )
-    word_setter_username = next(
-        (w_s_username for (w_s_username, g_username), g in games.items()
-         if g_username == guesser_username and g.state == 'waiting_for_guess'),
-        None
-    )
+    game = await state.find_game(guesser_username, role='guesser', state='waiting_for_guess')
 
     if not game:
-        await update.message.reply_text(NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+        await reply_text(update.message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
         return
 
+    # Updates of one game are handled one at a time
+    async with state.lock(game) as game:
+        if game is None or game.state != 'waiting_for_guess':
+            await reply_text(update.message, NO_ACTIVE_GAME_MESSAGE, parse_mode='Markdown')
+            return
+        await _play_guess(update, context, game, message)
+
+
+async def _play_guess(update: Update, context: ContextTypes.DEFAULT_TYPE, game: Game, message: str) -> None:
+    """
+    Check and score a guess and report it to both players.
+    
+    The caller holds the game's lock.
+    
+    Args:
+        update: The update object from Telegram.
+        context: The context object for the callback.
+        game: The guesser's active game.
+        message: The guess, stripped and lowercased.
+    """
+    guesser_username = update.message.from_user.username
+    word_setter_username = game.word_setter_username
+
     secret_word = game.secret_word
 
     if len(message) != len(secret_word) or not message.isalpha():
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             INVALID_GUESS_MESSAGE.format(length=len(secret_word)),
             parse_mode='Markdown'
         )
@@ -64,208 +83,220 @@ async def handle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
     # Check the language of the guess
     language = game.language
-    if language == 'russian':
-        # Normalize 'ё' to 'е' before checking
-        normalized_message = message.replace('ё', 'е')
-        if not all('а' <= c <= 'я' for c in normalized_message):
-            await update.message.reply_text(INVALID_GUESS_LANGUAGE_MESSAGE, parse_mode='Markdown')
-            return
-    elif language == 'english':
-        if not all('a' <= c <= 'z' for c in message):
-            await update.message.reply_text(INVALID_GUESS_LANGUAGE_MESSAGE, parse_mode='Markdown')
-            return
+    if detect_language(message) != language:
+        await reply_text(update.message, INVALID_GUESS_LANGUAGE_MESSAGE, parse_mode='Markdown')
+        return
+
+    if not is_known_word(message, language):
+        await reply_text(update.message, UNKNOWN_GUESS_MESSAGE, parse_mode='Markdown')
+        return
 
     # Add logging for the attempt
-    game_log.info(
-        f"Guess attempt - Player: {guesser_username}, "
-        f"Secret word: {secret_word}, "
-        f"Guess: {message}, "
-        f"Attempt #{len(game.attempts) + 1}"
+    log_game_event(
+        'guess',
+        word_setter=word_setter_username,
+        guesser=guesser_username,
+        secret_word=secret_word,
+        guess=message,
+        language=language,
+        word_length=len(secret_word),
+        attempt=game.attempt_count + 1
     )
 
-    result, feedback, correct_letters, used_letters = get_feedback(secret_word, message)
-    game.attempts.append((result, feedback))
-
-    # Update lists of used and correct letters without duplicates
-    game.correct_letters.update(correct_letters - game.used_letters)
-    game.used_letters.update(used_letters - game.correct_letters)
+    # Score the guess and update the used and correct letters
+    result, feedback = game.add_attempt(message)
 
-    attempt_number = len(game.attempts)
+    attempt_number = game.attempt_count
 
-    # Form the message with the last attempt and number for the word setter
-    attempt_text_setter = ATTEMPT_MESSAGE.format(
+    # Form the message with the last attempt and number for both players
+    attempt_text = ATTEMPT_MESSAGE.format(
         attempt_number=attempt_number,
         max_attempts=game.max_attempts,
         result=result,
         feedback=feedback
     )
 
-    try:
-        await update.message.reply_text(attempt_text_setter, parse_mode='Markdown')
-    except telegram.error.TimedOut:
-        logging.warning("Timed out while sending attempt message, retrying...")
-        try:
-            await update.message.reply_text(attempt_text_setter, parse_mode='Markdown')
-        except telegram.error.TimedOut:
-            logging.error("Failed to send attempt message after retry")
-            await update.message.reply_text("Произошла ошибка при отправке сообщения. Пожалуйста, попробуйте еще раз.", parse_mode='Markdown')
-            return
-
-    # Form the message for the guesser with two columns
-    attempts_text = "\n".join(
-        f"`{attempt[0]}` | `{attempt[1]}`" for attempt in game.attempts
-    )
+    # Form the board for the guesser: attempts in two columns and the alphabet
+    board_text = game.render_board()
 
-    # Form the alphabet
-    if language == 'russian':
-        alphabet = RUSSIAN_ALPHABET
+    word_setter_chat_id = game.word_setter_chat_id
+    won = message.replace('ё', 'е').replace('Ё', 'Е') == secret_word.replace('ё', 'е').replace('Ё', 'Е')
+    if won:
+        # Log the successful completion of the game
+        log_game_event(
+            'game_won',
+            word_setter=word_setter_username,
+            guesser=guesser_username,
+            secret_word=secret_word,
+            language=language,
+            word_length=len(secret_word),
+            attempts=attempt_number,
+            max_attempts=game.max_attempts
+        )
+        guesser_outcome = GUESSER_WIN_MESSAGE
+        word_setter_outcome = WORD_SETTER_WIN_MESSAGE.format(guesser_username=guesser_username)
+    elif attempt_number >= game.max_attempts:
+        # Log the loss
+        log_game_event(
+            'game_lost',
+            word_setter=word_setter_username,
+            guesser=guesser_username,
+            secret_word=secret_word,
+            language=language,
+            word_length=len(secret_word),
+            attempts=attempt_number,
+            max_attempts=game.max_attempts
+        )
+        guesser_outcome = OUT_OF_ATTEMPTS_MESSAGE.format(secret_word=secret_word.upper())
+        word_setter_outcome = WORD_SETTER_LOSS_MESSAGE.format(guesser_username=guesser_username)
     else:
-        alphabet = ENGLISH_ALPHABET
-    correct_letters_display = " ".join(sorted(game.correct_letters))
-    used_letters_display = " ".join(sorted(game.used_letters))
-    remaining_letters = alphabet - game.correct_letters - game.used_letters
-    remaining_letters_display = " ".join(sorted(remaining_letters))
-
-    # Delete the previous message with attempts and alphabet if it exists
-    if 'last_attempt_message' in context.user_data:
-        try:
-            await context.bot.delete_message(
-                chat_id=update.message.chat_id,
-                message_id=context.user_data['last_attempt_message']
-            )
-        except Exception as e:
-            logging.warning(f"Failed to delete message: {e}")
+        remaining_attempts = game.max_attempts - attempt_number
+        guesser_outcome = TRY_AGAIN_MESSAGE.format(remaining_attempts=remaining_attempts)
+        word_setter_outcome = None
 
-    # Send the new message to the guesser
-    sent_message = await update.message.reply_text(
-        f"{attempts_text}\n\n{remaining_letters_display}\n\n🟩🟨: {correct_letters_display}\n\n⬜: {used_letters_display}",
-        parse_mode='Markdown'
-    )
+    # Store the guess, or the end of the game and the last partners, in one write
+    try:
+        async with state.batch():
+            if word_setter_outcome:
+                await state.delete_game(game)
+                await state.update_user(word_setter_username, word_setter_chat_id, guesser_username)
+                await state.update_user(guesser_username, update.message.chat_id, word_setter_username)
+            else:
+                await state.save_game(game)
+    except GameConflictError as e:
+        # Another instance handled an update of this game meanwhile; nothing was stored
+        logging.warning(f"Dropped a guess based on an outdated game: {e}")
+        await reply_text(update.message, GAME_CHANGED_MESSAGE, parse_mode='Markdown')
+        return
 
-    # Save the ID of the last message with attempts and alphabet
-    context.user_data['last_attempt_message'] = sent_message.message_id
+    # The guesser's chat gets the attempt, the board and the outcome in this
+    # order, while the word setter's notifications and the command menu
+    # updates run alongside
+    notifications = [
+        _update_guesser(update, context, attempt_text, board_text, guesser_outcome, won, attempt_number == 1),
+        _notify_word_setter(context, word_setter_chat_id, attempt_text, word_setter_outcome),
+    ]
+    if word_setter_outcome:
+        # Update commands for both players
+        notifications.append(update_user_commands(update, context))
+        # Create a fake update for the word setter to update their commands
+        word_setter_update = Update(0)
+        word_setter_update._effective_user = type('User', (), {'username': word_setter_username})()
+        word_setter_update._effective_chat = type('Chat', (), {'id': word_setter_chat_id})()
+        notifications.append(update_user_commands(word_setter_update, context))
 
-    # Send the attempt to the word setter with a note
-    word_setter_chat_id = game.word_setter_chat_id
+    # One failed notification must not cut the others short
+    for error in await asyncio.gather(*notifications, return_exceptions=True):
+        if isinstance(error, Exception):
+            logging.error("Failed to deliver a guess notification", exc_info=error)
+
+
+async def _update_guesser(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    attempt_text: str,
+    board_text: str,
+    outcome_text: str,
+    won: bool,
+    new_board: bool
+) -> None:
+    """
+    Send the attempt, the board and the outcome to the guesser.
+    
+    Args:
+        update: The update object from Telegram.
+        context: The context object for the callback.
+        attempt_text: The message with the scored attempt.
+        board_text: The board with all attempts and the alphabet.
+        outcome_text: The win, loss or try again message.
+        won: Whether to follow the outcome with a win GIF.
+        new_board: Whether to start a new board message instead of editing.
+    """
     try:
-        await context.bot.send_message(
-            chat_id=word_setter_chat_id,
-            text=ATTEMPT_MESSAGE.format(
-                attempt_number=attempt_number,
-                max_attempts=game.max_attempts,
-                result=result,
-                feedback=feedback
-            ),
-            parse_mode='Markdown'
-        )
+        await reply_text(update.message, attempt_text, Priority.BOARD, parse_mode='Markdown')
     except telegram.error.TimedOut:
-        logging.warning("Timed out while sending message to word setter, retrying...")
-        try:
-            await context.bot.send_message(
-                chat_id=word_setter_chat_id,
-                text=ATTEMPT_MESSAGE.format(
-                    attempt_number=attempt_number,
-                    max_attempts=game.max_attempts,
-                    result=result,
-                    feedback=feedback
-                ),
-                parse_mode='Markdown'
-            )
-        except telegram.error.TimedOut:
-            logging.error("Failed to send message to word setter after retry")
+        # The guess is already stored, so the board below still shows it
+        logging.error("Failed to send attempt message after retries")
 
-    if message.replace('ё', 'е').replace('Ё', 'Е') == secret_word.replace('ё', 'е').replace('Ё', 'Е'):
-        # Log the successful completion of the game
-        game_log.info(
-            f"Game won - Guesser: {guesser_username} won against {word_setter_username}, "
-            f"Secret word: {secret_word}, "
-            f"Attempts used: {attempt_number}/{game.max_attempts}"
-        )
+    await _update_board(update, context, board_text, new_board)
 
-        try:
-            # Send the message and GIF only to the guesser
-            await update.message.reply_text(GUESSER_WIN_MESSAGE, parse_mode='Markdown')
-            gif_path = get_random_gif(str(GIFS_DIR / 'win'))
-            if gif_path:
-                try:
-                    with open(gif_path, 'rb') as gif:
-                        await update.message.reply_animation(animation=gif)
-                except Exception as e:
-                    logging.error(f"Failed to send GIF: {e}")
-        except telegram.error.TimedOut:
-            logging.warning("Timed out while sending win message to guesser, retrying...")
+    try:
+        await reply_text(update.message, outcome_text, parse_mode='Markdown')
+        if won:
+            # Send the GIF only to the guesser
             try:
-                await update.message.reply_text(GUESSER_WIN_MESSAGE, parse_mode='Markdown')
-            except telegram.error.TimedOut:
-                logging.error("Failed to send win message to guesser after retry")
+                await media_cache.send_random_animation(update.message, GIFS_DIR / 'win')
+            except Exception as e:
+                logging.error(f"Failed to send GIF: {e}")
+    except telegram.error.TimedOut:
+        logging.error("Failed to send outcome message to guesser after retries")
+
 
+async def _update_board(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    board_text: str,
+    new_board: bool
+) -> None:
+    """
+    Show the board to the guesser, editing the board message in place.
+    
+    The edit is skipped when the text is unchanged. A new board message is
+    sent for the first attempt of a game and when the previous one cannot
+    be edited anymore, e.g. because it was deleted.
+    
+    Args:
+        update: The update object from Telegram.
+        context: The context object for the callback.
+        board_text: The board with all attempts and the alphabet.
+        new_board: Whether to start a new board message.
+    """
+    board_message_id = context.user_data.get('last_attempt_message')
+    if board_message_id is not None and not new_board:
+        if context.user_data.get('last_attempt_text') == board_text:
+            return
         try:
-            # Send only the text message to the word setter
-            await context.bot.send_message(
-                chat_id=word_setter_chat_id,
-                text=WORD_SETTER_WIN_MESSAGE.format(guesser_username=guesser_username),
+            await edit_message_text(
+                context.bot,
+                update.message.chat_id,
+                board_message_id,
+                board_text,
                 parse_mode='Markdown'
             )
-        except telegram.error.TimedOut:
-            logging.warning("Timed out while sending win message to word setter, retrying...")
-            try:
-                await context.bot.send_message(
-                    chat_id=word_setter_chat_id,
-                    text=WORD_SETTER_WIN_MESSAGE.format(guesser_username=guesser_username),
-                    parse_mode='Markdown'
-                )
-            except telegram.error.TimedOut:
-                logging.error("Failed to send win message to word setter after retry")
-        # Delete the game
-        delete_game(word_setter_username, guesser_username)
-
-        # Update the last partner
-        update_user_data(word_setter_username, word_setter_chat_id, guesser_username)
-        update_user_data(guesser_username, update.message.chat_id, word_setter_username)
+            context.user_data['last_attempt_text'] = board_text
+            return
+        except telegram.error.BadRequest as e:
+            if 'not modified' in str(e).lower():
+                context.user_data['last_attempt_text'] = board_text
+                return
+            logging.warning(f"Failed to edit the board, sending a new one: {e}")
 
-        # Update commands for both players
-        await update_user_commands(update, context)
-        # Create a fake update for the word setter to update their commands
-        word_setter_update = Update(0)
-        word_setter_update._effective_user = type('User', (), {'username': word_setter_username})()
-        word_setter_update._effective_chat = type('Chat', (), {'id': word_setter_chat_id})()
-        await update_user_commands(word_setter_update, context)
-    else:
-        if attempt_number >= game.max_attempts:
-            # Log the loss
-            game_log.info(
-                f"Game lost - Guesser: {guesser_username} lost against {word_setter_username}, "
-                f"Secret word: {secret_word}, "
-                f"All {game.max_attempts} attempts used"
-            )
+    # Send the new message to the guesser
+    sent_message = await reply_text(update.message, board_text, Priority.BOARD, parse_mode='Markdown')
 
-            await update.message.reply_text(
-                OUT_OF_ATTEMPTS_MESSAGE.format(secret_word=secret_word.upper()),
-                parse_mode='Markdown'
-            )
-            # Inform the word setter
-            await context.bot.send_message(
-                chat_id=word_setter_chat_id,
-                text=WORD_SETTER_LOSS_MESSAGE.format(guesser_username=guesser_username),
-                parse_mode='Markdown'
-            )
-            # Delete the game
-            delete_game(word_setter_username, guesser_username)
-
-            # Update the last partner
-            update_user_data(word_setter_username, word_setter_chat_id, guesser_username)
-            update_user_data(guesser_username, update.message.chat_id, word_setter_username)
-
-            # Update commands for both players
-            await update_user_commands(update, context)
-            # Create a fake update for the word setter to update their commands
-            word_setter_update = Update(0)
-            word_setter_update._effective_user = type('User', (), {'username': word_setter_username})()
-            word_setter_update._effective_chat = type('Chat', (), {'id': word_setter_chat_id})()
-            await update_user_commands(word_setter_update, context)
-        else:
-            remaining_attempts = game.max_attempts - attempt_number
-            await update.message.reply_text(
-                TRY_AGAIN_MESSAGE.format(remaining_attempts=remaining_attempts),
-                parse_mode='Markdown'
-            ) 
\ No newline at end of file
+    # Save the ID and text of the last message with attempts and alphabet
+    context.user_data['last_attempt_message'] = sent_message.message_id
+    context.user_data['last_attempt_text'] = board_text
+
+
+async def _notify_word_setter(
+    context: ContextTypes.DEFAULT_TYPE,
+    word_setter_chat_id: int,
+    attempt_text: str,
+    outcome_text: Optional[str]
+) -> None:
+    """
+    Send the attempt and, when the game is over, the outcome to the word setter.
+    
+    Args:
+        context: The context object for the callback.
+        word_setter_chat_id: The word setter's chat ID.
+        attempt_text: The message with the scored attempt.
+        outcome_text: The win or loss message, or None while the game goes on.
+    """
+    try:
+        await send_message(context.bot, word_setter_chat_id, attempt_text, parse_mode='Markdown')
+        if outcome_text:
+            await send_message(context.bot, word_setter_chat_id, outcome_text, parse_mode='Markdown')
+    except telegram.error.TimedOut:
+        logging.error("Failed to send message to word setter after retries")
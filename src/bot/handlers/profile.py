@@ -0,0 +1,89 @@
+"""Profile command handler for administrators."""
+
+import logging
+import math
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from src.config.settings import ADMIN_USERNAMES, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS
+from src.config.strings import (
+    PROFILE_ALREADY_RUNNING_MESSAGE,
+    PROFILE_FAILED_MESSAGE,
+    PROFILE_FINISHED_MESSAGE,
+    PROFILE_NOT_RUNNING_MESSAGE,
+    PROFILE_STARTED_MESSAGE,
+    PROFILE_USAGE_MESSAGE
+)
+from src.bot.dispatcher import Priority, reply_text, send_message
+from src.bot.profiling import HandlerProfile, current_profile, start_profiling
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handle the /profile command: profile the handlers for a while, or stop early.
+    
+    Only users listed in ADMIN_USERNAMES may profile; the command does
+    nothing for anyone else. The window must last a finite number of
+    seconds up to PROFILE_MAX_SECONDS. When it closes, the paths of the
+    report files in LOGS_DIR are sent to the administrator's chat.
+    
+    Args:
+        update: The update object from Telegram.
+        context: The context object for the callback.
+    """
+    username = update.effective_user.username if update.effective_user else None
+    if username not in ADMIN_USERNAMES:
+        logging.warning(f"Ignored /profile from non-admin user {username}")
+        return
+
+    argument = context.args[0].lower() if context.args else ''
+    if argument == 'stop':
+        profile = current_profile()
+        if profile is None:
+            await reply_text(update.message, PROFILE_NOT_RUNNING_MESSAGE)
+            return
+        # The report is sent by the task that started the window
+        await profile.stop()
+        return
+
+    usage = PROFILE_USAGE_MESSAGE.format(max_seconds=PROFILE_MAX_SECONDS)
+    try:
+        seconds = float(argument) if argument else PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        await reply_text(update.message, usage)
+        return
+    # float() also accepts "nan" and "inf", and an infinite window never closes
+    if not (math.isfinite(seconds) and 0 < seconds <= PROFILE_MAX_SECONDS):
+        await reply_text(update.message, usage)
+        return
+
+    profile = start_profiling(context.application, seconds)
+    if profile is None:
+        await reply_text(update.message, PROFILE_ALREADY_RUNNING_MESSAGE)
+        return
+    await reply_text(update.message, PROFILE_STARTED_MESSAGE.format(seconds=seconds))
+    context.application.create_task(
+        report_profile(context, profile, update.effective_chat.id), update=update
+    )
+
+
+async def report_profile(context: ContextTypes.DEFAULT_TYPE, profile: HandlerProfile, chat_id: int) -> None:
+    """
+    Tell the administrator where the report is once the window closes.
+    
+    Args:
+        context: The context object for the callback.
+        profile: The profiling window.
+        chat_id: The administrator's chat ID.
+    """
+    try:
+        collapsed_file, summary_file = await profile.wait()
+    except Exception:
+        await send_message(context.bot, chat_id, PROFILE_FAILED_MESSAGE, priority=Priority.CHATTER)
+        return
+    await send_message(
+        context.bot,
+        chat_id,
+        PROFILE_FINISHED_MESSAGE.format(summary_file=summary_file, collapsed_file=collapsed_file),
+        priority=Priority.CHATTER
+    )
@@ -4,14 +4,14 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-from src.core.game import games
-from src.core.user import user_data
+from src.core.state import state
 from src.config.strings import (
     NO_ACTIVE_GAME_MESSAGE_SAY,
     MESSAGE_RECEIVED,
     SAY_ENTER_MESSAGE,
     SAY_FAILED_TO_FIND_CHAT
 )
+from src.bot.dispatcher import Priority, delete_message, reply_text, send_message
 
 
 # Conversation stages
@@ -34,9 +34,10 @@ async def say_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
 
     # Delete the command message
     try:
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=update.effective_message.message_id
+        await delete_message(
+            context.bot,
+            update.effective_chat.id,
+            update.effective_message.message_id
         )
     except Exception as e:
         logging.warning(f"Failed to delete message: {e}")
@@ -45,15 +46,16 @@ async def say_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         # If text is provided with the command
         await send_say_message(update, context, message_text)
         try:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=update.effective_message.message_id
+            await delete_message(
+                context.bot,
+                update.effective_chat.id,
+                update.effective_message.message_id
             )
         except Exception as e:
             logging.warning(f"Failed to delete message: {e}")
     else:
         # If text is not provided, wait for the next message
-        await update.effective_message.reply_text(SAY_ENTER_MESSAGE)
+        await reply_text(update.effective_message, SAY_ENTER_MESSAGE)
         return SAY_WAITING_FOR_MESSAGE
 
 
@@ -71,13 +73,15 @@ async def receive_say_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     message_text = update.effective_message.text
     # Delete technical messages
     try:
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=update.effective_message.message_id
+        await delete_message(
+            context.bot,
+            update.effective_chat.id,
+            update.effective_message.message_id
         )
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=update.effective_message.message_id - 1
+        await delete_message(
+            context.bot,
+            update.effective_chat.id,
+            update.effective_message.message_id - 1
         )
     except Exception as e:
         logging.warning(f"Failed to delete message: {e}")
@@ -97,33 +101,30 @@ async def send_say_message(update: Update, context: ContextTypes.DEFAULT_TYPE, m
     """
     sender_username = update.effective_user.username
     # Find an active game involving the user
-    game = next(
-        (g for (w_s_username, g_username), g in games.items()
-         if (w_s_username == sender_username or g_username == sender_username)
-         and g.state == 'waiting_for_guess'),
-        None
-    )
+    game = await state.find_game(sender_username, state='waiting_for_guess')
 
     if not game:
-        await update.effective_message.reply_text(NO_ACTIVE_GAME_MESSAGE_SAY, parse_mode='Markdown')
+        await reply_text(update.effective_message, NO_ACTIVE_GAME_MESSAGE_SAY, parse_mode='Markdown')
         return
 
     if sender_username == game.word_setter_username:
         receiver_username = game.guesser_username
     else:
         receiver_username = game.word_setter_username
-    receiver_chat_id = user_data.get(receiver_username, {}).get('chat_id')
+    receiver_chat_id = await state.get_user_chat_id(receiver_username)
 
     if not receiver_chat_id:
-        await update.effective_message.reply_text(SAY_FAILED_TO_FIND_CHAT, parse_mode='Markdown')
+        await reply_text(update.effective_message, SAY_FAILED_TO_FIND_CHAT, parse_mode='Markdown')
         return
 
     sender_chat_id = update.effective_chat.id
 
     # Send the message to both players
     for chat_id in [receiver_chat_id, sender_chat_id]:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=MESSAGE_RECEIVED.format(sender_username=f"_{sender_username}_", message_text=message_text),
+        await send_message(
+            context.bot,
+            chat_id,
+            MESSAGE_RECEIVED.format(sender_username=f"_{sender_username}_", message_text=message_text),
+            priority=Priority.CHATTER,
             parse_mode='Markdown'
         ) 
\ No newline at end of file
@@ -4,8 +4,9 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from src.core.user import update_user_data
+from src.core.state import state
 from src.config.strings import START_MESSAGE, NO_USERNAME_MESSAGE
+from src.bot.dispatcher import reply_text
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -26,24 +27,27 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Check for username
     if not username:
         logging.warning("User without username tried to start bot")
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             NO_USERNAME_MESSAGE,
             parse_mode='Markdown'
         )
         return
 
     # Save user's chat_id
-    update_user_data(username, chat_id)
+    await state.update_user(username, chat_id)
     
     try:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             START_MESSAGE,
             parse_mode='HTML'
         )
         logging.info(f"Start message sent successfully to {username}")
     except Exception as e:
         logging.error(f"Error sending start message: {str(e)}")
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             START_MESSAGE,
             parse_mode=None
         )
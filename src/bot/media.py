@@ -0,0 +1,195 @@
+"""Cache of uploaded media, so each file is sent to Telegram only once."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import telegram
+
+from src.config.settings import MEDIA_CACHE_FILE
+from src.bot.dispatcher import Priority, reply_animation
+
+
+class MediaCache:
+    """
+    Index of media directories and the Telegram file IDs of their files.
+    
+    A directory is listed and its files are hashed once; the listing is
+    redone only when the directory's modification time changes, and only
+    new or modified files are hashed again. After the first upload of a
+    file its Telegram file_id is stored under the content hash, so later
+    sends reference the file_id instead of uploading the file again, also
+    after a restart or when the file is renamed.
+    
+    Hashing, reading and saving run in worker threads. Concurrent first
+    sends of the same file wait for a single upload and reuse its file_id.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.file_ids: Dict[str, str] = {}
+        # directory -> (directory mtime, [(file, size, mtime, content hash)])
+        self._directories: Dict[Path, Tuple[int, List[Tuple[Path, int, int, str]]]] = {}
+        # content hash -> lock held while the file is uploaded
+        self._uploads: Dict[str, asyncio.Lock] = {}
+        self._save_lock = asyncio.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.file_ids = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable media cache {self.path}: {e}")
+
+    def files(self, directory: Path, pattern: str = '*.gif') -> List[Tuple[Path, str]]:
+        """
+        List the files of a directory with their content hashes.
+        
+        Args:
+            directory: The media directory.
+            pattern: Glob pattern of the files to include.
+        
+        Returns:
+            List[Tuple[Path, str]]: The files and their SHA-256 hex digests.
+        """
+        directory = Path(directory)
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except OSError:
+            return []
+        cached = self._directories.get(directory)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, self._index(directory, pattern, cached[1] if cached else []))
+            self._directories[directory] = cached
+        return [(path, digest) for path, _, _, digest in cached[1]]
+
+    def _index(
+        self,
+        directory: Path,
+        pattern: str,
+        previous: List[Tuple[Path, int, int, str]]
+    ) -> List[Tuple[Path, int, int, str]]:
+        """Hash the files of a directory, reusing hashes of unchanged files."""
+        known = {path: (size, mtime, digest) for path, size, mtime, digest in previous}
+        entries = []
+        for path in sorted(directory.glob(pattern)):
+            try:
+                stat = path.stat()
+                size, mtime, digest = known.get(path, (None, None, None))
+                if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+                    with open(path, 'rb') as f:
+                        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+                entries.append((path, stat.st_size, stat.st_mtime_ns, digest))
+            except OSError as e:
+                logging.warning(f"Skipping unreadable media file {path}: {e}")
+        logging.info(f"Indexed {len(entries)} media files in {directory}")
+        return entries
+
+    def random_file(self, directory: Path, pattern: str = '*.gif') -> Optional[Tuple[Path, str]]:
+        """
+        Pick a random file of a directory.
+        
+        Args:
+            directory: The media directory.
+            pattern: Glob pattern of the files to choose from.
+        
+        Returns:
+            Optional[Tuple[Path, str]]: The file and its content hash, or None
+                if the directory has no matching files.
+        """
+        files = self.files(directory, pattern)
+        return random.choice(files) if files else None
+
+    async def remember(self, digest: str, file_id: str) -> None:
+        """
+        Store the file_id of an uploaded file and persist the cache.
+        
+        Args:
+            digest: Content hash of the file.
+            file_id: The file_id returned by Telegram.
+        """
+        self.file_ids[digest] = file_id
+        await self._persist()
+
+    async def forget(self, digest: str) -> None:
+        """Drop a file_id that Telegram no longer accepts."""
+        if self.file_ids.pop(digest, None) is not None:
+            await self._persist()
+
+    async def _persist(self) -> None:
+        """Save a snapshot of the file IDs in a worker thread, one save at a time."""
+        async with self._save_lock:
+            await asyncio.to_thread(self.save, dict(self.file_ids))
+
+    def save(self, file_ids: Optional[Dict[str, str]] = None) -> None:
+        """
+        Write the file IDs to disk atomically.
+        
+        Args:
+            file_ids: The file IDs to write, the current ones by default.
+        """
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.file_ids if file_ids is None else file_ids, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save media cache: {e}")
+
+    async def send_random_animation(
+        self,
+        message: telegram.Message,
+        directory: Path,
+        priority: Priority = Priority.NOTIFY
+    ) -> Optional[telegram.Message]:
+        """
+        Reply with a random animation of a directory.
+        
+        The animation is sent by its cached file_id when there is one and
+        uploaded otherwise. A cached file_id that Telegram rejects is
+        dropped and the file is uploaded again.
+        
+        Args:
+            message: The message to reply to.
+            directory: The directory to pick the animation from.
+            priority: The priority lane.
+        
+        Returns:
+            Optional[telegram.Message]: The sent message, or None if the
+                directory has no animations.
+        """
+        chosen = await asyncio.to_thread(self.random_file, directory)
+        if chosen is None:
+            return None
+        path, digest = chosen
+
+        file_id = self.file_ids.get(digest)
+        if file_id:
+            try:
+                return await reply_animation(message, file_id, priority)
+            except telegram.error.BadRequest as e:
+                logging.warning(f"Cached file_id of {path.name} was rejected, uploading again: {e}")
+                if self.file_ids.get(digest) == file_id:
+                    await self.forget(digest)
+
+        async with self._uploads.setdefault(digest, asyncio.Lock()):
+            file_id = self.file_ids.get(digest)
+            if not file_id:
+                data = await asyncio.to_thread(path.read_bytes)
+                sent = await reply_animation(message, data, priority, filename=path.name)
+                file_id = getattr(getattr(sent, 'animation', None), 'file_id', None)
+                if isinstance(file_id, str):
+                    await self.remember(digest, file_id)
+                return sent
+        # Uploaded by a concurrent send while this one waited
+        return await reply_animation(message, file_id, priority)
+
+
+# Global media cache
+media_cache = MediaCache(MEDIA_CACHE_FILE)
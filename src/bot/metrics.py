@@ -0,0 +1,240 @@
+"""Metrics of handlers and Bot API calls, and the /metrics endpoint."""
+
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from telegram.ext import BaseHandler, ConversationHandler
+from telegram.request import BaseRequest, RequestData
+
+from src.bot.dispatcher import Priority, dispatcher
+from src.config.settings import METRICS_LISTEN, METRICS_PORT
+from src.core.state import state
+from src.utils.metrics import (
+    ACTIVE_GAMES,
+    DISPATCHER_CALLS,
+    DISPATCHER_QUEUE_DEPTH,
+    HANDLER_LATENCY,
+    REGISTERED_USERS,
+    TELEGRAM_API_ERRORS,
+    TELEGRAM_API_LATENCY,
+    registry,
+)
+
+# Game states reported even when no game is in them
+GAME_STATES = ('waiting_for_word', 'waiting_for_guess')
+
+# Content type of the Prometheus text format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Callback = Callable[..., Awaitable[Any]]
+
+
+def instrument_handler(callback: Callback) -> Callback:
+    """
+    Wrap a handler callback to record its latency.
+    
+    The latency series is looked up here, once, under the callback's name.
+    
+    Args:
+        callback: The handler callback.
+    
+    Returns:
+        Callback: The wrapped callback, returning what the callback returns.
+    """
+    series = HANDLER_LATENCY.labels(callback.__name__)
+
+    @functools.wraps(callback)
+    async def timed(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            series.observe(time.perf_counter() - started)
+
+    return timed
+
+
+def iter_callback_handlers(handlers: Iterable[BaseHandler]) -> Iterator[BaseHandler]:
+    """
+    Walk handlers down to the ones that run callbacks.
+    
+    Conversation handlers are replaced by their entry point, state and
+    fallback handlers.
+    
+    Args:
+        handlers: The handlers to walk.
+    
+    Yields:
+        BaseHandler: Each handler with a callback, once.
+    """
+    seen = set()
+    pending = list(handlers)
+    while pending:
+        handler = pending.pop(0)
+        if id(handler) in seen:
+            continue
+        seen.add(id(handler))
+        if isinstance(handler, ConversationHandler):
+            nested = list(handler.entry_points)
+            for state_handlers in handler.states.values():
+                nested += state_handlers
+            pending[:0] = nested + list(handler.fallbacks)
+        else:
+            yield handler
+
+
+def instrument_handlers(handlers: List[BaseHandler]) -> List[BaseHandler]:
+    """
+    Record the latency of every callback of the handlers.
+    
+    Args:
+        handlers: The handlers, including conversation handlers.
+    
+    Returns:
+        List[BaseHandler]: The same handlers, with wrapped callbacks.
+    """
+    for handler in iter_callback_handlers(handlers):
+        handler.callback = instrument_handler(handler.callback)
+    return handlers
+
+
+class InstrumentedRequest(BaseRequest):
+    """
+    Request backend that records the calls of another one by Bot API method.
+    
+    Every call is timed, and calls that raise or get an error status count
+    as errors. The series of a method are looked up once per endpoint URL.
+    """
+
+    def __init__(self, request: BaseRequest) -> None:
+        self.request = request
+        self._series: Dict[str, Tuple[Any, Any]] = {}
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.request.read_timeout
+
+    async def initialize(self) -> None:
+        await self.request.initialize()
+
+    async def shutdown(self) -> None:
+        await self.request.shutdown()
+
+    def _method_series(self, url: str) -> Tuple[Any, Any]:
+        """Latency and error series of the method an endpoint URL calls."""
+        method = url.rsplit('/', 1)[-1]
+        series = self._series[url] = (TELEGRAM_API_LATENCY.labels(method), TELEGRAM_API_ERRORS.labels(method))
+        return series
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = BaseRequest.DEFAULT_NONE,
+        write_timeout: Any = BaseRequest.DEFAULT_NONE,
+        connect_timeout: Any = BaseRequest.DEFAULT_NONE,
+        pool_timeout: Any = BaseRequest.DEFAULT_NONE
+    ) -> Tuple[int, bytes]:
+        series = self._series.get(url)
+        if series is None:
+            series = self._method_series(url)
+        latency, errors = series
+        started = time.perf_counter()
+        try:
+            code, payload = await self.request.do_request(
+                url, method, request_data, read_timeout, write_timeout, connect_timeout, pool_timeout
+            )
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+        if code >= 400:
+            errors.inc()
+        return code, payload
+
+
+# Gauge series, refreshed when the metrics are scraped
+_game_series = {game_state: ACTIVE_GAMES.labels(game_state) for game_state in GAME_STATES}
+_users_series = REGISTERED_USERS.labels()
+
+
+async def collect_state() -> None:
+    """Set the game and user gauges from the state backend."""
+    counts = await state.count_games()
+    for game_state in counts.keys() - _game_series.keys():
+        _game_series[game_state] = ACTIVE_GAMES.labels(game_state)
+    for game_state, series in _game_series.items():
+        series.set(counts.get(game_state, 0))
+    _users_series.set(await state.count_users())
+
+
+registry.add_collector(collect_state)
+
+
+_depth_series = {priority.name.lower(): DISPATCHER_QUEUE_DEPTH.labels(priority.name.lower()) for priority in Priority}
+_call_series = {outcome: DISPATCHER_CALLS.labels(outcome) for outcome in ('sent', 'retried', 'failed')}
+
+
+async def collect_dispatcher() -> None:
+    """Set the queue depth gauges and call counters from the dispatcher."""
+    for lane, depth in dispatcher.queue_depth().items():
+        _depth_series[lane].set(depth)
+    stats = dispatcher.stats
+    # The dispatcher counts its calls itself; the counters mirror its totals
+    _call_series['sent'].value = stats.sent
+    _call_series['retried'].value = stats.retries
+    _call_series['failed'].value = stats.failures
+
+
+registry.add_collector(collect_dispatcher)
+
+
+class MetricsServer:
+    """aiohttp server that serves the metrics at /metrics for Prometheus to scrape."""
+
+    def __init__(self, host: str = METRICS_LISTEN, port: int = METRICS_PORT) -> None:
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        """
+        Build the aiohttp application with the metrics route.
+        
+        Returns:
+            web.Application: The web application.
+        """
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        return app
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """
+        Render the metrics.
+        
+        Args:
+            request: The incoming request.
+        
+        Returns:
+            web.Response: The metrics in the Prometheus text format.
+        """
+        body = await registry.render()
+        return web.Response(body=body.encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self) -> None:
+        """Start serving the metrics."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Metrics server listening on {self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,200 @@
+"""On-demand profiling of the registered handlers for a bounded window."""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.ext import Application, BaseHandler
+
+from src.bot.metrics import Callback, iter_callback_handlers
+from src.config.settings import LOGS_DIR, PROFILE_INTERVAL, PROFILE_TOP
+from src.utils.profiler import StackSampler
+
+
+class HandlerProfile:
+    """
+    A profiling window over an application's handlers.
+    
+    While the window is open, every handler callback is wrapped to time its
+    calls, and the event loop's thread is sampled whenever at least one
+    callback is running, so the samples show where handlers and the
+    dispatch around them spend their time. When it closes, the original
+    callbacks are put back and a report is written. Outside a window
+    nothing is wrapped or sampled.
+    
+    Attributes:
+        seconds: Length of the window.
+        sampler: The stack sampler of the event loop's thread.
+        durations: Seconds of each call by handler callback name.
+        files: The collapsed stacks and summary files, once written.
+    """
+
+    def __init__(self, application: Application, seconds: float, interval: float = PROFILE_INTERVAL) -> None:
+        self.application = application
+        self.seconds = seconds
+        self.sampler = StackSampler(threading.get_ident(), interval)
+        self.sampler.enabled = False
+        self.durations: Dict[str, List[float]] = {}
+        self.files: Optional[Tuple[Path, Path]] = None
+        self._originals: List[Tuple[BaseHandler, Callback]] = []
+        self._running = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._closing = False
+        self._done = asyncio.get_running_loop().create_future()
+
+    def _wrap(self, callback: Callback) -> Callback:
+        """Wrap a callback to time its calls and sample while it runs."""
+        durations = self.durations.setdefault(callback.__name__, [])
+
+        @functools.wraps(callback)
+        async def profiled(*args: Any, **kwargs: Any) -> Any:
+            self._running += 1
+            self.sampler.enabled = True
+            started = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - started)
+                self._running -= 1
+                if not self._running:
+                    self.sampler.enabled = False
+
+        return profiled
+
+    def start(self) -> None:
+        """Wrap the handlers, start sampling and schedule the end of the window."""
+        handlers = [handler for group in self.application.handlers.values() for handler in group]
+        for handler in iter_callback_handlers(handlers):
+            self._originals.append((handler, handler.callback))
+            handler.callback = self._wrap(handler.callback)
+        self.sampler.start()
+        self._timer = asyncio.get_running_loop().create_task(self._close_after_window())
+
+    @property
+    def closed(self) -> bool:
+        """Whether the window has closed or is writing its report."""
+        return self._closing
+
+    async def _close_after_window(self) -> None:
+        await asyncio.sleep(self.seconds)
+        try:
+            await self.stop()
+        except Exception:
+            logging.exception("Failed to write the handler profile")
+
+    async def stop(self) -> Tuple[Path, Path]:
+        """
+        Close the window early or when it ends, and write the report.
+        
+        Returns:
+            Tuple[Path, Path]: The collapsed stacks and summary files.
+        """
+        if self._closing:
+            return await self.wait()
+        self._closing = True
+        for handler, callback in self._originals:
+            handler.callback = callback
+        self._originals.clear()
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self.sampler.stop()
+        try:
+            self.files = await asyncio.to_thread(self.write_report, LOGS_DIR)
+        except Exception as e:
+            self._done.set_exception(e)
+            raise
+        self._done.set_result(self.files)
+        return self.files
+
+    async def wait(self) -> Tuple[Path, Path]:
+        """
+        Wait for the window to close.
+        
+        Returns:
+            Tuple[Path, Path]: The collapsed stacks and summary files.
+        """
+        return await asyncio.shield(self._done)
+
+    def summary(self, top: int = PROFILE_TOP) -> str:
+        """
+        Summarize the window: calls per handler and the most sampled functions.
+        
+        Args:
+            top: Number of functions to list.
+        
+        Returns:
+            str: The summary text.
+        """
+        sampler = self.sampler
+        lines = [
+            f"Handler profile: {sampler.elapsed:.1f} s, {sampler.samples} samples "
+            f"every {sampler.interval * 1000:g} ms while handlers ran",
+            "",
+            f"{'handler':30} {'calls':>7} {'mean ms':>9} {'max ms':>9} {'total s':>9}",
+        ]
+        for name, durations in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+            if durations:
+                lines.append(
+                    f"{name:30} {len(durations):7} {sum(durations) / len(durations) * 1000:9.2f} "
+                    f"{max(durations) * 1000:9.2f} {sum(durations):9.3f}"
+                )
+        own, total = sampler.top(top)
+        for title, functions in (("own", own), ("total", total)):
+            lines += ["", f"Top {top} functions by {title} samples", f"{'samples':>8} {'share':>7}  function"]
+            for function, count in functions:
+                lines.append(f"{count:8} {count / max(sampler.samples, 1):7.1%}  {function}")
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, directory: Path) -> Tuple[Path, Path]:
+        """
+        Write the collapsed stacks and the summary.
+        
+        Args:
+            directory: Directory of the report files.
+        
+        Returns:
+            Tuple[Path, Path]: The collapsed stacks and summary files.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}"
+        collapsed_file = directory / f'{name}.collapsed'
+        summary_file = directory / f'{name}.txt'
+        self.sampler.write(collapsed_file)
+        summary_file.write_text(self.summary(), encoding='utf-8')
+        logging.info(f"Wrote handler profile to {summary_file} and {collapsed_file}")
+        return collapsed_file, summary_file
+
+
+# The open profiling window, if any
+_profile: Optional[HandlerProfile] = None
+
+
+def current_profile() -> Optional[HandlerProfile]:
+    """The open profiling window, or None."""
+    return _profile if _profile is not None and not _profile.closed else None
+
+
+def start_profiling(application: Application, seconds: float) -> Optional[HandlerProfile]:
+    """
+    Open a profiling window over the application's handlers.
+    
+    Must be called from the event loop that runs the handlers.
+    
+    Args:
+        application: The application whose handlers are profiled.
+        seconds: Length of the window.
+    
+    Returns:
+        Optional[HandlerProfile]: The window, or None if one is already open.
+    """
+    global _profile
+    if current_profile() is not None:
+        return None
+    _profile = HandlerProfile(application, seconds)
+    _profile.start()
+    logging.info(f"Profiling handlers for {seconds:g} s")
+    return _profile
@@ -0,0 +1,508 @@
+"""Sharded mode: route updates to game worker processes.
+
+The main process receives updates, by polling or through the webhook
+server, and forwards each one to a worker process chosen by a stable hash of
+the sender's username. Every worker runs the normal application with its own
+game registry and journal, so it owns the games of its shard.
+
+A game has two players, who may hash to different shards. Before a worker
+creates a game it claims both players from the router. The router pins the
+players to that worker until the game ends, so the guesser's messages reach
+the worker that owns the game. A claim is denied while one of the players is
+pinned to another worker, i.e. is playing a game owned by another shard.
+
+Messages between the router and the workers are tuples on multiprocessing
+queues:
+
+    router -> worker: ('update', data), ('claimed', request_id, granted), ('stop',)
+    worker -> router: ('claim', shard, request_id, usernames), ('pin', shard, usernames),
+                      ('release', usernames), ('processed', shard, count)
+
+User records and command menus are shared through the SQLite user store,
+which every process opens. Workers write their user changes through to it
+as they are made, so no worker reads a record another one has only
+buffered.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ContextTypes, TypeHandler
+from telegram.request import BaseRequest
+
+from src.bot.commands import DEFAULT_COMMANDS
+from src.bot.webhook import WebhookServer, stop_on_signals
+from src.config.settings import BOT_MODE, JOURNAL_DIR, TELEGRAM_BOT_TOKEN, WEBHOOK_URL
+
+
+# Seconds a worker waits for the router to answer a claim
+CLAIM_TIMEOUT = 5.0
+
+# Seconds between reports of processed updates from a worker
+PROGRESS_INTERVAL = 0.05
+
+
+def shard_of(username: str, shards: int) -> int:
+    """
+    Map a username to its home shard.
+    
+    The hash is CRC-32 rather than hash(), which is salted per process.
+    
+    Args:
+        username: The username.
+        shards: Number of shards.
+    
+    Returns:
+        int: The shard number.
+    """
+    return zlib.crc32(username.encode('utf-8')) % shards
+
+
+def update_sender(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Find the routing key of an update: the sender's username or ID.
+    
+    Args:
+        data: The update as Telegram posts it.
+    
+    Returns:
+        Optional[str]: The username, the user ID for users without a
+            username, or None for updates without a sender.
+    """
+    for value in data.values():
+        if isinstance(value, dict) and isinstance(value.get('from'), dict):
+            sender = value['from']
+            return sender.get('username') or str(sender.get('id'))
+    return None
+
+
+class RoutingTable:
+    """
+    Maps users to shards: pinned users to their game's shard, others by hash.
+    
+    A user is pinned once per active game and unpinned when the game ends,
+    so a user with several games on one shard stays pinned until the last
+    one ends.
+    """
+
+    def __init__(self, shards: int) -> None:
+        self.shards = shards
+        self._lock = threading.Lock()
+        # username -> [shard, number of active games]
+        self._pins: Dict[str, List[int]] = {}
+
+    def route(self, username: Optional[str]) -> int:
+        """
+        Choose the shard for a user's update.
+        
+        Args:
+            username: The routing key, or None for updates without a sender.
+        
+        Returns:
+            int: The shard number.
+        """
+        if username is None:
+            return 0
+        pin = self._pins.get(username)
+        return pin[0] if pin is not None else shard_of(username, self.shards)
+
+    def claim(self, usernames: Iterable[str], shard: int) -> bool:
+        """
+        Pin users to a shard for a new game.
+        
+        Args:
+            usernames: The players of the game.
+            shard: The shard that owns the game.
+        
+        Returns:
+            bool: False, and nothing is pinned, if a player is pinned to
+                another shard.
+        """
+        usernames = list(usernames)
+        with self._lock:
+            if any(name in self._pins and self._pins[name][0] != shard for name in usernames):
+                return False
+            self._pin(usernames, shard)
+            return True
+
+    def pin(self, usernames: Iterable[str], shard: int) -> None:
+        """
+        Pin users to a shard unconditionally, e.g. for a recovered game.
+        
+        Args:
+            usernames: The players of the game.
+            shard: The shard that owns the game.
+        """
+        with self._lock:
+            self._pin(usernames, shard)
+
+    def _pin(self, usernames: Iterable[str], shard: int) -> None:
+        for name in usernames:
+            pin = self._pins.setdefault(name, [shard, 0])
+            pin[0] = shard
+            pin[1] += 1
+
+    def release(self, usernames: Iterable[str]) -> None:
+        """
+        Unpin users when a game ends.
+        
+        Args:
+            usernames: The players of the game.
+        """
+        with self._lock:
+            for name in usernames:
+                pin = self._pins.get(name)
+                if pin is not None:
+                    pin[1] -= 1
+                    if pin[1] <= 0:
+                        del self._pins[name]
+
+
+class ShardClient:
+    """Worker side of the protocol: claims and releases players."""
+
+    def __init__(self, shard: int, outbox: Any) -> None:
+        self.shard = shard
+        self.outbox = outbox
+        self._requests = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    async def claim(self, usernames: Iterable[str]) -> bool:
+        """
+        Ask the router to pin players to this worker.
+        
+        Args:
+            usernames: The players of the new game.
+        
+        Returns:
+            bool: Whether the claim was granted; False if the router does
+                not answer in time.
+        """
+        request_id = next(self._requests)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.outbox.put(('claim', self.shard, request_id, list(usernames)))
+        try:
+            return await asyncio.wait_for(future, CLAIM_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.error(f"Shard {self.shard}: claim of {usernames} timed out")
+            return False
+        finally:
+            self._pending.pop(request_id, None)
+
+    def resolve(self, request_id: int, granted: bool) -> None:
+        """Complete a pending claim with the router's answer."""
+        future = self._pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(granted)
+
+    def pin(self, usernames: Iterable[str]) -> None:
+        """Pin the players of a game this worker already owns."""
+        self.outbox.put(('pin', self.shard, list(usernames)))
+
+    def release(self, usernames: Iterable[str]) -> None:
+        """Unpin the players of a game that ended."""
+        self.outbox.put(('release', list(usernames)))
+
+
+# Client of the running worker; None when the bot is not sharded
+shard_client: Optional[ShardClient] = None
+
+
+async def claim_players(*usernames: str) -> bool:
+    """
+    Claim the players of a new game for this process.
+    
+    Args:
+        *usernames: The players.
+    
+    Returns:
+        bool: True if the game may be created here. Always True when the
+            bot is not sharded.
+    """
+    if shard_client is None:
+        return True
+    return await shard_client.claim(usernames)
+
+
+class ShardEvents:
+    """
+    Journal wrapper that releases the players of games that end.
+    
+    It is attached as the game registry's journal and forwards every event
+    to the real journal, if any.
+    """
+
+    def __init__(self, journal: Optional[Any], client: ShardClient) -> None:
+        self.journal = journal
+        self.client = client
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """
+        Forward an event and release the players of a finished game.
+        
+        Args:
+            event: The event record.
+        """
+        if self.journal is not None:
+            self.journal.append(event)
+        if event['type'] in ('cancel', 'finish'):
+            self.client.release(event['game'])
+
+
+def _worker_main(
+    shard: int,
+    shards: int,
+    inbox: Any,
+    outbox: Any,
+    request_factory: Optional[Callable[[], BaseRequest]] = None
+) -> None:
+    """
+    Entry point of a worker process.
+    
+    Args:
+        shard: The worker's shard number.
+        shards: Number of shards.
+        inbox: Queue of messages from the router.
+        outbox: Queue of messages to the router.
+        request_factory: Creates the request backend for Bot API calls;
+            HTTPX when None.
+    """
+    try:
+        asyncio.run(_run_worker(shard, shards, inbox, outbox, request_factory))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(
+    shard: int,
+    shards: int,
+    inbox: Any,
+    outbox: Any,
+    request_factory: Optional[Callable[[], BaseRequest]]
+) -> None:
+    """Run the application of one shard until the router stops it."""
+    global shard_client
+    # Imported here, src.main imports this module
+    from src.main import build_application
+    from src.bot.dispatcher import dispatcher
+    from src.bot.handlers.game import notify_dropped_games
+    from src.core.game import games
+    from src.core.journal import open_game_journal
+    from src.core import user as user_module
+    from src.core.user import start_user_data_flusher, stop_user_data_flusher
+    from src.utils.logger import setup_logger, stop_game_log
+
+    setup_logger()
+    # All workers send as the same bot, under one global Bot API limit
+    dispatcher.share_global_limit(shards)
+    # Other workers read users and command menus from the shared database
+    user_module.write_through = True
+    start_user_data_flusher()
+    journal = open_game_journal(games, JOURNAL_DIR / f'shard-{shard}')
+    shard_client = ShardClient(shard, outbox)
+    games.journal = ShardEvents(journal, shard_client)
+    for game in games.values():
+        shard_client.pin([game.word_setter_username, game.guesser_username])
+
+    application = build_application(request_factory() if request_factory else None)
+    processed = 0
+
+    async def count_processed(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal processed
+        processed += 1
+
+    application.add_handler(TypeHandler(Update, count_processed), group=1)
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+
+    def handle(message: Tuple[Any, ...]) -> None:
+        if message[0] == 'update':
+            application.update_queue.put_nowait(Update.de_json(message[1], application.bot))
+        elif message[0] == 'claimed':
+            shard_client.resolve(message[1], message[2])
+        elif message[0] == 'stop':
+            stopped.set()
+
+    def read_inbox() -> None:
+        while True:
+            message = inbox.get()
+            loop.call_soon_threadsafe(handle, message)
+            if message[0] == 'stop':
+                break
+
+    threading.Thread(target=read_inbox, name=f'shard-{shard}-inbox', daemon=True).start()
+
+    try:
+        async with application:
+            await application.start()
+            logging.info(f"Shard {shard}: running with {len(games)} recovered games")
+            await notify_dropped_games(application.bot, journal.dropped_games)
+            reported = 0
+            while not stopped.is_set():
+                try:
+                    await asyncio.wait_for(stopped.wait(), PROGRESS_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                if processed != reported:
+                    reported = processed
+                    outbox.put(('processed', shard, processed))
+            await application.stop()
+    finally:
+        stop_user_data_flusher()
+        journal.close()
+        stop_game_log()
+
+
+class ShardRouter:
+    """
+    Router side: worker processes, their queues and the routing table.
+    
+    Attributes:
+        workers: Number of worker processes.
+        table: The routing table.
+        processed: Number of updates each worker reported as processed.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        request_factory: Optional[Callable[[], BaseRequest]] = None
+    ) -> None:
+        self.workers = workers
+        self.request_factory = request_factory
+        self.table = RoutingTable(workers)
+        self.processed = [0] * workers
+        self._context = multiprocessing.get_context('spawn')
+        self._inboxes: List[Any] = []
+        self._outbox: Any = None
+        self._processes: List[Any] = []
+        self._control: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the worker processes and the control thread."""
+        self._outbox = self._context.Queue()
+        for shard in range(self.workers):
+            inbox = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(shard, self.workers, inbox, self._outbox, self.request_factory),
+                name=f'shard-{shard}',
+                daemon=True
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+        self._control = threading.Thread(target=self._control_loop, name='shard-router', daemon=True)
+        self._control.start()
+
+    def dispatch(self, data: Dict[str, Any]) -> int:
+        """
+        Forward an update to the worker that owns its sender.
+        
+        Args:
+            data: The update as Telegram posts it.
+        
+        Returns:
+            int: The shard the update was sent to.
+        """
+        shard = self.table.route(update_sender(data))
+        self._inboxes[shard].put(('update', data))
+        return shard
+
+    async def forward(self, update_queue: asyncio.Queue) -> None:
+        """
+        Forward the updates of a receiving application's queue forever.
+        
+        Args:
+            update_queue: Queue that the poller or webhook server fills.
+        """
+        while True:
+            update = await update_queue.get()
+            if isinstance(update, Update):
+                self.dispatch(update.to_dict())
+
+    def _control_loop(self) -> None:
+        """Answer claims and apply pins, releases and progress reports."""
+        while True:
+            try:
+                message = self._outbox.get()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == 'claim':
+                _, shard, request_id, usernames = message
+                granted = self.table.claim(usernames, shard)
+                self._inboxes[shard].put(('claimed', request_id, granted))
+            elif kind == 'pin':
+                self.table.pin(message[2], message[1])
+            elif kind == 'release':
+                self.table.release(message[1])
+            elif kind == 'processed':
+                self.processed[message[1]] = message[2]
+            elif kind == 'stop':
+                break
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the workers, letting them finish their queued updates.
+        
+        Args:
+            timeout: Seconds to wait for each worker before terminating it.
+        """
+        for inbox in self._inboxes:
+            inbox.put(('stop',))
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._outbox is not None:
+            self._outbox.put(('stop',))
+        if self._control is not None:
+            self._control.join(timeout)
+
+
+async def run_sharded(workers: int) -> None:
+    """
+    Receive updates in this process and route them to game workers.
+    
+    Runs until SIGINT or SIGTERM.
+    
+    Args:
+        workers: Number of worker processes.
+    """
+    router = ShardRouter(workers)
+    router.start()
+    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    stop = stop_on_signals()
+    server = None
+
+    try:
+        async with application:
+            await application.bot.set_my_commands([
+                (cmd.command, cmd.description) for cmd in DEFAULT_COMMANDS
+            ])
+            if BOT_MODE == 'webhook':
+                server = WebhookServer(application)
+                await server.start()
+                await server.set_webhook(WEBHOOK_URL)
+            else:
+                await application.updater.start_polling(drop_pending_updates=True)
+
+            forwarder = asyncio.create_task(router.forward(application.update_queue))
+            await stop.wait()
+            forwarder.cancel()
+
+            if server is not None:
+                await server.stop()
+            else:
+                await application.updater.stop()
+    finally:
+        router.stop()
@@ -0,0 +1,163 @@
+"""Webhook mode: receive updates through an embedded aiohttp server."""
+
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import signal
+from typing import Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from src.config.settings import (
+    WEBHOOK_LISTEN,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL
+)
+
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """
+    aiohttp server that feeds updates posted by Telegram into an application.
+    
+    The request handler checks the secret token, parses the update and puts
+    it on the application's update queue, then answers right away. The
+    update is processed later by the running application, so a slow handler
+    never delays the acknowledgement Telegram waits for.
+    
+    Every request must carry the secret token. Without a configured one, a
+    random token is generated for the lifetime of the server and passed to
+    Telegram by set_webhook, so the endpoint is never left open.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        path: str = WEBHOOK_PATH,
+        secret_token: str = WEBHOOK_SECRET_TOKEN,
+        host: str = WEBHOOK_LISTEN,
+        port: int = WEBHOOK_PORT
+    ) -> None:
+        self.application = application
+        self.path = path
+        if not secret_token:
+            secret_token = secrets.token_urlsafe(32)
+            logging.info("WEBHOOK_SECRET_TOKEN is not set, using a generated secret token")
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        """
+        Build the aiohttp application with the webhook route.
+        
+        Returns:
+            web.Application: The web application.
+        """
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """
+        Accept one update posted by Telegram.
+        
+        Args:
+            request: The incoming request.
+        
+        Returns:
+            web.Response: 200 once the update is queued, 403 for a wrong
+                secret token and 400 for a body that is not an update.
+        """
+        if not hmac.compare_digest(
+            request.headers.get(SECRET_TOKEN_HEADER, ''), self.secret_token
+        ):
+            logging.warning(f"Rejected webhook request from {request.remote} with a wrong secret token")
+            return web.Response(status=403)
+
+        try:
+            data = json.loads(await request.read())
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logging.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        self.application.update_queue.put_nowait(update)
+        return web.Response(status=200)
+
+    async def start(self) -> None:
+        """Start listening for updates."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def set_webhook(self, url: str) -> None:
+        """
+        Tell Telegram to post updates to this server.
+        
+        Args:
+            url: Public base URL of the server; the webhook path is appended.
+        """
+        if not url:
+            raise ValueError("WEBHOOK_URL must be set in webhook mode")
+        await self.application.bot.set_webhook(
+            url=url + self.path,
+            secret_token=self.secret_token,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True
+        )
+
+
+def stop_on_signals() -> asyncio.Event:
+    """
+    Create an event that is set on SIGINT or SIGTERM.
+    
+    Returns:
+        asyncio.Event: The stop event.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return stop
+
+
+async def run_webhook(application: Application, url: str = WEBHOOK_URL) -> None:
+    """
+    Run the application in webhook mode until SIGINT or SIGTERM.
+    
+    Args:
+        application: The configured application.
+        url: Public base URL that Telegram posts updates to.
+    """
+    server = WebhookServer(application)
+    stop = stop_on_signals()
+
+    async with application:
+        await application.start()
+        await server.start()
+        try:
+            await server.set_webhook(url)
+            await stop.wait()
+        finally:
+            await server.stop()
+            await application.stop()
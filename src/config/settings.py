@@ -22,15 +22,103 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
 USER_DATA_FILE: Final[Path] = Path(os.getenv('USER_DATA_FILE', DATA_DIR / 'user_data.json'))
+USER_DB_FILE: Final[Path] = Path(os.getenv('USER_DB_FILE', DATA_DIR / 'user_data.sqlite3'))
 GAME_LOGS_FILE: Final[Path] = Path(os.getenv('GAME_LOGS_FILE', LOGS_DIR / 'game_logs.log'))
 
+# Level of the game event log; WARNING or above turns game events off
+GAME_LOG_LEVEL: Final[str] = os.getenv('GAME_LOG_LEVEL', 'INFO').upper()
+
+# Game log rotation: the live file is rotated once it reaches
+# GAME_LOG_MAX_BYTES or is GAME_LOG_ROTATE_INTERVAL seconds old (0 turns a
+# threshold off), rotated files are gzipped in the background and the
+# newest GAME_LOG_BACKUPS of them are kept (0 keeps all)
+GAME_LOG_MAX_BYTES: Final[int] = int(os.getenv('GAME_LOG_MAX_BYTES', 50 * 1024 * 1024))
+GAME_LOG_ROTATE_INTERVAL: Final[float] = float(os.getenv('GAME_LOG_ROTATE_INTERVAL', 24 * 60 * 60))
+GAME_LOG_BACKUPS: Final[int] = int(os.getenv('GAME_LOG_BACKUPS', 30))
+
+JOURNAL_DIR: Final[Path] = Path(os.getenv('JOURNAL_DIR', DATA_DIR / 'journal'))
+
+# Where game and user state is kept: 'memory' (games in process, with the
+# journal, and users in USER_DB_FILE), 'sqlite' (games and users in
+# USER_DB_FILE, shared by bot instances on one host) or 'redis' (shared
+# through the Redis server at REDIS_URL, under keys starting with REDIS_PREFIX)
+STATE_BACKEND: Final[str] = os.getenv('STATE_BACKEND', 'memory').lower()
+REDIS_URL: Final[str] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_PREFIX: Final[str] = os.getenv('REDIS_PREFIX', 'wordle:')
+
+# Seconds between background writes of changed user data
+USER_DATA_FLUSH_INTERVAL: Final[float] = float(os.getenv('USER_DATA_FLUSH_INTERVAL', 2.0))
+
+# Game journal: seconds of events committed with one fsync, and events
+# between snapshots
+JOURNAL_COMMIT_INTERVAL: Final[float] = float(os.getenv('JOURNAL_COMMIT_INTERVAL', 0.05))
+JOURNAL_COMPACT_EVENTS: Final[int] = int(os.getenv('JOURNAL_COMPACT_EVENTS', 50000))
+
 GIFS_DIR: Final[Path] = Path(os.getenv('GIFS_DIR', BASE_DIR / 'gif'))
+# Telegram file IDs of uploaded GIFs, keyed by content hash
+MEDIA_CACHE_FILE: Final[Path] = Path(os.getenv('MEDIA_CACHE_FILE', DATA_DIR / 'media_cache.json'))
+
+# Dictionary check for secret words and guesses (opt-in, see scripts/build_dictionary.py)
+DICTIONARY_DIR: Final[Path] = Path(os.getenv('DICTIONARY_DIR', DATA_DIR / 'dictionaries'))
+DICTIONARY_CHECK: Final[bool] = os.getenv('DICTIONARY_CHECK', 'false').lower() in ('1', 'true', 'yes')
+
+# How updates are received: 'polling' or 'webhook'. In webhook mode an
+# embedded server listens on WEBHOOK_LISTEN:WEBHOOK_PORT at WEBHOOK_PATH,
+# and Telegram is told to post updates to WEBHOOK_URL + WEBHOOK_PATH
+BOT_MODE: Final[str] = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL: Final[str] = os.getenv('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_PATH: Final[str] = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_LISTEN: Final[str] = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT: Final[int] = int(os.getenv('WEBHOOK_PORT', 8080))
+WEBHOOK_SECRET_TOKEN: Final[str] = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+
+# Prometheus metrics are served at /metrics on METRICS_LISTEN:METRICS_PORT;
+# 0 turns the endpoint off
+METRICS_LISTEN: Final[str] = os.getenv('METRICS_LISTEN', '0.0.0.0')
+METRICS_PORT: Final[int] = int(os.getenv('METRICS_PORT', 0))
+
+# Profiling of the handlers: PROFILE_ON_START seconds are profiled right
+# after start (0 for none), and the usernames in ADMIN_USERNAMES (comma
+# separated) may profile PROFILE_DEFAULT_SECONDS, or up to
+# PROFILE_MAX_SECONDS, with /profile. The stack is sampled every
+# PROFILE_INTERVAL seconds and reports go to LOGS_DIR with the
+# PROFILE_TOP most expensive functions
+ADMIN_USERNAMES: Final[frozenset] = frozenset(
+    name.strip().lstrip('@') for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()
+)
+PROFILE_ON_START: Final[float] = float(os.getenv('PROFILE_ON_START', 0))
+PROFILE_DEFAULT_SECONDS: Final[float] = float(os.getenv('PROFILE_DEFAULT_SECONDS', 30))
+PROFILE_MAX_SECONDS: Final[float] = float(os.getenv('PROFILE_MAX_SECONDS', 300))
+PROFILE_INTERVAL: Final[float] = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_TOP: Final[int] = int(os.getenv('PROFILE_TOP', 30))
+
+# Number of game worker processes. With more than one, the main process
+# routes updates to workers that each own a shard of the games
+SHARD_WORKERS: Final[int] = int(os.getenv('SHARD_WORKERS', 1))
+
+# Outbound message limits: per-chat and global messages per second and
+# bursts, and the retry policy for flood limits and network errors
+SEND_CHAT_RATE: Final[float] = float(os.getenv('SEND_CHAT_RATE', 1.0))
+SEND_CHAT_BURST: Final[float] = float(os.getenv('SEND_CHAT_BURST', 5))
+SEND_GLOBAL_RATE: Final[float] = float(os.getenv('SEND_GLOBAL_RATE', 30.0))
+SEND_GLOBAL_BURST: Final[float] = float(os.getenv('SEND_GLOBAL_BURST', 30))
+SEND_MAX_RETRIES: Final[int] = int(os.getenv('SEND_MAX_RETRIES', 3))
+SEND_RETRY_BASE_DELAY: Final[float] = float(os.getenv('SEND_RETRY_BASE_DELAY', 0.5))
 
 # Game settings
 MAX_ATTEMPTS: Final[int] = int(os.getenv('MAX_ATTEMPTS', 6))
 MIN_WORD_LENGTH: Final[int] = int(os.getenv('MIN_WORD_LENGTH', 4))
 MAX_WORD_LENGTH: Final[int] = int(os.getenv('MAX_WORD_LENGTH', 8))
 
-# Alphabets
-RUSSIAN_ALPHABET: Final[set[str]] = set('АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
-ENGLISH_ALPHABET: Final[set[str]] = set('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+# Pattern codes of guesses are unsigned 32-bit integers, one base-3 digit per
+# letter, so longer words do not fit
+MAX_PATTERN_LENGTH: Final[int] = 20
+if not 1 <= MIN_WORD_LENGTH <= MAX_WORD_LENGTH <= MAX_PATTERN_LENGTH:
+    raise ValueError(
+        f"Word lengths must satisfy 1 <= MIN_WORD_LENGTH <= MAX_WORD_LENGTH <= {MAX_PATTERN_LENGTH}, "
+        f"got {MIN_WORD_LENGTH} and {MAX_WORD_LENGTH}"
+    )
+
+# Alphabets, in display order
+RUSSIAN_ALPHABET: Final[str] = 'АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+ENGLISH_ALPHABET: Final[str] = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
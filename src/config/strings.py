@@ -35,6 +35,10 @@ WORD_SETTER_LOSS_MESSAGE = (
 )
 TRY_AGAIN_MESSAGE = "Попробуйте еще раз. Осталось попыток: {remaining_attempts}"
 CANCEL_MESSAGE = "Игра прервана."
+GAME_DROPPED_ON_RESTART_MESSAGE = (
+    "Бот перезапустился, пока загадывалось слово, и игра с {partner_username} прервана. "
+    "Начни новую игру командой /new_game."
+)
 MIXED_LANGUAGE_MESSAGE = "Слово должно содержать только русские или только английские буквы. Попробуйте снова."
 INVALID_GUESS_LANGUAGE_MESSAGE = "Пожалуйста, используйте буквы из того же алфавита, что и загаданное слово."
 ERROR_MESSAGE = "Произошла ошибка. Попробуйте начать новую игру."
@@ -52,11 +56,23 @@ LANGUAGE_STRINGS = {
 NO_ACTIVE_GAME_MESSAGE_SAY = "Вы можете использовать команду /say только во время активной игры."
 MESSAGE_RECEIVED = "**{sender_username}**: {message_text}"
 
-RUSSIAN_ALPHABET = set("АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ")
-ENGLISH_ALPHABET = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+RUSSIAN_ALPHABET = "АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+ENGLISH_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
 ADDTRY_ADDED_MESSAGE = "Вы добавили одну дополнительную попытку угадывающему игроку."
 ADDTRY_RECEIVED_MESSAGE = "Загадывающий игрок добавил вам одну дополнительную попытку."
 
 SAY_ENTER_MESSAGE = "Введите сообщение, которое хотите отправить:"
 SAY_FAILED_TO_FIND_CHAT = "Не удалось найти чат другого игрока."
+
+UNKNOWN_WORD_MESSAGE = "Такого слова нет в словаре. Загадай другое слово."
+UNKNOWN_GUESS_MESSAGE = "Такого слова нет в словаре. Попробуйте другое слово."
+GAME_CHANGED_MESSAGE = "Игра изменилась, пока обрабатывалось ваше сообщение. Отправьте его еще раз."
+GAME_ALREADY_EXISTS_MESSAGE = "Игра с {second_player} уже идет."
+
+PROFILE_STARTED_MESSAGE = "Профилирование обработчиков запущено на {seconds:g} с."
+PROFILE_ALREADY_RUNNING_MESSAGE = "Профилирование уже идет. Остановить: /profile stop"
+PROFILE_NOT_RUNNING_MESSAGE = "Профилирование не запущено."
+PROFILE_USAGE_MESSAGE = "Использование: /profile [секунды, не больше {max_seconds:g}] или /profile stop"
+PROFILE_FINISHED_MESSAGE = "Профилирование завершено.\nСводка: {summary_file}\nСтеки для flamegraph: {collapsed_file}"
+PROFILE_FAILED_MESSAGE = "Не удалось записать отчет профилирования."
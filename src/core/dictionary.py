@@ -0,0 +1,273 @@
+"""Dictionary of valid words for secret words and guesses."""
+
+import logging
+import mmap
+import re
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config.settings import (
+    DICTIONARY_CHECK,
+    DICTIONARY_DIR,
+    ENGLISH_ALPHABET,
+    MAX_WORD_LENGTH,
+    MIN_WORD_LENGTH,
+    RUSSIAN_ALPHABET
+)
+
+
+# File layout:
+#   header:  magic, version, alphabet size, number of sections
+#   section: word length, word count, offset of the first word
+#   buckets: per section, alphabet size + 1 word indexes by first letter
+#   words:   per section, sorted fixed-width words, one byte per letter
+MAGIC = b'WDIC'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHH')
+_SECTION = struct.Struct('<HII')
+_BUCKET = struct.Struct('<I')
+
+ALPHABETS: Dict[str, str] = {
+    'russian': RUSSIAN_ALPHABET,
+    'english': ENGLISH_ALPHABET,
+}
+
+_YO_TRANSLATION = str.maketrans('ёЁ', 'еЕ')
+
+# Lowercase letters of each language, 'ё' included in Russian
+_LANGUAGE_PATTERNS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('russian', re.compile('[а-яё]+')),
+    ('english', re.compile('[a-z]+')),
+)
+
+
+def detect_language(word: str) -> Optional[str]:
+    """
+    Get the language a lowercase word is written in.
+    
+    Args:
+        word: The word.
+    
+    Returns:
+        Optional[str]: 'russian' or 'english', or None if the word mixes
+            alphabets or has other characters.
+    """
+    for language, pattern in _LANGUAGE_PATTERNS:
+        if pattern.fullmatch(word):
+            return language
+    return None
+
+
+def _letter_codes(alphabet: str) -> Dict[str, int]:
+    """Map the letters of an alphabet, in either case, to one-byte codes."""
+    codes = {}
+    for index, letter in enumerate(alphabet, start=1):
+        codes[letter] = index
+        codes[letter.lower()] = index
+    return codes
+
+
+def encode_word(word: str, codes: Dict[str, int]) -> Optional[bytes]:
+    """
+    Encode a word as one byte per letter, normalizing 'Ё' to 'Е'.
+    
+    Args:
+        word: The word to encode.
+        codes: Letter codes of the dictionary alphabet.
+    
+    Returns:
+        Optional[bytes]: The encoded word, or None if it has letters outside
+            the alphabet.
+    """
+    try:
+        return bytes([codes[c] for c in word.translate(_YO_TRANSLATION)])
+    except KeyError:
+        return None
+
+
+class _WordsView:
+    """Sequence view over the fixed-width words of one section, for bisect."""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, length: int) -> None:
+        self.buffer = buffer
+        self.offset = offset
+        self.length = length
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self.offset + index * self.length
+        return self.buffer[start:start + self.length]
+
+
+class WordDictionary:
+    """
+    Memory-mapped dictionary of words of one language.
+    
+    Words are grouped by length into sorted arrays of fixed-width records
+    with one byte per letter, and each group has an index by first letter.
+    A lookup narrows to the word's length and first letter and then runs a
+    binary search over the mapped file. Nothing is parsed up front, so
+    loading takes one mmap call, and processes mapping the same file share
+    its pages.
+    """
+
+    def __init__(self, path: Path, alphabet: str) -> None:
+        self.path = Path(path)
+        self.codes = _letter_codes(alphabet)
+        with open(self.path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, alphabet_size, section_count = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a word dictionary")
+        if alphabet_size != len(alphabet):
+            raise ValueError(f"{self.path} was built for a different alphabet")
+
+        self._sections: Dict[int, Tuple[int, int, int]] = {}
+        position = _HEADER.size
+        bucket_offset = _HEADER.size + section_count * _SECTION.size
+        for _ in range(section_count):
+            length, count, words_offset = _SECTION.unpack_from(self._buffer, position)
+            self._sections[length] = (count, words_offset, bucket_offset)
+            position += _SECTION.size
+            bucket_offset += (alphabet_size + 1) * _BUCKET.size
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        section = self._sections.get(len(word))
+        encoded = encode_word(word, self.codes)
+        if section is None or not encoded:
+            return False
+
+        count, words_offset, bucket_offset = section
+        first = encoded[0]
+        low = _BUCKET.unpack_from(self._buffer, bucket_offset + (first - 1) * _BUCKET.size)[0]
+        high = _BUCKET.unpack_from(self._buffer, bucket_offset + first * _BUCKET.size)[0]
+        words = _WordsView(self._buffer, words_offset, len(encoded))
+        index = bisect_left(words, encoded, low, high)
+        return index < high and words[index] == encoded
+
+    def __len__(self) -> int:
+        return sum(count for count, _, _ in self._sections.values())
+
+    def close(self) -> None:
+        """Unmap the dictionary file."""
+        self._buffer.close()
+
+
+def build_dictionary(
+    words: Iterable[str],
+    alphabet: str,
+    output_path: Path,
+    min_length: int = MIN_WORD_LENGTH,
+    max_length: int = MAX_WORD_LENGTH
+) -> int:
+    """
+    Build a dictionary file from a list of words.
+    
+    Words are normalized to lowercase with 'ё' replaced by 'е'. Words with
+    letters outside the alphabet or lengths outside the limits are skipped.
+    
+    Args:
+        words: The words to include.
+        alphabet: The ordered alphabet of the language.
+        output_path: Where to write the dictionary.
+        min_length: Shortest word length to include.
+        max_length: Longest word length to include.
+    
+    Returns:
+        int: Number of distinct words written.
+    """
+    codes = _letter_codes(alphabet)
+    by_length: Dict[int, set] = {length: set() for length in range(min_length, max_length + 1)}
+    for word in words:
+        word = word.strip()
+        if len(word) not in by_length:
+            continue
+        encoded = encode_word(word, codes)
+        if encoded:
+            by_length[len(word)].add(encoded)
+
+    alphabet_size = len(alphabet)
+    lengths = sorted(by_length)
+    header = _HEADER.pack(MAGIC, VERSION, alphabet_size, len(lengths))
+    words_offset = (
+        len(header)
+        + len(lengths) * _SECTION.size
+        + len(lengths) * (alphabet_size + 1) * _BUCKET.size
+    )
+
+    sections: List[bytes] = []
+    buckets: List[bytes] = []
+    blobs: List[bytes] = []
+    for length in lengths:
+        sorted_words = sorted(by_length[length])
+        sections.append(_SECTION.pack(length, len(sorted_words), words_offset))
+        # bucket[c - 1] is the index of the first word starting with letter code c
+        starts = [0] * (alphabet_size + 1)
+        for encoded in sorted_words:
+            starts[encoded[0]] += 1
+        total = 0
+        for code in range(alphabet_size + 1):
+            total, starts[code] = total + starts[code], total
+        starts.append(len(sorted_words))
+        buckets.append(b''.join(_BUCKET.pack(start) for start in starts[1:]))
+        blob = b''.join(sorted_words)
+        blobs.append(blob)
+        words_offset += len(blob)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.writelines(sections)
+        f.writelines(buckets)
+        f.writelines(blobs)
+    tmp_path.replace(output_path)
+    return sum(len(group) for group in by_length.values())
+
+
+_dictionaries: Dict[str, Optional[WordDictionary]] = {}
+
+
+def get_dictionary(language: str) -> Optional[WordDictionary]:
+    """
+    Get the dictionary of a language, mapping it on first use.
+    
+    Args:
+        language: Language of the dictionary (russian or english).
+    
+    Returns:
+        Optional[WordDictionary]: The dictionary, or None if it was not built.
+    """
+    if language not in _dictionaries:
+        path = DICTIONARY_DIR / f'{language}.dict'
+        try:
+            _dictionaries[language] = WordDictionary(path, ALPHABETS[language])
+        except (OSError, ValueError) as e:
+            logging.warning(f"Dictionary check disabled for {language}: {e}")
+            _dictionaries[language] = None
+    return _dictionaries[language]
+
+
+def is_known_word(word: str, language: str) -> bool:
+    """
+    Check a word against the dictionary of its language.
+    
+    Words are always accepted when dictionary checks are disabled or the
+    language has no dictionary.
+    
+    Args:
+        word: The word to check.
+        language: Language of the word (russian or english).
+    
+    Returns:
+        bool: True if the word may be used.
+    """
+    if not DICTIONARY_CHECK:
+        return True
+    dictionary = get_dictionary(language)
+    return dictionary is None or word in dictionary
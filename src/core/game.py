@@ -1,16 +1,115 @@
 """Core game logic and state management."""
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Tuple, Literal
+import asyncio
+from array import array
+from collections.abc import MutableMapping
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Literal
 
-from src.config.settings import MAX_ATTEMPTS
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional and only speeds up get_feedback_many
+    np = None
+
+from src.config.settings import ENGLISH_ALPHABET, MAX_ATTEMPTS, MAX_PATTERN_LENGTH, RUSSIAN_ALPHABET
+
+
+# Letter marks used in feedback patterns
+GREY, YELLOW, GREEN = 0, 1, 2
+FEEDBACK_SQUARES: Tuple[str, str, str] = ("⬜", "🟨", "🟩")
+
+_YO_TRANSLATION = str.maketrans('ёЁ', 'еЕ')
+
+
+# Ordered letter tables used to map letters to bit positions
+_ALPHABET_TABLES: Dict[str, str] = {
+    'russian': RUSSIAN_ALPHABET,
+    'english': ENGLISH_ALPHABET,
+}
+_LETTER_BITS: Dict[str, Dict[str, int]] = {
+    language: {letter: 1 << index for index, letter in enumerate(table)}
+    for language, table in _ALPHABET_TABLES.items()
+}
+_FULL_MASKS: Dict[str, int] = {
+    language: (1 << len(table)) - 1
+    for language, table in _ALPHABET_TABLES.items()
+}
+
+
+def letters_to_mask(language: Optional[str], letters: Iterable[str]) -> int:
+    """
+    Convert uppercase letters to a bitmask over the language alphabet.
+    
+    Args:
+        language: Language of the alphabet (russian or english).
+        letters: Uppercase letters; letters outside the alphabet are ignored.
+        
+    Returns:
+        int: The letter bitmask.
+    """
+    bits = _LETTER_BITS.get(language, {})
+    mask = 0
+    for letter in letters:
+        mask |= bits.get(letter, 0)
+    return mask
+
+
+def mask_to_letters(language: Optional[str], mask: int) -> Set[str]:
+    """
+    Convert a bitmask over the language alphabet back to uppercase letters.
+    
+    Args:
+        language: Language of the alphabet (russian or english).
+        mask: The letter bitmask.
+        
+    Returns:
+        Set[str]: The letters whose bits are set.
+    """
+    table = _ALPHABET_TABLES.get(language, "")
+    return {letter for index, letter in enumerate(table) if mask >> index & 1}
+
+
+@lru_cache(maxsize=4096)
+def render_letters(language: Optional[str], mask: int) -> str:
+    """
+    Render the letters of a bitmask in alphabet order, separated by spaces.
+    
+    Rendered lines are cached, since games repeatedly show the same letters.
+    
+    Args:
+        language: Language of the alphabet (russian or english).
+        mask: The letter bitmask.
+        
+    Returns:
+        str: The letters, e.g. "А В Г".
+    """
+    table = _ALPHABET_TABLES.get(language, "")
+    return " ".join([letter for index, letter in enumerate(table) if mask >> index & 1])
+
+
+@lru_cache(maxsize=4096)
+def _render_board_footer(language: Optional[str], correct_mask: int, used_mask: int) -> str:
+    """Render the alphabet part of the guesser's board for the given letter masks."""
+    remaining_mask = _FULL_MASKS.get(language, 0) & ~(correct_mask | used_mask)
+    return (
+        f"\n\n{render_letters(language, remaining_mask)}"
+        f"\n\n🟩🟨: {render_letters(language, correct_mask)}"
+        f"\n\n⬜: {render_letters(language, used_mask)}"
+    )
 
 
-@dataclass
 class Game:
     """
     Represents a game session between two players.
     
+    The game is stored compactly: letter sets are bitmasks over the language
+    alphabet, and attempts are kept as one string of concatenated guesses plus
+    an array of base-3 pattern codes, unsigned 32-bit so words of up to
+    MAX_PATTERN_LENGTH letters fit. The emoji feedback is rendered only when
+    the attempts are displayed, and the rendered board rows are kept, so each
+    row is formatted once.
+    
     Attributes:
         word_setter_username: Username of the player who sets the word.
         guesser_username: Username of the player who guesses the word.
@@ -18,27 +117,552 @@ class Game:
         guesser_chat_id: Chat ID of the guesser.
         secret_word: The word to be guessed.
         state: Current state of the game.
-        attempts: List of attempts made by the guesser.
         max_attempts: Maximum number of attempts allowed.
         language: Language of the game (russian or english).
-        correct_letters: Set of correctly guessed letters.
-        used_letters: Set of used letters.
+        correct_mask: Bitmask of correctly guessed letters.
+        used_mask: Bitmask of used letters.
+        revision: Stamp of the stored state the game was loaded from, set by
+            state backends that keep games outside this process.
+        version: Number of stored writes of the game, checked by those
+            backends so a write based on an outdated copy is rejected.
+        stored_state: State of the game in storage, or None before it is
+            stored, so those backends can keep counts of games by state.
     """
-    word_setter_username: str
-    guesser_username: str
-    word_setter_chat_id: int
-    guesser_chat_id: int
-    secret_word: str = ""
-    state: str = "waiting_for_word"
-    attempts: List[Tuple[str, str]] = field(default_factory=list)
-    max_attempts: int = MAX_ATTEMPTS
-    language: Optional[str] = None
-    correct_letters: Set[str] = field(default_factory=set)
-    used_letters: Set[str] = field(default_factory=set)
+    __slots__ = (
+        'word_setter_username',
+        'guesser_username',
+        'word_setter_chat_id',
+        'guesser_chat_id',
+        'secret_word',
+        'max_attempts',
+        'language',
+        'correct_mask',
+        'used_mask',
+        'revision',
+        'version',
+        'stored_state',
+        '_state',
+        '_guesses',
+        '_patterns',
+        '_board_prefix',
+        '_board_rows',
+        '_registry',
+    )
+
+    def __init__(
+        self,
+        word_setter_username: str,
+        guesser_username: str,
+        word_setter_chat_id: int,
+        guesser_chat_id: int,
+        secret_word: str = "",
+        state: str = "waiting_for_word",
+        max_attempts: int = MAX_ATTEMPTS,
+        language: Optional[str] = None
+    ) -> None:
+        self.word_setter_username = word_setter_username
+        self.guesser_username = guesser_username
+        self.word_setter_chat_id = word_setter_chat_id
+        self.guesser_chat_id = guesser_chat_id
+        self.secret_word = secret_word
+        self.max_attempts = max_attempts
+        self.language = language
+        self.correct_mask = 0
+        self.used_mask = 0
+        self.revision = 0
+        self.version = 0
+        self.stored_state: Optional[str] = None
+        self._state = state
+        self._guesses = ""
+        self._patterns = array('I')
+        self._board_prefix: Optional[str] = None
+        self._board_rows = 0
+        self._registry: Optional["GameRegistry"] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"Game(word_setter_username={self.word_setter_username!r}, "
+            f"guesser_username={self.guesser_username!r}, "
+            f"state={self._state!r}, language={self.language!r}, "
+            f"attempts={len(self._patterns)}/{self.max_attempts})"
+        )
+
+    @property
+    def state(self) -> str:
+        """Current state of the game."""
+        return self._state
+
+    @state.setter
+    def state(self, value: str) -> None:
+        old_state = self._state
+        self._state = value
+        if self._registry is not None and old_state != value:
+            self._registry._reindex_state(self, old_state, value)
+
+    @property
+    def attempt_count(self) -> int:
+        """Number of attempts made so far."""
+        return len(self._patterns)
+
+    @property
+    def attempts(self) -> List[Tuple[str, str]]:
+        """Attempts made by the guesser as (result, feedback) pairs."""
+        length = len(self.secret_word)
+        guesses = self._guesses
+        return [
+            (guesses[i * length:(i + 1) * length], pattern_to_feedback(code, length))
+            for i, code in enumerate(self._patterns)
+        ]
+
+    @property
+    def correct_letters(self) -> Set[str]:
+        """Set of correctly guessed letters."""
+        return mask_to_letters(self.language, self.correct_mask)
+
+    @property
+    def used_letters(self) -> Set[str]:
+        """Set of used letters."""
+        return mask_to_letters(self.language, self.used_mask)
+
+    @property
+    def remaining_mask(self) -> int:
+        """Bitmask of letters that have not been tried yet."""
+        return _FULL_MASKS.get(self.language, 0) & ~(self.correct_mask | self.used_mask)
+
+    def render_alphabet(self) -> Tuple[str, str, str]:
+        """
+        Render the alphabet state shown under the guesser's board.
+        
+        Returns:
+            Tuple[str, str, str]: The remaining, correct and used letters,
+                each in alphabet order and separated by spaces.
+        """
+        return (
+            render_letters(self.language, self.remaining_mask),
+            render_letters(self.language, self.correct_mask),
+            render_letters(self.language, self.used_mask),
+        )
+
+    def render_board(self) -> str:
+        """
+        Render the guesser's board: one row per attempt, then the alphabet.
+        
+        The rows rendered so far are kept and only rows of new attempts are
+        formatted, so the cost of a guess does not grow with the number of
+        earlier attempts. The alphabet footer depends only on the letter
+        masks and comes from a cache. The board does not show the attempt
+        limit, so /addtry leaves it valid.
+        
+        Returns:
+            str: The board text in Markdown.
+        """
+        count = len(self._patterns)
+        if self._board_prefix is None or self._board_rows > count:
+            self._board_prefix = ""
+            self._board_rows = 0
+        if self._board_rows < count:
+            length = len(self.secret_word)
+            guesses = self._guesses
+            rows = [
+                f"`{guesses[i * length:(i + 1) * length]}` | `{pattern_to_feedback(self._patterns[i], length)}`"
+                for i in range(self._board_rows, count)
+            ]
+            if self._board_prefix:
+                rows.insert(0, self._board_prefix)
+            self._board_prefix = "\n".join(rows)
+            self._board_rows = count
+        return self._board_prefix + _render_board_footer(self.language, self.correct_mask, self.used_mask)
+
+    def add_attempt(self, guess: str) -> Tuple[str, str]:
+        """
+        Score a guess against the secret word and record it.
+        
+        Letters already known to be in the word are not added to the used
+        letters, and letters already known to be absent are not added to the
+        correct letters.
+        
+        Args:
+            guess: The guessed word, the same length as the secret word.
+            
+        Returns:
+            Tuple[str, str]: The guess result and its feedback squares.
+        """
+        guess = _normalize(guess)
+        marks = _score(_normalize(self.secret_word), guess)
+        result = guess.upper()
+
+        bits = _LETTER_BITS.get(self.language, {})
+        correct_mask = 0
+        used_mask = 0
+        for letter, mark in zip(result, marks):
+            if mark == GREY:
+                used_mask |= bits.get(letter, 0)
+            else:
+                correct_mask |= bits.get(letter, 0)
+        self.correct_mask |= correct_mask & ~self.used_mask
+        self.used_mask |= used_mask & ~self.correct_mask
+
+        code = encode_pattern(marks)
+        self._guesses += result
+        self._patterns.append(code)
+        if self._registry is not None:
+            self._registry.record('guess', self, guess=guess)
+        return result, pattern_to_feedback(code, len(marks))
+
+    def set_word(self, word: str, language: str) -> None:
+        """
+        Set the secret word and start the guessing stage.
+        
+        Args:
+            word: The secret word.
+            language: Language of the word (russian or english).
+        """
+        self.secret_word = word
+        self.language = language
+        self.state = 'waiting_for_guess'
+        if self._registry is not None:
+            self._registry.record('word', self, word=word, language=language)
+
+    def add_try(self) -> None:
+        """Give the guesser one more attempt."""
+        self.max_attempts += 1
+        if self._registry is not None:
+            self._registry.record('addtry', self)
+
+    def to_record(self) -> list:
+        """
+        Capture the game as a JSON-serializable record.
+        
+        Returns:
+            list: The game fields in a fixed order, see from_record.
+        """
+        return [
+            self.word_setter_username,
+            self.guesser_username,
+            self.word_setter_chat_id,
+            self.guesser_chat_id,
+            self.secret_word,
+            self._state,
+            self.max_attempts,
+            self.language,
+            self.correct_mask,
+            self.used_mask,
+            self._guesses,
+            self._patterns.tolist(),
+        ]
+
+    def snapshot(self) -> tuple:
+        """
+        Capture the game cheaply, to be turned into a record later.
+        
+        Only the pattern array is copied, as one block, so a snapshot can be
+        taken on the event loop and converted by record_from_snapshot on
+        another thread.
+        
+        Returns:
+            tuple: The fields of to_record, with the pattern codes as an array.
+        """
+        return (
+            self.word_setter_username,
+            self.guesser_username,
+            self.word_setter_chat_id,
+            self.guesser_chat_id,
+            self.secret_word,
+            self._state,
+            self.max_attempts,
+            self.language,
+            self.correct_mask,
+            self.used_mask,
+            self._guesses,
+            self._patterns[:],
+        )
+
+    @staticmethod
+    def record_from_snapshot(snapshot: tuple) -> list:
+        """
+        Turn a snapshot into the record to_record would have made.
+        
+        Args:
+            snapshot: A snapshot from Game.snapshot.
+        
+        Returns:
+            list: The record, see to_record.
+        """
+        return [*snapshot[:-1], snapshot[-1].tolist()]
+
+    @classmethod
+    def from_record(cls, record: Sequence[Any]) -> "Game":
+        """
+        Rebuild a game from a record made by to_record.
+        
+        Args:
+            record: The game record.
+            
+        Returns:
+            Game: The restored game, not attached to any registry.
+        """
+        (word_setter_username, guesser_username, word_setter_chat_id, guesser_chat_id,
+         secret_word, state, max_attempts, language, correct_mask, used_mask,
+         guesses, patterns) = record
+        game = cls(
+            word_setter_username,
+            guesser_username,
+            word_setter_chat_id,
+            guesser_chat_id,
+            secret_word=secret_word,
+            state=state,
+            max_attempts=max_attempts,
+            language=language
+        )
+        game.correct_mask = correct_mask
+        game.used_mask = used_mask
+        game._guesses = guesses
+        game._patterns = array('I', patterns)
+        return game
+
+
+GameKey = Tuple[str, str]
+
+
+@asynccontextmanager
+async def keyed_lock(locks: Dict[Any, List[Any]], key: Any) -> AsyncIterator[None]:
+    """
+    Hold the lock of one key out of a table of locks.
+    
+    The table maps keys to [lock, number of holders and waiters]. A lock is
+    created on first use and dropped when nobody holds or waits for it, so
+    the table only grows with the keys in use.
+    
+    Args:
+        locks: The lock table.
+        key: The key to lock.
+    """
+    entry = locks.get(key)
+    if entry is None:
+        entry = locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and locks.get(key) is entry:
+            del locks[key]
+
+
+class GameRegistry(MutableMapping):
+    """
+    Registry of active games keyed by (word_setter_username, guesser_username).
+
+    Besides the primary mapping, the registry maintains secondary indexes by
+    word setter, by guesser, by participant and by state, so that handlers can
+    find a user's game without scanning every active game. The indexes are
+    insertion-ordered, which keeps lookups returning the same game the old
+    linear scans over the dictionary returned.
+    
+    When a journal is attached, game events are appended to it (see
+    src.core.journal) so active games survive restarts.
+    """
+
+    def __init__(self) -> None:
+        self.journal: Optional[Any] = None
+        self._games: Dict[GameKey, Game] = {}
+        self._by_word_setter: Dict[str, Dict[GameKey, None]] = {}
+        self._by_guesser: Dict[str, Dict[GameKey, None]] = {}
+        self._by_participant: Dict[str, Dict[GameKey, None]] = {}
+        self._by_state: Dict[str, Dict[GameKey, None]] = {}
+        # game key -> [lock, number of holders and waiters]
+        self._locks: Dict[GameKey, List[Any]] = {}
+
+    @staticmethod
+    def _index_add(index: Dict[str, Dict[GameKey, None]], name: str, key: GameKey) -> None:
+        index.setdefault(name, {})[key] = None
+
+    @staticmethod
+    def _index_remove(index: Dict[str, Dict[GameKey, None]], name: str, key: GameKey) -> None:
+        keys = index.get(name)
+        if keys is None:
+            return
+        keys.pop(key, None)
+        if not keys:
+            del index[name]
+
+    def __getitem__(self, key: GameKey) -> Game:
+        return self._games[key]
+
+    def __setitem__(self, key: GameKey, game: Game) -> None:
+        if key in self._games:
+            del self[key]
+        word_setter_username, guesser_username = key
+        self._games[key] = game
+        self._index_add(self._by_word_setter, word_setter_username, key)
+        self._index_add(self._by_guesser, guesser_username, key)
+        self._index_add(self._by_participant, word_setter_username, key)
+        self._index_add(self._by_participant, guesser_username, key)
+        self._index_add(self._by_state, game.state, key)
+        game._registry = self
+
+    def __delitem__(self, key: GameKey) -> None:
+        game = self._games.pop(key)
+        word_setter_username, guesser_username = key
+        self._index_remove(self._by_word_setter, word_setter_username, key)
+        self._index_remove(self._by_guesser, guesser_username, key)
+        self._index_remove(self._by_participant, word_setter_username, key)
+        self._index_remove(self._by_participant, guesser_username, key)
+        self._index_remove(self._by_state, game.state, key)
+        if game._registry is self:
+            game._registry = None
+
+    def __iter__(self) -> Iterator[GameKey]:
+        return iter(self._games)
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._games
+
+    def clear(self) -> None:
+        """Remove all games and reset the indexes."""
+        for game in self._games.values():
+            game._registry = None
+        self._games.clear()
+        self._by_word_setter.clear()
+        self._by_guesser.clear()
+        self._by_participant.clear()
+        self._by_state.clear()
+
+    @asynccontextmanager
+    async def lock(self, game: Game) -> AsyncIterator[bool]:
+        """
+        Serialize updates of one game across await points.
+        
+        Handlers run concurrently, so a handler that awaits while working on
+        a game holds its lock to keep other updates of the same game out.
+        Games of other players are not affected.
+        
+        Args:
+            game: The game to lock.
+        
+        Yields:
+            bool: Whether the game is still active once the lock is held. It
+                may have ended while waiting for the lock.
+        """
+        key = (game.word_setter_username, game.guesser_username)
+        async with keyed_lock(self._locks, key):
+            yield self._games.get(key) is game
+
+    def record(self, event_type: str, game: Game, **fields: Any) -> None:
+        """
+        Append a game event to the attached journal, if any.
+        
+        Args:
+            event_type: The event type (create, word, guess, addtry, cancel, finish).
+            game: The game the event belongs to.
+            **fields: Event-specific data.
+        """
+        if self.journal is not None:
+            self.journal.append({
+                'type': event_type,
+                'game': [game.word_setter_username, game.guesser_username],
+                **fields
+            })
+
+    def _reindex_state(self, game: Game, old_state: str, new_state: str) -> None:
+        """Move a game between state buckets after its state changed."""
+        key = (game.word_setter_username, game.guesser_username)
+        if self._games.get(key) is not game:
+            return
+        self._index_remove(self._by_state, old_state, key)
+        self._index_add(self._by_state, new_state, key)
+
+    def _find(
+        self,
+        index: Dict[str, Dict[GameKey, None]],
+        username: str,
+        state: Optional[str]
+    ) -> Optional[Game]:
+        for key in index.get(username, ()):
+            game = self._games[key]
+            if state is None or game.state == state:
+                return game
+        return None
+
+    def find_by_word_setter(self, username: str, state: Optional[str] = None) -> Optional[Game]:
+        """
+        Find a game in which the user sets the word.
+
+        Args:
+            username: Username of the word setter.
+            state: Optional state the game must be in.
+
+        Returns:
+            Optional[Game]: The first matching game, or None.
+        """
+        return self._find(self._by_word_setter, username, state)
+
+    def find_by_guesser(self, username: str, state: Optional[str] = None) -> Optional[Game]:
+        """
+        Find a game in which the user guesses the word.
+
+        Args:
+            username: Username of the guesser.
+            state: Optional state the game must be in.
+
+        Returns:
+            Optional[Game]: The first matching game, or None.
+        """
+        return self._find(self._by_guesser, username, state)
+
+    def find_by_participant(self, username: str, state: Optional[str] = None) -> Optional[Game]:
+        """
+        Find a game in which the user takes part in either role.
+
+        Args:
+            username: Username of the player.
+            state: Optional state the game must be in.
+
+        Returns:
+            Optional[Game]: The first matching game, or None.
+        """
+        return self._find(self._by_participant, username, state)
+
+    def count_by_state(self, state: str) -> int:
+        """
+        Count the games currently in the given state.
+
+        Args:
+            state: The game state.
+
+        Returns:
+            int: Number of games in that state.
+        """
+        return len(self._by_state.get(state, ()))
+
+    def state_counts(self) -> Dict[str, int]:
+        """
+        Count the games in each state.
+
+        Returns:
+            Dict[str, int]: Number of games by state, for states that have games.
+        """
+        return {state: len(keys) for state, keys in self._by_state.items()}
+
+    def games_by_state(self, state: str) -> List[Game]:
+        """
+        Get the games currently in the given state.
+
+        Args:
+            state: The game state.
+
+        Returns:
+            List[Game]: Games in that state, in creation order.
+        """
+        return [self._games[key] for key in self._by_state.get(state, ())]
 
 
 # Global game state
-games: Dict[Tuple[str, str], Game] = {}
+games: GameRegistry = GameRegistry()
 
 
 def create_game(
@@ -66,6 +690,11 @@ def create_game(
         guesser_chat_id=guesser_chat_id
     )
     games[(word_setter_username, guesser_username)] = game
+    games.record(
+        'create', game,
+        chat_ids=[word_setter_chat_id, guesser_chat_id],
+        max_attempts=game.max_attempts
+    )
     return game
 
 
@@ -83,16 +712,22 @@ def get_game(word_setter_username: str, guesser_username: str) -> Optional[Game]
     return games.get((word_setter_username, guesser_username))
 
 
-def delete_game(word_setter_username: str, guesser_username: str) -> None:
+def delete_game(
+    word_setter_username: str,
+    guesser_username: str,
+    reason: Literal["finish", "cancel"] = "finish"
+) -> None:
     """
     Delete a game instance.
     
     Args:
         word_setter_username: Username of the word setter.
         guesser_username: Username of the guesser.
+        reason: Why the game ends, recorded in the game journal.
     """
-    if (word_setter_username, guesser_username) in games:
-        del games[(word_setter_username, guesser_username)]
+    game = games.pop((word_setter_username, guesser_username), None)
+    if game is not None:
+        games.record(reason, game)
 
 
 def get_user_role(username: str) -> Optional[Literal["word_setter", "guesser", None]]:
@@ -107,13 +742,8 @@ def get_user_role(username: str) -> Optional[Literal["word_setter", "guesser", N
             or None if they are not in a game.
     """
     # Find an active game involving the user
-    game = next(
-        (g for (w_s_username, g_username), g in games.items()
-         if (w_s_username == username or g_username == username)
-         and g.state == 'waiting_for_guess'),
-        None
-    )
-    
+    game = games.find_by_participant(username, state='waiting_for_guess')
+
     if not game:
         return None
     
@@ -123,6 +753,95 @@ def get_user_role(username: str) -> Optional[Literal["word_setter", "guesser", N
         return "guesser"
 
 
+def _normalize(word: str) -> str:
+    """Normalize 'Ё' to 'Е' in a word."""
+    return word.translate(_YO_TRANSLATION)
+
+
+def _score(secret_word: str, guess: str) -> List[int]:
+    """
+    Compute the per-letter marks of a guess.
+    
+    Green letters are matched first, then the remaining letters of the secret
+    word are counted once and consumed left to right for yellow marks.
+    
+    Args:
+        secret_word: The normalized word to be guessed.
+        guess: The normalized guessed word.
+        
+    Returns:
+        List[int]: GREEN, YELLOW or GREY for each letter of the guess.
+    """
+    guess_length = len(guess)
+    marks = [GREY] * guess_length
+    remaining: Dict[str, int] = {}
+
+    for i, s_char in enumerate(secret_word):
+        if i < guess_length and guess[i] == s_char:
+            marks[i] = GREEN
+        else:
+            remaining[s_char] = remaining.get(s_char, 0) + 1
+
+    for i, g_char in enumerate(guess):
+        if marks[i] == GREEN:
+            continue
+        count = remaining.get(g_char)
+        if count:
+            marks[i] = YELLOW
+            remaining[g_char] = count - 1
+
+    return marks
+
+
+def encode_pattern(marks: Sequence[int]) -> int:
+    """
+    Pack per-letter marks into a base-3 pattern code.
+    
+    Args:
+        marks: GREEN, YELLOW or GREY for each letter; the first letter is the
+            least significant digit.
+        
+    Returns:
+        int: The pattern code.
+    """
+    code = 0
+    for mark in reversed(marks):
+        code = code * 3 + mark
+    return code
+
+
+def decode_pattern(code: int, length: int) -> List[int]:
+    """
+    Unpack a base-3 pattern code into per-letter marks.
+    
+    Args:
+        code: The pattern code.
+        length: Number of letters in the word.
+        
+    Returns:
+        List[int]: GREEN, YELLOW or GREY for each letter.
+    """
+    marks = []
+    for _ in range(length):
+        code, mark = divmod(code, 3)
+        marks.append(mark)
+    return marks
+
+
+def pattern_to_feedback(code: int, length: int) -> str:
+    """
+    Render a pattern code as a string of colored squares.
+    
+    Args:
+        code: The pattern code.
+        length: Number of letters in the word.
+        
+    Returns:
+        str: The feedback string, e.g. "🟩🟨⬜⬜⬜".
+    """
+    return "".join(FEEDBACK_SQUARES[mark] for mark in decode_pattern(code, length))
+
+
 def get_feedback(secret_word: str, guess: str) -> Tuple[str, str, Set[str], Set[str]]:
     """
     Generate feedback for a guess attempt.
@@ -139,44 +858,79 @@ def get_feedback(secret_word: str, guess: str) -> Tuple[str, str, Set[str], Set[
         - used_letters: Set of used letters
     """
     # Normalize 'Ё' to 'Е' in both secret word and guess
-    secret_word = secret_word.replace('ё', 'е').replace('Ё', 'Е')
-    guess = guess.replace('ё', 'е').replace('Ё', 'Е')
-    
-    feedback = ""
-    result = ""
+    secret_word = _normalize(secret_word)
+    guess = _normalize(guess)
+
+    marks = _score(secret_word, guess)
+
+    result = guess.upper()
+    feedback = "".join([FEEDBACK_SQUARES[mark] for mark in marks])
     correct_letters = set()
     used_letters = set()
-    
-    # Create a list to track used positions for yellow marks
-    secret_chars = list(secret_word)
-    marked_positions = set()
-
-    # First pass - mark green squares
-    for i, (s_char, g_char) in enumerate(zip(secret_word, guess)):
-        if g_char == s_char:
-            feedback += "🟩"
-            result += g_char.upper()
-            correct_letters.add(g_char.upper())
-            marked_positions.add(i)
-            secret_chars[i] = None  # Mark as used
+    for g_char, mark in zip(guess, marks):
+        if mark == GREY:
+            used_letters.add(g_char.upper())
         else:
-            feedback += " "  # Placeholder
-            result += " "   # Placeholder
+            correct_letters.add(g_char.upper())
 
-    # Second pass - mark yellow and white squares
-    for i, g_char in enumerate(guess):
-        if i in marked_positions:
-            continue
-            
-        g_char_upper = g_char.upper()
-        result = result[:i] + g_char_upper + result[i+1:]
+    return result, feedback, correct_letters, used_letters
+
+
+def get_feedback_many(secret_word: str, guesses: Sequence[str]) -> Sequence[int]:
+    """
+    Score many guesses against one secret word.
+    
+    The scoring matches get_feedback letter for letter. When NumPy is
+    installed the guesses are scored as one array, one column at a time;
+    otherwise each guess is scored in turn.
+    
+    Args:
+        secret_word: The word to be guessed.
+        guesses: Guesses of the same length as the secret word.
         
-        if g_char in secret_chars:
-            feedback = feedback[:i] + "🟨" + feedback[i+1:]
-            correct_letters.add(g_char_upper)
-            secret_chars.remove(g_char)  # Remove first occurrence
-        else:
-            feedback = feedback[:i] + "⬜" + feedback[i+1:]
-            used_letters.add(g_char_upper)
-            
-    return result, feedback, correct_letters, used_letters 
\ No newline at end of file
+    Returns:
+        Sequence[int]: One base-3 pattern code per guess (see encode_pattern),
+            as a NumPy array when NumPy is available and a list otherwise.
+        
+    Raises:
+        ValueError: If a guess does not have the length of the secret word,
+            or the words are longer than MAX_PATTERN_LENGTH, whose pattern
+            codes would not fit in 32 bits.
+    """
+    secret_word = _normalize(secret_word)
+    length = len(secret_word)
+    if length > MAX_PATTERN_LENGTH:
+        raise ValueError(f"Words of {length} letters are longer than {MAX_PATTERN_LENGTH}")
+    normalized = [_normalize(guess) for guess in guesses]
+    for guess in normalized:
+        if len(guess) != length:
+            raise ValueError(f"Guess '{guess}' does not have {length} letters")
+
+    if np is None:
+        return [encode_pattern(_score(secret_word, guess)) for guess in normalized]
+
+    count = len(normalized)
+    if count == 0 or length == 0:
+        return np.zeros(count, dtype=np.uint32)
+
+    secret = np.array([ord(c) for c in secret_word], dtype=np.uint32)
+    guess_array = (
+        np.frombuffer("".join(normalized).encode('utf-32-le'), dtype=np.uint32)
+        .reshape(count, length)
+    )
+
+    green = guess_array == secret
+    yellow = np.zeros_like(green)
+    # Secret positions that are still free to explain a yellow letter
+    available = ~green
+    rows = np.arange(count)
+    for i in range(length):
+        matches = (guess_array[:, i, None] == secret) & available
+        hit = matches.any(axis=1) & ~green[:, i]
+        first = matches.argmax(axis=1)
+        yellow[:, i] = hit
+        available[rows[hit], first[hit]] = False
+
+    marks = np.where(green, GREEN, np.where(yellow, YELLOW, GREY)).astype(np.uint32)
+    weights = (3 ** np.arange(length)).astype(np.uint32)
+    return marks @ weights
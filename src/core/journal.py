@@ -0,0 +1,351 @@
+"""Append-only journal of game events for crash recovery."""
+
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import (
+    JOURNAL_COMMIT_INTERVAL,
+    JOURNAL_COMPACT_EVENTS,
+    JOURNAL_DIR
+)
+from src.core.game import Game, GameRegistry
+
+
+SNAPSHOT_FILE_NAME = 'snapshot.json'
+SEGMENT_PATTERN = 'events-*.jsonl'
+
+
+def _segment_name(number: int) -> str:
+    """Get the file name of a journal segment."""
+    return f'events-{number:08d}.jsonl'
+
+
+def _segment_number(path: Path) -> int:
+    """Get the number of a journal segment from its file name."""
+    return int(path.stem.split('-', 1)[1])
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist renames and deletions in a directory."""
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def apply_event(registry: GameRegistry, event: Dict[str, Any]) -> None:
+    """
+    Apply one journaled event to a registry.
+    
+    Args:
+        registry: The registry to update. Its journal must be detached.
+        event: The event record.
+    """
+    event_type = event['type']
+    key = tuple(event['game'])
+    if event_type == 'create':
+        word_setter_chat_id, guesser_chat_id = event['chat_ids']
+        registry[key] = Game(
+            key[0],
+            key[1],
+            word_setter_chat_id,
+            guesser_chat_id,
+            max_attempts=event['max_attempts']
+        )
+        return
+
+    game = registry.get(key)
+    if game is None:
+        return
+    if event_type == 'word':
+        game.set_word(event['word'], event['language'])
+    elif event_type == 'guess':
+        game.add_attempt(event['guess'])
+    elif event_type == 'addtry':
+        game.add_try()
+    elif event_type in ('cancel', 'finish'):
+        del registry[key]
+
+
+class GameJournal:
+    """
+    Append-only journal of game events with snapshots.
+    
+    Events are buffered by append() and written by a background thread,
+    which commits everything that arrived within one commit interval with a
+    single fsync. The journal is split into numbered segments. A snapshot
+    records every active game together with the segment that follows it,
+    so recovery loads the snapshot and replays only the newer segments.
+    After a configured number of events the journal takes a new snapshot
+    and deletes the segments it covers.
+    
+    Attributes:
+        dropped_games: Games that open_game_journal recovered but dropped.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        commit_interval: float = JOURNAL_COMMIT_INTERVAL,
+        compact_events: int = JOURNAL_COMPACT_EVENTS
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.commit_interval = commit_interval
+        self.compact_events = compact_events
+        self.registry: Optional[GameRegistry] = None
+        self.dropped_games: List[Game] = []
+
+        self._buffer: List[Any] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._pending_items = 0
+        self._closing = False
+        self._writer: Optional[threading.Thread] = None
+        self._file = None
+        self._segment = 0
+        self._events_since_snapshot = 0
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Path of the snapshot file."""
+        return self.directory / SNAPSHOT_FILE_NAME
+
+    def _segments(self) -> List[Path]:
+        """Get the journal segments in order."""
+        return sorted(self.directory.glob(SEGMENT_PATTERN), key=_segment_number)
+
+    def replay(self, registry: GameRegistry) -> int:
+        """
+        Restore games from the snapshot and the newer journal segments.
+        
+        A torn last line left by a crash is ignored; an undecodable or
+        invalid record anywhere else is logged and skipped, and the replay
+        goes on with the next one. Garbage collection is paused meanwhile, since recovery only
+        allocates long-lived objects.
+        
+        Args:
+            registry: The registry to fill. Its journal must be detached.
+        
+        Returns:
+            int: Number of replayed events.
+        """
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._replay(registry)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _replay(self, registry: GameRegistry) -> int:
+        """Restore games without pausing garbage collection, see replay."""
+        first_segment = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            first_segment = snapshot['segment']
+            for record in snapshot['games']:
+                game = Game.from_record(record)
+                registry[(game.word_setter_username, game.guesser_username)] = game
+
+        replayed = 0
+        for path in self._segments():
+            number = _segment_number(path)
+            self._segment = max(self._segment, number)
+            if number < first_segment:
+                continue
+            # An undecodable line is only known to be torn once no line follows it
+            undecodable = None
+            with open(path, 'rb') as f:
+                for line_number, line in enumerate(f, start=1):
+                    if undecodable is not None:
+                        logging.error(f"Skipping undecodable journal record at {path.name}:{undecodable}")
+                        undecodable = None
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        undecodable = line_number
+                        continue
+                    try:
+                        apply_event(registry, event)
+                    except Exception:
+                        logging.exception(f"Skipping invalid journal record at {path.name}:{line_number}")
+                        continue
+                    replayed += 1
+            if undecodable is not None:
+                logging.warning(f"Ignoring torn journal record at {path.name}:{undecodable}")
+        self._segment = max(self._segment, first_segment)
+        return replayed
+
+    def attach(self, registry: GameRegistry) -> None:
+        """
+        Start journaling the events of a registry.
+        
+        Args:
+            registry: The registry whose events are journaled.
+        """
+        self.registry = registry
+        registry.journal = self
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='game-journal-writer', daemon=True)
+            self._writer.start()
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event for the next group commit.
+        
+        Args:
+            event: The event record.
+        """
+        with self._lock:
+            self._buffer.append(event)
+            self._pending_items += 1
+        self._wakeup.set()
+        self._events_since_snapshot += 1
+        if self.compact_events and self._events_since_snapshot >= self.compact_events:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Snapshot the attached registry and drop the segments it covers.
+        
+        The games are captured immediately, on the caller's thread, so the
+        snapshot lines up exactly with the events queued so far. Only cheap
+        copies are taken there (see Game.snapshot); building the records,
+        serializing, writing and deleting old segments happen on the writer
+        thread.
+        """
+        if self.registry is None:
+            return
+        snapshots = [game.snapshot() for game in self.registry.values()]
+        with self._lock:
+            self._buffer.append(('snapshot', snapshots))
+            self._pending_items += 1
+        self._events_since_snapshot = 0
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        self._wakeup.set()
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending_items == 0 or self._writer is None)
+
+    def close(self) -> None:
+        """Commit everything queued, stop the writer and close the segment."""
+        if self.registry is not None and self.registry.journal is self:
+            self.registry.journal = None
+        if self._writer is not None:
+            self._closing = True
+            self._wakeup.set()
+            self._writer.join()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open_next_segment(self) -> None:
+        """Close the current segment and start a new one."""
+        if self._file is not None:
+            self._file.close()
+        self._segment += 1
+        self._file = open(self.directory / _segment_name(self._segment), 'a', encoding='utf-8')
+        _fsync_directory(self.directory)
+
+    def _write_snapshot(self, snapshots: List[tuple]) -> None:
+        """Write a snapshot that starts at a fresh segment and drop older segments."""
+        self._open_next_segment()
+        records = [Game.record_from_snapshot(snapshot) for snapshot in snapshots]
+        tmp_path = self.snapshot_path.with_name(SNAPSHOT_FILE_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Encoded in one piece, by the C encoder
+            f.write(json.dumps({'segment': self._segment, 'games': records}, ensure_ascii=False))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        for path in self._segments():
+            if _segment_number(path) < self._segment:
+                path.unlink()
+        _fsync_directory(self.directory)
+
+    def _write_loop(self) -> None:
+        """Background loop that group-commits queued events."""
+        if self._file is None:
+            self._open_next_segment()
+        while True:
+            self._wakeup.wait()
+            if not self._closing:
+                # Let events arriving within the interval share one fsync
+                time.sleep(self.commit_interval)
+            with self._lock:
+                self._wakeup.clear()
+                items, self._buffer = self._buffer, []
+
+            try:
+                lines = []
+                for item in items:
+                    if isinstance(item, tuple):
+                        self._commit(lines)
+                        lines = []
+                        self._write_snapshot(item[1])
+                    else:
+                        lines.append(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+                self._commit(lines)
+            except Exception as e:
+                logging.error(f"Failed to write game journal: {e}")
+
+            with self._idle:
+                self._pending_items -= len(items)
+                self._idle.notify_all()
+            if self._closing and not self._buffer:
+                break
+
+    def _commit(self, lines: List[str]) -> None:
+        """Write event lines to the current segment and fsync once."""
+        if not lines:
+            return
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def open_game_journal(registry: GameRegistry, directory: Path = JOURNAL_DIR) -> GameJournal:
+    """
+    Recover games from the journal and start journaling new events.
+    
+    Games still waiting for their word are dropped: the word setter's
+    conversation did not survive the restart, so the word could never be
+    set. They are left in the journal's dropped_games for the caller to
+    tell the players. Recovery is followed by a snapshot, so the next start
+    replays only the events of this run.
+    
+    Args:
+        registry: The registry to restore into and journal.
+        directory: Directory holding the snapshot and journal segments.
+    
+    Returns:
+        GameJournal: The attached journal.
+    """
+    journal = GameJournal(directory)
+    replayed = journal.replay(registry)
+    for key, game in list(registry.items()):
+        if game.state == 'waiting_for_word':
+            del registry[key]
+            journal.dropped_games.append(game)
+    logging.info(
+        f"Recovered {len(registry)} games from the journal ({replayed} events replayed), "
+        f"dropped {len(journal.dropped_games)} games waiting for a word"
+    )
+    journal.attach(registry)
+    journal.compact()
+    return journal
@@ -0,0 +1,297 @@
+"""Minimal asyncio client for the Redis protocol (RESP2)."""
+
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Deque, List, Optional, Sequence, Union
+from urllib.parse import unquote, urlparse
+
+
+class RedisError(Exception):
+    """Error reply from the server."""
+
+
+Command = Sequence[Union[str, bytes, int, float]]
+
+# (key, hash field, expected value) checked before a transaction's commands;
+# an empty expected value requires the field to be absent
+Check = Sequence[Union[str, int]]
+
+# Script of checked_transaction: KEYS are the hashes of the checks, ARGV
+# holds the field and expected value of each check, then each command as
+# its argument count followed by its arguments
+CHECKED_TRANSACTION_SCRIPT = """
+for i = 1, #KEYS do
+    if (redis.call('HGET', KEYS[i], ARGV[2 * i - 1]) or '') ~= ARGV[2 * i] then
+        return 0
+    end
+end
+local i = 2 * #KEYS + 1
+while i <= #ARGV do
+    local count = tonumber(ARGV[i])
+    redis.call(unpack(ARGV, i + 1, i + count))
+    i = i + count + 1
+end
+return 1
+"""
+CHECKED_TRANSACTION_SHA = hashlib.sha1(CHECKED_TRANSACTION_SCRIPT.encode('utf-8')).hexdigest()
+
+
+def encode_command(args: Command) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings.
+    
+    Args:
+        args: The command name and its arguments.
+    
+    Returns:
+        bytes: The encoded command.
+    """
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode('ascii')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read one reply.
+    
+    Bulk strings are decoded as UTF-8 and error replies are returned, not
+    raised, as RedisError instances.
+    
+    Args:
+        reader: The connection's stream reader.
+    
+    Returns:
+        Any: A str, int, None, list or RedisError.
+    """
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by the server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        return RedisError(payload.decode('utf-8'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2].decode('utf-8')
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply: {line!r}")
+
+
+class _Pending:
+    """A request waiting for its replies; only the last reply is its result."""
+    __slots__ = ('future', 'skip', 'error')
+
+    def __init__(self, future: asyncio.Future, skip: int) -> None:
+        self.future = future
+        self.skip = skip
+        self.error: Optional[RedisError] = None
+
+
+class RedisClient:
+    """
+    Redis client on one connection with automatic pipelining.
+    
+    Commands issued during one event loop iteration are written to the
+    socket together, and replies are matched to requests in order, so
+    concurrent callers share round trips without waiting for each other.
+    The connection is opened on first use and again after it was lost.
+    
+    Attributes:
+        url: The server URL, redis://[:password@]host[:port][/db].
+        round_trips: Number of writes to the socket so far.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.round_trips = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._pending: Deque[_Pending] = deque()
+        self._buffer: List[bytes] = []
+        self._flush_scheduled = False
+
+    async def execute(self, *args: Any) -> Any:
+        """
+        Run one command.
+        
+        Args:
+            *args: The command name and its arguments.
+        
+        Returns:
+            Any: The reply.
+        
+        Raises:
+            RedisError: If the server answers with an error.
+        """
+        await self._connect()
+        return await self._send([args], 0)
+
+    async def transaction(self, commands: Sequence[Command]) -> List[Any]:
+        """
+        Run commands atomically with MULTI/EXEC in one round trip.
+        
+        Args:
+            commands: The commands.
+        
+        Returns:
+            List[Any]: The reply of every command.
+        
+        Raises:
+            RedisError: If a command was rejected or failed.
+        """
+        await self._connect()
+        replies = await self._send([('MULTI',), *commands, ('EXEC',)], len(commands) + 1)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def checked_transaction(self, checks: Sequence[Check], commands: Sequence[Command]) -> bool:
+        """
+        Run commands atomically if hash fields still hold the expected values.
+        
+        Checks and commands run in one server-side script, in one round
+        trip: the script is called by its hash and sent in full only when
+        the server does not have it cached yet.
+        
+        Args:
+            checks: The (key, field, expected value) checks.
+            commands: The commands to run when every check passes.
+        
+        Returns:
+            bool: True if the commands ran, False if a check failed.
+        
+        Raises:
+            RedisError: If a command was rejected or failed.
+        """
+        arguments: List[Any] = [len(checks)]
+        arguments += [key for key, _, _ in checks]
+        for _, field, expected in checks:
+            arguments += [field, expected]
+        for command in commands:
+            arguments += [len(command), *command]
+        try:
+            reply = await self.execute('EVALSHA', CHECKED_TRANSACTION_SHA, *arguments)
+        except RedisError as e:
+            if not str(e).startswith('NOSCRIPT'):
+                raise
+            reply = await self.execute('EVAL', CHECKED_TRANSACTION_SCRIPT, *arguments)
+        return reply == 1
+
+    def _send(self, commands: Sequence[Command], skip: int) -> asyncio.Future:
+        """Queue commands for the next write; the result is the last reply."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_Pending(future, skip))
+        self._buffer.extend(encode_command(command) for command in commands)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return future
+
+    def _flush(self) -> None:
+        """Write the queued commands."""
+        self._flush_scheduled = False
+        if not self._buffer or self._writer is None:
+            return
+        data, self._buffer = b''.join(self._buffer), []
+        self._writer.write(data)
+        self.round_trips += 1
+
+    async def _connect(self) -> None:
+        """Open the connection unless it is open."""
+        if self._writer is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._writer = writer
+            self._reader_task = asyncio.get_running_loop().create_task(self._read_loop(reader))
+            try:
+                if self.password:
+                    await self._send([('AUTH', self.password)], 0)
+                if self.db:
+                    await self._send([('SELECT', self.db)], 0)
+            except Exception:
+                await self.close()
+                raise
+            logging.info(f"Connected to Redis at {self.host}:{self.port}/{self.db}")
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        """Hand out replies to the waiting requests in order."""
+        error: Exception = ConnectionError("Connection closed")
+        try:
+            while True:
+                reply = await read_reply(reader)
+                if not self._pending:
+                    raise ConnectionError(f"Unexpected reply: {reply!r}")
+                pending = self._pending[0]
+                if pending.skip:
+                    pending.skip -= 1
+                    if isinstance(reply, RedisError) and pending.error is None:
+                        pending.error = reply
+                    continue
+                self._pending.popleft()
+                if pending.future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    pending.future.set_exception(reply)
+                elif pending.error is not None:
+                    pending.future.set_exception(pending.error)
+                else:
+                    pending.future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+            error = ConnectionError(f"Lost connection to Redis: {e}")
+            logging.error(str(error))
+        finally:
+            self._writer = None
+            self._buffer = []
+            while self._pending:
+                pending = self._pending.popleft()
+                if not pending.future.done():
+                    pending.future.set_exception(error)
+
+    async def close(self) -> None:
+        """Close the connection."""
+        writer, self._writer = self._writer, None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
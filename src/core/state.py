@@ -0,0 +1,896 @@
+"""Game and user state behind one interface, kept in process, in SQLite or in Redis."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.config.settings import REDIS_PREFIX, REDIS_URL, STATE_BACKEND, USER_DB_FILE
+from src.core import game as game_module
+from src.core import user as user_module
+from src.core.game import Game, GameKey, keyed_lock
+from src.core.resp import RedisClient
+from src.core.user import USER_SCHEMA, USER_UPSERT
+
+
+class GameConflictError(Exception):
+    """A game was changed by another process since it was read; nothing was written."""
+
+    def __init__(self, key: GameKey) -> None:
+        super().__init__(f"Game {key[0]} -> {key[1]} was changed by another process")
+        self.key = key
+
+
+class StateBackend(ABC):
+    """
+    Game and user state as the handlers use it.
+    
+    Games returned by a backend may be copies of the stored state. A handler
+    locks a game, changes it and then calls save_game. Writes issued inside
+    batch() are sent together when the block ends, so a handler that changes
+    a game and two users pays for one write.
+    
+    Backends shared between processes check the version of every game they
+    write: a write based on an outdated copy raises GameConflictError and
+    the whole batch is dropped.
+    """
+
+    @abstractmethod
+    async def find_game(
+        self,
+        username: str,
+        role: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Optional[Game]:
+        """
+        Find the oldest game of a user.
+        
+        Args:
+            username: The player.
+            role: 'word_setter' or 'guesser' to require a role, or None for either.
+            state: Optional state the game must be in.
+        
+        Returns:
+            Optional[Game]: The game, or None.
+        """
+
+    @abstractmethod
+    async def get_game(self, word_setter_username: str, guesser_username: str) -> Optional[Game]:
+        """
+        Get a game by its players.
+        
+        Args:
+            word_setter_username: Username of the word setter.
+            guesser_username: Username of the guesser.
+        
+        Returns:
+            Optional[Game]: The game, or None.
+        """
+
+    @abstractmethod
+    async def create_game(
+        self,
+        word_setter_username: str,
+        guesser_username: str,
+        word_setter_chat_id: int,
+        guesser_chat_id: int
+    ) -> Game:
+        """
+        Create and store a new game.
+        
+        Args:
+            word_setter_username: Username of the word setter.
+            guesser_username: Username of the guesser.
+            word_setter_chat_id: Chat ID of the word setter.
+            guesser_chat_id: Chat ID of the guesser.
+        
+        Returns:
+            Game: The new game.
+        """
+
+    @abstractmethod
+    async def save_game(self, game: Game) -> None:
+        """
+        Store the changes made to a game.
+        
+        Args:
+            game: The changed game.
+        
+        Raises:
+            GameConflictError: If another process wrote the game since it
+                was read, when the write or its batch is committed.
+        """
+
+    @abstractmethod
+    async def delete_game(self, game: Game, reason: str = 'finish') -> None:
+        """
+        Delete a game that ended.
+        
+        Args:
+            game: The game.
+            reason: Why the game ends: 'finish' or 'cancel'.
+        """
+
+    @abstractmethod
+    def lock(self, game: Game) -> Any:
+        """
+        Serialize updates of one game across await points.
+        
+        Use as `async with state.lock(game) as game:`. The lock covers the
+        handlers of this process.
+        
+        Args:
+            game: The game to lock.
+        
+        Returns:
+            Async context manager that yields the current version of the
+            game, or None if it ended while waiting for the lock.
+        """
+
+    @abstractmethod
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's record.
+        
+        Args:
+            username: The username.
+        
+        Returns:
+            Optional[Dict[str, Any]]: 'chat_id' and, once known,
+                'last_partner'; None for unknown users.
+        """
+
+    @abstractmethod
+    async def update_user(self, username: str, chat_id: int, last_partner: Optional[str] = None) -> None:
+        """
+        Update a user's chat ID and, optionally, their last partner.
+        
+        Args:
+            username: The username.
+            chat_id: The user's chat ID.
+            last_partner: Optional username of the last game partner.
+        """
+
+    @abstractmethod
+    async def get_command_scope(self, chat_id: int) -> Optional[str]:
+        """
+        Get the command menu last applied to a chat.
+        
+        Args:
+            chat_id: The chat ID.
+        
+        Returns:
+            Optional[str]: The role whose commands the chat shows, or None.
+        """
+
+    @abstractmethod
+    async def set_command_scope(self, chat_id: int, role: str) -> None:
+        """
+        Remember the command menu applied to a chat.
+        
+        Args:
+            chat_id: The chat ID.
+            role: The role whose commands the chat now shows.
+        """
+
+    @abstractmethod
+    async def count_games(self) -> Dict[str, int]:
+        """
+        Count the stored games by state.
+        
+        Returns:
+            Dict[str, int]: Number of games by state, for states that have games.
+        """
+
+    @abstractmethod
+    async def count_users(self) -> int:
+        """
+        Count the known users.
+        
+        Returns:
+            int: Number of users.
+        """
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Send the writes issued inside the block together."""
+        yield
+
+    async def close(self) -> None:
+        """Write pending changes and release connections."""
+
+    async def get_user_chat_id(self, username: str) -> Optional[int]:
+        """
+        Get a user's chat ID.
+        
+        Args:
+            username: The username.
+        
+        Returns:
+            Optional[int]: The chat ID, or None for unknown users.
+        """
+        record = await self.get_user(username)
+        return record.get('chat_id') if record else None
+
+    async def get_user_role(self, username: str) -> Optional[str]:
+        """
+        Get the user's role in their active game.
+        
+        Args:
+            username: The username.
+        
+        Returns:
+            Optional[str]: 'word_setter' or 'guesser', or None if the user
+                is not guessing or waiting for guesses.
+        """
+        game = await self.find_game(username, state='waiting_for_guess')
+        if game is None:
+            return None
+        return 'word_setter' if username == game.word_setter_username else 'guesser'
+
+
+class MemoryBackend(StateBackend):
+    """
+    Games in the process's registry and users in the write-behind user store.
+    
+    This is the single-instance setup: games are journaled for crash
+    recovery (see src.core.journal) and are changed in place, so save_game
+    has nothing to do. In sharded mode every worker has one, and user
+    changes are written through (see user.write_through), so the other
+    workers read them from the shared database right away. The user
+    store's SQLite reads and writes run on a dedicated thread, never on the
+    event loop.
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-users')
+
+    async def find_game(
+        self,
+        username: str,
+        role: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Optional[Game]:
+        games = game_module.games
+        if role == 'word_setter':
+            return games.find_by_word_setter(username, state)
+        if role == 'guesser':
+            return games.find_by_guesser(username, state)
+        return games.find_by_participant(username, state)
+
+    async def get_game(self, word_setter_username: str, guesser_username: str) -> Optional[Game]:
+        return game_module.get_game(word_setter_username, guesser_username)
+
+    async def create_game(
+        self,
+        word_setter_username: str,
+        guesser_username: str,
+        word_setter_chat_id: int,
+        guesser_chat_id: int
+    ) -> Game:
+        return game_module.create_game(
+            word_setter_username, guesser_username, word_setter_chat_id, guesser_chat_id
+        )
+
+    async def save_game(self, game: Game) -> None:
+        # Changes are journaled by the registry as they are made
+        pass
+
+    async def delete_game(self, game: Game, reason: str = 'finish') -> None:
+        game_module.delete_game(game.word_setter_username, game.guesser_username, reason)
+
+    @asynccontextmanager
+    async def lock(self, game: Game) -> AsyncIterator[Optional[Game]]:
+        async with game_module.games.lock(game) as active:
+            yield game if active else None
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run a function of the user store on the store's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        return await self._run(user_module.user_data.get, username)
+
+    async def update_user(self, username: str, chat_id: int, last_partner: Optional[str] = None) -> None:
+        await self._run(user_module.update_user_data, username, chat_id, last_partner)
+        await self._write_users()
+
+    async def get_command_scope(self, chat_id: int) -> Optional[str]:
+        return await self._run(user_module.user_data.get_command_scope, chat_id)
+
+    async def set_command_scope(self, chat_id: int, role: str) -> None:
+        user_module.user_data.set_command_scope(chat_id, role)
+        await self._write_users()
+
+    async def _write_users(self) -> None:
+        """Write user changes now if other processes read them."""
+        if user_module.write_through:
+            await self._run(user_module.save_user_data)
+
+    async def count_games(self) -> Dict[str, int]:
+        return game_module.games.state_counts()
+
+    async def count_users(self) -> int:
+        return await self._run(len, user_module.user_data)
+
+    async def close(self) -> None:
+        self._executor.shutdown()
+
+
+class StoredBackend(StateBackend):
+    """
+    Base of backends that keep state outside the process.
+    
+    Every read returns fresh Game objects, stamped with the local write
+    count at the time the read was issued. Locking a game reloads it only
+    if this process wrote the game after that stamp, so the usual
+    find-lock-change-save sequence costs one read and one write.
+    Subclasses encode writes as operations and send a list of them with
+    _commit; batch() collects the operations of a task and commits them
+    at once.
+    
+    The lock only covers this process. Across processes every game write
+    is a compare-and-set on the game's version: it applies only if the
+    stored version is the one the game was read at, and the version is
+    advanced when the write is queued, so several writes of a game in one
+    batch follow each other.
+    """
+
+    # Number of recent game writes whose stamps are kept
+    MAX_WRITE_STAMPS = 10000
+
+    def __init__(self) -> None:
+        self._batch: ContextVar[Optional[List[Tuple[List[Any], List[Game], List[GameKey]]]]] = ContextVar(
+            f'state_batch_{id(self)}', default=None
+        )
+        self._locks: Dict[GameKey, List[Any]] = {}
+        self._clock = 0
+        self._written: Dict[GameKey, int] = {}
+        self._forgotten = 0
+
+    @abstractmethod
+    async def _commit(self, operations: List[Any]) -> None:
+        """Apply write operations atomically, or none of them on a version conflict."""
+
+    async def _write(
+        self,
+        operations: List[Any],
+        games: Sequence[Game] = (),
+        keys: Iterable[GameKey] = ()
+    ) -> None:
+        """Commit operations now, or with the enclosing batch."""
+        write = (operations, list(games), list(keys))
+        writes = self._batch.get()
+        if writes is not None:
+            writes.append(write)
+        else:
+            await self._flush([write])
+
+    async def _flush(self, writes: List[Tuple[List[Any], List[Game], List[GameKey]]]) -> None:
+        """Commit writes and stamp the games they touched."""
+        try:
+            await self._commit([operation for operations, _, _ in writes for operation in operations])
+        except BaseException:
+            self._discard(writes)
+            raise
+        self._clock += 1
+        for _, games, keys in writes:
+            for game in games:
+                game.revision = self._clock
+                keys.append((game.word_setter_username, game.guesser_username))
+            for key in keys:
+                self._written.pop(key, None)
+                self._written[key] = self._clock
+        if len(self._written) > self.MAX_WRITE_STAMPS:
+            for key in list(self._written)[:len(self._written) // 2]:
+                self._forgotten = max(self._forgotten, self._written.pop(key))
+
+    @staticmethod
+    def _discard(writes: List[Tuple[List[Any], List[Game], List[GameKey]]]) -> None:
+        """Mark the games of writes that were not committed, so their copies can no longer be written."""
+        for _, games, _ in writes:
+            for game in games:
+                # Versions advance when a write is queued; no stored game has this one
+                game.version = -1
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        if self._batch.get() is not None:
+            yield
+            return
+        writes: List[Tuple[List[Any], List[Game], List[GameKey]]] = []
+        token = self._batch.set(writes)
+        try:
+            yield
+        except BaseException:
+            self._discard(writes)
+            raise
+        finally:
+            self._batch.reset(token)
+        if writes:
+            await self._flush(writes)
+
+    def _loaded(self, games: Iterable[Game], stamp: int) -> None:
+        """Stamp games read from storage with the clock at the time of the read."""
+        for game in games:
+            game.revision = stamp
+
+    def _is_stale(self, game: Game) -> bool:
+        """Whether this process wrote the game after it was read."""
+        written = self._written.get((game.word_setter_username, game.guesser_username))
+        if written is None:
+            return game.revision < self._forgotten
+        return written > game.revision
+
+    @asynccontextmanager
+    async def lock(self, game: Game) -> AsyncIterator[Optional[Game]]:
+        key = (game.word_setter_username, game.guesser_username)
+        async with keyed_lock(self._locks, key):
+            if self._is_stale(game):
+                game = await self.get_game(*key)
+            yield game
+
+
+_GAME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    word_setter TEXT NOT NULL,
+    guesser TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (word_setter, guesser)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_by_guesser ON games (guesser, created);
+CREATE INDEX IF NOT EXISTS games_by_word_setter ON games (word_setter, created);
+"""
+
+_GAME_INSERT = """
+INSERT INTO games (word_setter, guesser, state, created, record, version) VALUES (?, ?, ?, ?, ?, 1)
+ON CONFLICT (word_setter, guesser) DO NOTHING
+"""
+
+_GAME_UPDATE = """
+UPDATE games SET state = ?, record = ?, version = version + 1
+WHERE word_setter = ? AND guesser = ? AND version = ?
+"""
+
+_GAME_DELETE = "DELETE FROM games WHERE word_setter = ? AND guesser = ? AND version = ?"
+
+
+class SqliteBackend(StoredBackend):
+    """
+    Games and users in one SQLite database, shared by the bot instances of a host.
+    
+    Users live in the tables of the user store (see src.core.user), so
+    switching between this and the memory backend keeps the users. Writes
+    are committed in one transaction per batch. The connection is used by
+    one worker thread only, so queries never block the event loop and
+    transactions never interleave.
+    
+    Operations are (sql, parameters, game key) triples; a game write must
+    change exactly one row, or the game was written by another instance
+    and the transaction is rolled back.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-sqlite')
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(USER_SCHEMA + _GAME_SCHEMA)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(games)")}
+        if 'version' not in columns:
+            # Databases written before games were versioned
+            self._connection.execute("ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run a function on the connection's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _apply(self, operations: List[Tuple[str, Sequence[Any], Optional[GameKey]]]) -> None:
+        connection = self._connection
+        try:
+            connection.execute("BEGIN")
+            for sql, parameters, key in operations:
+                changed = connection.execute(sql, parameters).rowcount
+                if key is not None and changed != 1:
+                    raise GameConflictError(key)
+            connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    async def _commit(self, operations: List[Tuple[str, Sequence[Any], Optional[GameKey]]]) -> None:
+        await self._run(self._apply, operations)
+
+    def _select_games(self, sql: str, parameters: Sequence[Any]) -> List[Game]:
+        games = []
+        for record, version in self._connection.execute(sql, parameters):
+            game = Game.from_record(json.loads(record))
+            game.version = version
+            games.append(game)
+        return games
+
+    async def _read_games(self, sql: str, parameters: Sequence[Any]) -> List[Game]:
+        stamp = self._clock
+        games = await self._run(self._select_games, sql, parameters)
+        self._loaded(games, stamp)
+        return games
+
+    def _fetch_one(self, sql: str, parameters: Sequence[Any] = ()) -> Optional[Tuple[Any, ...]]:
+        return self._connection.execute(sql, parameters).fetchone()
+
+    async def find_game(
+        self,
+        username: str,
+        role: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Optional[Game]:
+        if role is None:
+            where, parameters = "(word_setter = ? OR guesser = ?)", [username, username]
+        elif role in ('word_setter', 'guesser'):
+            where, parameters = f"{role} = ?", [username]
+        else:
+            raise ValueError(f"Unknown role: {role}")
+        if state is not None:
+            where += " AND state = ?"
+            parameters.append(state)
+        games = await self._read_games(
+            f"SELECT record, version FROM games WHERE {where} ORDER BY created LIMIT 1", parameters
+        )
+        return games[0] if games else None
+
+    async def get_game(self, word_setter_username: str, guesser_username: str) -> Optional[Game]:
+        games = await self._read_games(
+            "SELECT record, version FROM games WHERE word_setter = ? AND guesser = ?",
+            (word_setter_username, guesser_username)
+        )
+        return games[0] if games else None
+
+    async def create_game(
+        self,
+        word_setter_username: str,
+        guesser_username: str,
+        word_setter_chat_id: int,
+        guesser_chat_id: int
+    ) -> Game:
+        game = Game(word_setter_username, guesser_username, word_setter_chat_id, guesser_chat_id)
+        game.version = 1
+        key = (word_setter_username, guesser_username)
+        record = json.dumps(game.to_record(), ensure_ascii=False)
+        await self._write([(_GAME_INSERT, (*key, game.state, time.time_ns(), record), key)], games=[game])
+        return game
+
+    async def save_game(self, game: Game) -> None:
+        key = (game.word_setter_username, game.guesser_username)
+        record = json.dumps(game.to_record(), ensure_ascii=False)
+        expected, game.version = game.version, game.version + 1
+        await self._write([(_GAME_UPDATE, (game.state, record, *key, expected), key)], games=[game])
+
+    async def delete_game(self, game: Game, reason: str = 'finish') -> None:
+        key = (game.word_setter_username, game.guesser_username)
+        await self._write([(_GAME_DELETE, (*key, game.version), key)], keys=[key])
+
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        row = await self._run(
+            self._fetch_one, "SELECT chat_id, last_partner FROM users WHERE username = ?", (username,)
+        )
+        if row is None:
+            return None
+        record = {'chat_id': row[0]}
+        if row[1] is not None:
+            record['last_partner'] = row[1]
+        return record
+
+    async def update_user(self, username: str, chat_id: int, last_partner: Optional[str] = None) -> None:
+        if last_partner:
+            await self._write([(USER_UPSERT, (username, chat_id, last_partner), None)])
+        else:
+            await self._write([(
+                "INSERT INTO users (username, chat_id) VALUES (?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET chat_id = excluded.chat_id",
+                (username, chat_id),
+                None
+            )])
+
+    async def get_command_scope(self, chat_id: int) -> Optional[str]:
+        row = await self._run(self._fetch_one, "SELECT role FROM command_scopes WHERE chat_id = ?", (chat_id,))
+        return row[0] if row else None
+
+    async def set_command_scope(self, chat_id: int, role: str) -> None:
+        await self._write([
+            ("INSERT OR REPLACE INTO command_scopes (chat_id, role) VALUES (?, ?)", (chat_id, role), None)
+        ])
+
+    def _count_games(self) -> Dict[str, int]:
+        return dict(self._connection.execute("SELECT state, COUNT(*) FROM games GROUP BY state").fetchall())
+
+    async def count_games(self) -> Dict[str, int]:
+        return await self._run(self._count_games)
+
+    async def count_users(self) -> int:
+        return (await self._run(self._fetch_one, "SELECT COUNT(*) FROM users"))[0]
+
+    async def close(self) -> None:
+        await self._run(self._connection.close)
+        self._executor.shutdown()
+
+
+# Marks the version checks among the operations of the Redis backend
+_CHECK = object()
+
+
+class RedisBackend(StoredBackend):
+    """
+    Games and users in Redis, shared by bot instances on any host.
+    
+    Keys, below the prefix:
+        games:<username>  hash of the user's games: the JSON record under
+                          the field JSON [word setter, guesser], the
+                          creation time under the same field prefixed by
+                          '#' and the version prefixed by '@'
+        user:<username>   hash with chat_id and last_partner
+        scopes            hash of command menus by chat ID
+        counts            hash of the number of games by state
+        users             set of the known usernames
+    
+    A game is stored under both players, so finding a user's game is one
+    HGETALL. Writes of a batch are sent as one MULTI/EXEC, or, when they
+    write games, as one checked transaction that first compares the
+    versions in the word setter's hash (see RedisClient.checked_transaction).
+    Operations are Redis commands plus (_CHECK, game key, key, field,
+    expected value) checks. The counts and the user set are updated by the
+    same writes, so the metrics read them without scanning the keys.
+    """
+
+    def __init__(self, client: RedisClient, prefix: str = REDIS_PREFIX) -> None:
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self._counts_key = f'{prefix}counts'
+        self._users_key = f'{prefix}users'
+        self._counts_checked = False
+
+    async def _commit(self, operations: List[Sequence[Any]]) -> None:
+        checks: Dict[GameKey, Tuple[str, str, str]] = {}
+        commands = []
+        for operation in operations:
+            if operation[0] is _CHECK:
+                # Later writes of a game in the batch expect what the
+                # earlier ones write; only the first one sees the storage
+                checks.setdefault(operation[1], operation[2:])
+            else:
+                commands.append(operation)
+        if not checks:
+            await self.client.transaction(commands)
+            return
+        if not await self.client.checked_transaction(list(checks.values()), commands):
+            raise GameConflictError(next(iter(checks)))
+
+    def _games_key(self, username: str) -> str:
+        return f'{self.prefix}games:{username}'
+
+    def _user_key(self, username: str) -> str:
+        return f'{self.prefix}user:{username}'
+
+    @staticmethod
+    def _field(word_setter_username: str, guesser_username: str) -> str:
+        return json.dumps([word_setter_username, guesser_username], ensure_ascii=False)
+
+    async def find_game(
+        self,
+        username: str,
+        role: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Optional[Game]:
+        if role not in (None, 'word_setter', 'guesser'):
+            raise ValueError(f"Unknown role: {role}")
+        stamp = self._clock
+        reply = await self.client.execute('HGETALL', self._games_key(username))
+        fields = dict(zip(reply[::2], reply[1::2]))
+        found: Optional[Tuple[int, Game]] = None
+        for field, value in fields.items():
+            if field[0] in '#@':
+                continue
+            game = Game.from_record(json.loads(value))
+            if role == 'word_setter' and game.word_setter_username != username:
+                continue
+            if role == 'guesser' and game.guesser_username != username:
+                continue
+            if state is not None and game.state != state:
+                continue
+            created = int(fields.get('#' + field, 0))
+            if found is None or created < found[0]:
+                game.version = int(fields.get('@' + field) or 0)
+                game.stored_state = game.state
+                found = (created, game)
+        if found is None:
+            return None
+        self._loaded([found[1]], stamp)
+        return found[1]
+
+    async def get_game(self, word_setter_username: str, guesser_username: str) -> Optional[Game]:
+        stamp = self._clock
+        field = self._field(word_setter_username, guesser_username)
+        value, version = await self.client.execute(
+            'HMGET', self._games_key(word_setter_username), field, '@' + field
+        )
+        if value is None:
+            return None
+        game = Game.from_record(json.loads(value))
+        game.version = int(version or 0)
+        game.stored_state = game.state
+        self._loaded([game], stamp)
+        return game
+
+    def _check(self, game: Game, field: str, expected: str) -> Sequence[Any]:
+        """Check a field of the game in the word setter's hash before the batch is written."""
+        key = (game.word_setter_username, game.guesser_username)
+        return (_CHECK, key, self._games_key(game.word_setter_username), field, expected)
+
+    def _store(self, game: Game, created: Optional[int] = None) -> List[Sequence[Any]]:
+        field = self._field(game.word_setter_username, game.guesser_username)
+        if created is None:
+            # Version 0 is a game stored before games were versioned
+            check = self._check(game, '@' + field, str(game.version) if game.version else '')
+        else:
+            # A new game must not exist yet
+            check = self._check(game, field, '')
+        game.version += 1
+        values = [field, json.dumps(game.to_record(), ensure_ascii=False), '@' + field, game.version]
+        if created is not None:
+            values += ['#' + field, created]
+        operations = [
+            check,
+            ('HSET', self._games_key(game.word_setter_username), *values),
+            ('HSET', self._games_key(game.guesser_username), *values),
+        ]
+        if game.stored_state != game.state:
+            operations += self._count(game.stored_state, game.state)
+            game.stored_state = game.state
+        return operations
+
+    def _count(self, old_state: Optional[str], new_state: Optional[str]) -> List[Sequence[Any]]:
+        """Move a game between the counts of two states; None is no state."""
+        commands: List[Sequence[Any]] = []
+        if old_state is not None:
+            commands.append(('HINCRBY', self._counts_key, old_state, -1))
+        if new_state is not None:
+            commands.append(('HINCRBY', self._counts_key, new_state, 1))
+        return commands
+
+    async def create_game(
+        self,
+        word_setter_username: str,
+        guesser_username: str,
+        word_setter_chat_id: int,
+        guesser_chat_id: int
+    ) -> Game:
+        game = Game(word_setter_username, guesser_username, word_setter_chat_id, guesser_chat_id)
+        await self._write(self._store(game, time.time_ns()), games=[game])
+        return game
+
+    async def save_game(self, game: Game) -> None:
+        await self._write(self._store(game), games=[game])
+
+    async def delete_game(self, game: Game, reason: str = 'finish') -> None:
+        key = (game.word_setter_username, game.guesser_username)
+        field = self._field(*key)
+        await self._write([
+            self._check(game, '@' + field, str(game.version) if game.version else ''),
+            ('HDEL', self._games_key(key[0]), field, '#' + field, '@' + field),
+            ('HDEL', self._games_key(key[1]), field, '#' + field, '@' + field),
+            *self._count(game.stored_state, None),
+        ], keys=[key])
+        game.stored_state = None
+
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        reply = await self.client.execute('HGETALL', self._user_key(username))
+        if not reply:
+            return None
+        fields = dict(zip(reply[::2], reply[1::2]))
+        record: Dict[str, Any] = {'chat_id': int(fields['chat_id']) if fields.get('chat_id') else None}
+        if fields.get('last_partner'):
+            record['last_partner'] = fields['last_partner']
+        return record
+
+    async def update_user(self, username: str, chat_id: int, last_partner: Optional[str] = None) -> None:
+        command: List[Any] = ['HSET', self._user_key(username), 'chat_id', '' if chat_id is None else chat_id]
+        if last_partner:
+            command += ['last_partner', last_partner]
+        await self._write([command, ('SADD', self._users_key, username)])
+
+    async def get_command_scope(self, chat_id: int) -> Optional[str]:
+        return await self.client.execute('HGET', f'{self.prefix}scopes', chat_id)
+
+    async def set_command_scope(self, chat_id: int, role: str) -> None:
+        await self._write([('HSET', f'{self.prefix}scopes', chat_id, role)])
+
+    async def _scan(self, pattern: str) -> List[str]:
+        """Find the keys matching a pattern with SCAN, without blocking the server."""
+        keys: List[str] = []
+        cursor = '0'
+        while True:
+            cursor, batch = await self.client.execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', 1000)
+            keys += batch
+            if cursor == '0':
+                return keys
+
+    async def _rebuild_counts(self) -> None:
+        """
+        Fill the counts and the user set from the stored games and users.
+        
+        Only needed for data written before they were kept; a game written
+        by another instance while this runs may be counted twice.
+        """
+        counts: Dict[str, int] = {}
+        for key in await self._scan(self._games_key('*')):
+            word_setter_username = key[len(self._games_key('')):]
+            reply = await self.client.execute('HGETALL', key)
+            for field, value in zip(reply[::2], reply[1::2]):
+                # Games are stored under both players, count them under the word setter
+                if field[0] in '#@' or json.loads(field)[0] != word_setter_username:
+                    continue
+                state = Game.from_record(json.loads(value)).state
+                counts[state] = counts.get(state, 0) + 1
+        for state, count in counts.items():
+            await self.client.execute('HSETNX', self._counts_key, state, count)
+        usernames = [key[len(self._user_key('')):] for key in await self._scan(self._user_key('*'))]
+        if usernames:
+            await self.client.execute('SADD', self._users_key, *usernames)
+        logging.info(f"Rebuilt Redis state counts: {counts}, {len(usernames)} users")
+
+    async def _check_counts(self) -> None:
+        """Rebuild the counts once per process if they were never kept."""
+        if self._counts_checked:
+            return
+        self._counts_checked = True
+        if not await self.client.execute('EXISTS', self._counts_key, self._users_key):
+            await self._rebuild_counts()
+
+    async def count_games(self) -> Dict[str, int]:
+        await self._check_counts()
+        reply = await self.client.execute('HGETALL', self._counts_key)
+        return {state: int(count) for state, count in zip(reply[::2], reply[1::2]) if int(count) > 0}
+
+    async def count_users(self) -> int:
+        await self._check_counts()
+        return await self.client.execute('SCARD', self._users_key)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def create_backend(name: str = STATE_BACKEND) -> StateBackend:
+    """
+    Create the state backend selected by name.
+    
+    Args:
+        name: 'memory', 'sqlite' or 'redis'.
+    
+    Returns:
+        StateBackend: The backend.
+    """
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SqliteBackend(USER_DB_FILE)
+    if name == 'redis':
+        return RedisBackend(RedisClient(REDIS_URL), REDIS_PREFIX)
+    raise ValueError(f"Unknown state backend: {name}")
+
+
+# Global state backend used by the handlers
+state: StateBackend = create_backend()
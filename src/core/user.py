@@ -1,35 +1,387 @@
 """User management and data persistence."""
 
+import atexit
 import json
-from typing import Dict, Any
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 
-from src.config.settings import USER_DATA_FILE
+from src.config.settings import USER_DATA_FILE, USER_DATA_FLUSH_INTERVAL, USER_DB_FILE
+from src.utils.metrics import USER_DATA_SAVE_LATENCY, USER_DATA_SAVE_RECORDS
 
 
-# Global user state
-user_data: Dict[str, Dict[str, Any]] = {}
+# Tables of the user database, also used by the SQLite state backend
+USER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    chat_id INTEGER,
+    last_partner TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS command_scopes (
+    chat_id INTEGER PRIMARY KEY,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+USER_UPSERT = """
+INSERT INTO users (username, chat_id, last_partner) VALUES (?, ?, ?)
+ON CONFLICT (username) DO UPDATE SET
+    chat_id = excluded.chat_id,
+    last_partner = excluded.last_partner
+"""
+
+# Marks a record that was deleted but not yet written
+_DELETED = None
+
+
+class UserStore(MutableMapping):
+    """
+    SQLite-backed user records keyed by username.
+    
+    Records are plain dictionaries with 'chat_id' and, once known,
+    'last_partner'. Changes are buffered in memory and written by flush() in
+    one transaction, so only the pending changes and not the whole user base
+    are kept in memory. The database runs in WAL mode, and every thread gets
+    its own connection, so lookups are not blocked by a flush in progress.
+    The buffers are only touched under a lock that is never held during a
+    database write; flushes are serialized by a second lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.changed = threading.Event()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._flushing: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending_scopes: Dict[int, str] = {}
+        self._flushing_scopes: Dict[int, str] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's database connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(USER_SCHEMA)
+            self._local.connection = connection
+            self._connections.append(connection)
+        return connection
+
+    def _lookup(self, username: str) -> Optional[Dict[str, Any]]:
+        """Find a record, preferring changes that are not written yet."""
+        with self._lock:
+            for buffer in (self._pending, self._flushing):
+                if username in buffer:
+                    record = buffer[username]
+                    return None if record is _DELETED else dict(record)
+        row = self._connection().execute(
+            "SELECT chat_id, last_partner FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = {'chat_id': row[0]}
+        if row[1] is not None:
+            record['last_partner'] = row[1]
+        return record
+
+    def __getitem__(self, username: str) -> Dict[str, Any]:
+        record = self._lookup(username)
+        if record is None:
+            raise KeyError(username)
+        return record
+
+    def __setitem__(self, username: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending[username] = dict(record)
+        self.changed.set()
+
+    def __delitem__(self, username: str) -> None:
+        if username not in self:
+            raise KeyError(username)
+        with self._lock:
+            self._pending[username] = _DELETED
+        self.changed.set()
+
+    def __contains__(self, username: object) -> bool:
+        return isinstance(username, str) and self._lookup(username) is not None
+
+    def _buffered(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get the changes that are not written yet, the newest for each user."""
+        with self._lock:
+            return {**self._flushing, **self._pending}
+
+    def __iter__(self) -> Iterator[str]:
+        buffered = self._buffered()
+        rows = self._connection().execute("SELECT username FROM users ORDER BY username").fetchall()
+        for (username,) in rows:
+            if username not in buffered:
+                yield username
+        for username, record in buffered.items():
+            if record is not _DELETED:
+                yield username
+
+    def __len__(self) -> int:
+        # No flush may write buffered users between the counts
+        with self._write_lock:
+            buffered = self._buffered()
+            connection = self._connection()
+            count = connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            count += sum(record is not _DELETED for record in buffered.values())
+            usernames = list(buffered)
+            # Buffered users that are stored already were counted twice
+            for start in range(0, len(usernames), 500):
+                chunk = usernames[start:start + 500]
+                count -= connection.execute(
+                    f"SELECT COUNT(*) FROM users WHERE username IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchone()[0]
+            return count
+
+    def clear(self) -> None:
+        """Delete all records and command scopes, including unwritten changes."""
+        # A flush in progress finishes first, so its records are deleted too
+        with self._write_lock:
+            with self._lock:
+                self._pending.clear()
+                self._pending_scopes.clear()
+            self._connection().execute("DELETE FROM users")
+            self._connection().execute("DELETE FROM command_scopes")
+
+    def update_user(self, username: str, chat_id: int, last_partner: Optional[str] = None) -> None:
+        """
+        Update a user's chat ID and, optionally, their last partner.
+        
+        Args:
+            username: The username to update.
+            chat_id: The user's chat ID.
+            last_partner: Optional username of the last game partner.
+        """
+        record = self._lookup(username) or {}
+        record['chat_id'] = chat_id
+        if last_partner:
+            record['last_partner'] = last_partner
+        self[username] = record
+
+    def get_command_scope(self, chat_id: int) -> Optional[str]:
+        """
+        Get the command menu last applied to a chat.
+        
+        Args:
+            chat_id: The chat ID.
+            
+        Returns:
+            Optional[str]: The role whose commands the chat shows, or None if unknown.
+        """
+        with self._lock:
+            for buffer in (self._pending_scopes, self._flushing_scopes):
+                if chat_id in buffer:
+                    return buffer[chat_id]
+        row = self._connection().execute(
+            "SELECT role FROM command_scopes WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_command_scope(self, chat_id: int, role: str) -> None:
+        """
+        Remember the command menu applied to a chat.
+        
+        Args:
+            chat_id: The chat ID.
+            role: The role whose commands the chat now shows.
+        """
+        with self._lock:
+            self._pending_scopes[chat_id] = role
+        self.changed.set()
+
+    def flush(self) -> int:
+        """
+        Write all pending changes in one transaction.
+        
+        Returns:
+            int: Number of records written.
+        """
+        with self._write_lock:
+            with self._lock:
+                self.changed.clear()
+                if not self._pending and not self._pending_scopes:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                self._flushing_scopes, self._pending_scopes = self._pending_scopes, {}
+                batch = self._flushing
+                scopes = self._flushing_scopes
+            upserts: List[Tuple[str, Any, Any]] = []
+            deletes: List[Tuple[str]] = []
+            for username, record in batch.items():
+                if record is _DELETED:
+                    deletes.append((username,))
+                else:
+                    upserts.append((username, record.get('chat_id'), record.get('last_partner')))
+
+            connection = self._connection()
+            try:
+                connection.execute("BEGIN")
+                connection.executemany(USER_UPSERT, upserts)
+                connection.executemany("DELETE FROM users WHERE username = ?", deletes)
+                connection.executemany(
+                    "INSERT OR REPLACE INTO command_scopes (chat_id, role) VALUES (?, ?)",
+                    scopes.items()
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                with self._lock:
+                    # Keep the failed changes unless they were superseded meanwhile
+                    for username, record in batch.items():
+                        self._pending.setdefault(username, record)
+                    for chat_id, role in scopes.items():
+                        self._pending_scopes.setdefault(chat_id, role)
+                self.changed.set()
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+                    self._flushing_scopes = {}
+            return len(batch) + len(scopes)
+
+    def import_json(self, json_path: Path) -> int:
+        """
+        Import users from the legacy JSON file on the first run.
+        
+        The import happens once per database; later calls do nothing.
+        
+        Args:
+            json_path: Path to the legacy user data JSON file.
+        
+        Returns:
+            int: Number of imported users.
+        """
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return 0
+
+        records: Dict[str, Dict[str, Any]] = {}
+        json_path = Path(json_path)
+        if json_path.exists():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+
+        with self._write_lock:
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(USER_UPSERT, [
+                    (username, record.get('chat_id'), record.get('last_partner'))
+                    for username, record in records.items()
+                ])
+                connection.execute(
+                    "INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (str(json_path),)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return len(records)
+
+    def close(self) -> None:
+        """Flush pending changes and close all connections."""
+        self.flush()
+        with self._write_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+            self._local = threading.local()
+
+
+# Global user state; the database is opened on first use
+user_data: UserStore = UserStore(USER_DB_FILE)
+
+# Whether the state backend writes user changes as soon as they are made,
+# set in sharded mode, where worker processes share the database; the
+# background flusher then only retries failed writes
+write_through = False
+
+# Write-behind state: a background thread writes changes at most once per
+# flush interval
+_stop_flusher = threading.Event()
+_flusher: Optional[threading.Thread] = None
 
 
 def load_user_data() -> None:
-    """Load user data from the JSON file."""
+    """Import the legacy JSON user data into the database on the first run."""
     try:
-        if USER_DATA_FILE.exists():
-            with open(USER_DATA_FILE, 'r', encoding='utf-8') as f:
-                global user_data
-                user_data = json.load(f)
+        imported = user_data.import_json(USER_DATA_FILE)
+        if imported:
+            print(f"Imported {imported} users from {USER_DATA_FILE}")
     except Exception as e:
         print(f"Error loading user data: {e}")
-        user_data.clear()
+
+
+# Metric series of user data writes
+_save_latency = USER_DATA_SAVE_LATENCY.labels()
+_save_records = USER_DATA_SAVE_RECORDS.labels()
 
 
 def save_user_data() -> None:
-    """Save user data to the JSON file."""
+    """Write all pending user data changes to the database."""
+    started = time.perf_counter()
     try:
-        with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(user_data, f, ensure_ascii=False, indent=2)
+        written = user_data.flush()
     except Exception as e:
         print(f"Error saving user data: {e}")
+        return
+    if written:
+        _save_latency.observe(time.perf_counter() - started)
+        _save_records.observe(written)
+
+
+def flush_user_data() -> None:
+    """Save user data if it changed since the last save."""
+    if user_data.changed.is_set():
+        save_user_data()
+
+
+def _flush_loop() -> None:
+    """Background loop that writes changed user data once per flush interval."""
+    while not _stop_flusher.is_set():
+        user_data.changed.wait()
+        if _stop_flusher.is_set():
+            break
+        # Let further updates within the interval share this write
+        _stop_flusher.wait(USER_DATA_FLUSH_INTERVAL)
+        flush_user_data()
+
+
+def start_user_data_flusher() -> None:
+    """Start the background thread that writes user data behind updates."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    _stop_flusher.clear()
+    _flusher = threading.Thread(target=_flush_loop, name='user-data-flusher', daemon=True)
+    _flusher.start()
+
+
+def stop_user_data_flusher() -> None:
+    """Stop the background writer and flush any pending changes."""
+    global _flusher
+    if _flusher is not None:
+        _stop_flusher.set()
+        # Wake the thread if it is waiting for the first update
+        user_data.changed.set()
+        _flusher.join()
+        _flusher = None
+    flush_user_data()
 
 
 def get_user_chat_id(username: str) -> int:
@@ -38,7 +390,7 @@ def get_user_chat_id(username: str) -> int:
     
     Args:
         username: The username to look up.
-        
+    
     Returns:
         int: The user's chat ID if found, None otherwise.
     """
@@ -49,20 +401,16 @@ def update_user_data(username: str, chat_id: int, last_partner: str = None) -> N
     """
     Update user data.
     
+    The change is written to disk by the background flusher, or by the final
+    flush on shutdown.
+    
     Args:
         username: The username to update.
         chat_id: The user's chat ID.
         last_partner: Optional username of the last game partner.
     """
-    if username not in user_data:
-        user_data[username] = {}
-    
-    user_data[username]['chat_id'] = chat_id
-    if last_partner:
-        user_data[username]['last_partner'] = last_partner
-    
-    save_user_data()
+    user_data.update_user(username, chat_id, last_partner)
 
 
-# Load user data on module import
-load_user_data() 
\ No newline at end of file
+# Never lose pending updates when the process exits
+atexit.register(flush_user_data)
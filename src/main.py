@@ -2,9 +2,11 @@
 
 import asyncio
 import logging
+from typing import Optional
 import nest_asyncio
 from telegram import Update
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
@@ -12,10 +14,18 @@ from telegram.ext import (
     ConversationHandler,
     CallbackQueryHandler,
 )
-from telegram.request import HTTPXRequest
+from telegram.request import BaseRequest, HTTPXRequest
 
-from src.config.settings import TELEGRAM_BOT_TOKEN
-from src.utils.logger import setup_logger
+from src.config.settings import (
+    ADMIN_USERNAMES,
+    BOT_MODE,
+    METRICS_PORT,
+    PROFILE_ON_START,
+    SHARD_WORKERS,
+    STATE_BACKEND,
+    TELEGRAM_BOT_TOKEN,
+)
+from src.utils.logger import setup_logger, stop_game_log
 from src.bot.commands import (
     DEFAULT_COMMANDS,
     WORD_SETTER_COMMANDS,
@@ -28,6 +38,7 @@ from src.bot.handlers.game import (
     receive_word,
     cancel_command,
     handle_last_partner,
+    notify_dropped_games,
     WAITING_FOR_SECOND_PLAYER,
     WAITING_FOR_WORD
 )
@@ -38,15 +49,79 @@ from src.bot.handlers.say import (
 )
 from src.bot.handlers.addtry import addtry_command
 from src.bot.handlers.guess import handle_guess
-from src.core.user import save_user_data
+from src.bot.handlers.profile import profile_command
+from src.bot.metrics import InstrumentedRequest, MetricsServer, instrument_handlers
+from src.bot.profiling import start_profiling
+from src.bot.sharding import run_sharded
+from src.bot.webhook import run_webhook
+from src.core.game import games
+from src.core.journal import open_game_journal
+from src.core.state import state
+from src.core.user import load_user_data, save_user_data, start_user_data_flusher, stop_user_data_flusher
 
 
-async def main() -> None:
-    """Main function to start the bot."""
-    # Set up logging
-    game_logger, system_logger = setup_logger()
+def add_handlers(application: Application) -> None:
+    """
+    Register the bot's handlers on an application.
+    
+    Every callback records its latency in the handler metrics.
+    
+    Args:
+        application: The application to configure.
+    """
+    # Create conversation handlers
+    game_conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('new_game', new_game_command)],
+        states={
+            WAITING_FOR_SECOND_PLAYER: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_player),
+                CallbackQueryHandler(handle_last_partner, pattern='^last_partner_')
+            ],
+            WAITING_FOR_WORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_word)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel_command)],
+        per_message=False
+    )
 
-    try:
+    say_conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('say', say_command)],
+        states={
+            SAY_WAITING_FOR_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_say_message)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel_command)],
+        per_message=False
+    )
+
+    # Add handlers
+    handlers = [
+        CommandHandler('start', start_command),
+        game_conv_handler,
+        say_conv_handler,
+        CommandHandler('addtry', addtry_command),
+        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_guess)
+    ]
+    if ADMIN_USERNAMES:
+        # Administrators can profile the handlers with /profile
+        handlers.append(CommandHandler('profile', profile_command))
+
+    for handler in instrument_handlers(handlers):
+        application.add_handler(handler)
+
+
+def build_application(request: Optional[BaseRequest] = None) -> Application:
+    """
+    Create the application with the bot's handlers.
+    
+    Bot API calls are recorded in the Telegram API metrics.
+    
+    Args:
+        request: Request backend for Bot API calls. Defaults to HTTPX with
+            the bot's timeout settings.
+    
+    Returns:
+        Application: The configured application.
+    """
+    if request is None:
         # Create the application with proper timeout settings
         request = HTTPXRequest(
             connection_pool_size=8,
@@ -54,65 +129,82 @@ async def main() -> None:
             read_timeout=10.0,
             write_timeout=10.0,
         )
-        
-        application = (
-            ApplicationBuilder()
-            .token(TELEGRAM_BOT_TOKEN)
-            .request(request)
-            .concurrent_updates(True)
-            .build()
-        )
 
-        # Create conversation handlers
-        game_conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('new_game', new_game_command)],
-            states={
-                WAITING_FOR_SECOND_PLAYER: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, set_player),
-                    CallbackQueryHandler(handle_last_partner, pattern='^last_partner_')
-                ],
-                WAITING_FOR_WORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_word)],
-            },
-            fallbacks=[CommandHandler('cancel', cancel_command)],
-            per_message=False
-        )
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(InstrumentedRequest(request))
+        .concurrent_updates(True)
+        .build()
+    )
+    add_handlers(application)
+    return application
 
-        say_conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('say', say_command)],
-            states={
-                SAY_WAITING_FOR_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_say_message)],
-            },
-            fallbacks=[CommandHandler('cancel', cancel_command)],
-            per_message=False
-        )
 
-        # Add handlers
-        handlers = [
-            CommandHandler('start', start_command),
-            game_conv_handler,
-            say_conv_handler,
-            CommandHandler('addtry', addtry_command),
-            MessageHandler(filters.TEXT & ~filters.COMMAND, handle_guess)
-        ]
+async def main() -> None:
+    """Main function to start the bot."""
+    # Set up logging
+    game_logger, system_logger = setup_logger()
+
+    if STATE_BACKEND in ('memory', 'sqlite'):
+        # Users of these backends live in USER_DB_FILE, import the legacy JSON once
+        load_user_data()
+
+    if SHARD_WORKERS > 1:
+        if STATE_BACKEND != 'memory':
+            raise ValueError("Sharded mode keeps games in the workers, STATE_BACKEND must be memory")
+        # Games are handled by worker processes, this process only routes updates
+        system_logger.info(f"Starting bot in {BOT_MODE} mode with {SHARD_WORKERS} game workers...")
+        await run_sharded(SHARD_WORKERS)
+        return
 
-        for handler in handlers:
-            application.add_handler(handler)
+    metrics_server = None
+    journal = None
+    if STATE_BACKEND == 'memory':
+        # Write user data changes in the background
+        start_user_data_flusher()
+
+        # Recover games that were active before the last shutdown or crash
+        journal = open_game_journal(games)
+
+    try:
+        application = build_application()
 
         # Set default bot commands
         await application.bot.set_my_commands([
             (cmd.command, cmd.description) for cmd in DEFAULT_COMMANDS
         ])
 
+        if journal is not None:
+            # Games waiting for a word lost their conversation in the restart
+            await notify_dropped_games(application.bot, journal.dropped_games)
+
+        if PROFILE_ON_START:
+            start_profiling(application, PROFILE_ON_START)
+
+        if METRICS_PORT:
+            metrics_server = MetricsServer()
+            await metrics_server.start()
+
         # Start the bot
-        system_logger.info("Starting bot...")
-        await application.run_polling(drop_pending_updates=True)
+        system_logger.info(f"Starting bot in {BOT_MODE} mode...")
+        if BOT_MODE == 'webhook':
+            await run_webhook(application)
+        else:
+            await application.run_polling(drop_pending_updates=True)
 
     except Exception as e:
         system_logger.error(f"Error running bot: {str(e)}", exc_info=True)
         raise
     finally:
+        if metrics_server is not None:
+            await metrics_server.stop()
         # Ensure we save user data on shutdown
-        save_user_data()
+        if journal is not None:
+            stop_user_data_flusher()
+            journal.close()
+        await state.close()
+        stop_game_log()
         system_logger.info("Bot stopped")
 
 
@@ -1,40 +1,336 @@
 """Logging configuration for the application."""
 
+import atexit
+import gzip
+import json
 import logging
+import os
+import queue
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional
+from typing import Any, List, Optional
 
-from src.config.settings import GAME_LOGS_FILE
+from src.config.settings import (
+    GAME_LOG_BACKUPS,
+    GAME_LOG_LEVEL,
+    GAME_LOG_MAX_BYTES,
+    GAME_LOG_ROTATE_INTERVAL,
+    GAME_LOGS_FILE,
+)
+
+
+# Logger of game events, written as JSON lines to the game log
+game_log = logging.getLogger('game')
+
+# Running pipeline of the game log, set up by setup_logger
+_listener: Optional['BatchingQueueListener'] = None
+
+
+def log_game_event(event: str, **fields: Any) -> None:
+    """
+    Log a game event.
+    
+    The event is queued as is; turning it into a JSON line and writing it
+    happen on the game log's background thread. Nothing is done when the
+    game log level is above INFO.
+    
+    Args:
+        event: The event type, such as game_started or guess.
+        **fields: Event data: players, word length, attempt number and so on.
+    """
+    if game_log.isEnabledFor(logging.INFO):
+        game_log.info(event, extra={'fields': fields})
+
+
+class GameEventFormatter(logging.Formatter):
+    """Format game events as JSON objects with the local time of the event."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'event': record.getMessage(),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_info:
+            event['error'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False)
+
+
+class EventQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchFileHandler(logging.FileHandler):
+    """File handler that writes a batch of records with one write and one flush."""
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        """
+        Format records and append them to the file.
+        
+        Args:
+            records: The records, in order.
+        """
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        with self.lock:
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(''.join(lines))
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class RotatingBatchFileHandler(BatchFileHandler):
+    """
+    Batch file handler that rotates the file by size and age.
+    
+    A rotated file is renamed to the log file's name plus the UTC time of
+    the rotation and a sequence number, such as game_logs.log.20261017-221548-000000,
+    so segment names sort in the order they were written, across DST changes
+    too. The age of the live file counts from its first event, which
+    survives restarts, unlike the file's modification time. Rotated files are
+    gzipped and the oldest beyond the retention count removed by a
+    background thread, and the same is done on start for files left
+    uncompressed by an earlier run.
+    """
+
+    def __init__(
+        self,
+        filename: Path,
+        max_bytes: int = 0,
+        interval: float = 0,
+        backups: int = 0,
+        encoding: Optional[str] = None
+    ) -> None:
+        """
+        Initialize the handler.
+        
+        Args:
+            filename: The live log file.
+            max_bytes: Size at which the file is rotated, 0 for no limit.
+            interval: Seconds after which the file is rotated, 0 for no limit.
+            backups: Number of rotated files kept, 0 to keep all.
+            encoding: Encoding of the file.
+        """
+        super().__init__(filename, encoding=encoding)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backups = backups
+        self.rollover_at = self._next_rollover(self._started())
+        self._segment_name = re.compile(re.escape(os.path.basename(self.baseFilename)) + r'\.\d{8}-\d{6}-\d{6}(\.gz)?')
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='game-log-gzip')
+        self._compressor.submit(self._compress_segments)
+
+    def _started(self) -> float:
+        """
+        Time the live file was started.
+        
+        Returns:
+            float: The time of its first event, the current time if it is
+                empty, or its modification time if the first line is not a
+                JSON event.
+        """
+        with open(self.baseFilename, 'rb') as f:
+            first_line = f.readline()
+        if not first_line:
+            return time.time()
+        try:
+            return datetime.fromisoformat(json.loads(first_line)['time']).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return os.stat(self.baseFilename).st_mtime
+
+    def _next_rollover(self, started: float) -> float:
+        """Time of the next rotation by age of a file started at the given time."""
+        return started + self.interval if self.interval > 0 else float('inf')
+
+    def should_rollover(self) -> bool:
+        """
+        Check whether the file has to be rotated before the next write.
+        
+        Returns:
+            bool: True if the file is over the size limit or too old.
+        """
+        if self.stream is None:
+            self.stream = self._open()
+        size = self.stream.tell()
+        if size == 0:
+            # The file starts with the batch about to be written
+            self.rollover_at = self._next_rollover(time.time())
+            return False
+        return (self.max_bytes > 0 and size >= self.max_bytes) or time.time() >= self.rollover_at
+
+    def do_rollover(self) -> None:
+        """Rename the file to the next segment and queue its compression."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+        sequence = 0
+        while True:
+            segment = f'{self.baseFilename}.{stamp}-{sequence:06d}'
+            if not os.path.exists(segment) and not os.path.exists(segment + '.gz'):
+                break
+            sequence += 1
+        os.rename(self.baseFilename, segment)
+        self.rollover_at = self._next_rollover(time.time())
+        self._compressor.submit(self._compress_segments)
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        with self.lock:
+            try:
+                if self.should_rollover():
+                    self.do_rollover()
+            except Exception:
+                self.handleError(records[-1])
+        super().emit_batch(records)
+
+    def _compress_segments(self) -> None:
+        """Gzip the rotated files and remove the oldest beyond the retention count."""
+        directory = os.path.dirname(self.baseFilename)
+        try:
+            names = sorted(name for name in os.listdir(directory) if self._segment_name.fullmatch(name))
+            for name in names:
+                if name.endswith('.gz'):
+                    continue
+                path = os.path.join(directory, name)
+                if name + '.gz' not in names:
+                    # Compressed under a name readers of the segments do
+                    # not match, then moved into place whole
+                    partial = os.path.join(directory, f'.{name}.gz.tmp')
+                    with open(path, 'rb') as source, gzip.open(partial, 'wb') as target:
+                        shutil.copyfileobj(source, target)
+                    os.replace(partial, path + '.gz')
+                os.remove(path)
+            segments = sorted({name.removesuffix('.gz') for name in names})
+            if self.backups > 0:
+                for name in segments[:-self.backups]:
+                    os.remove(os.path.join(directory, name + '.gz'))
+        except OSError:
+            logging.getLogger('system').exception("Failed to compress rotated game logs")
+
+    def close(self) -> None:
+        """Close the file and wait for the queued compressions."""
+        super().close()
+        self._compressor.shutdown(wait=True)
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    Queue listener that hands its handlers all records waiting in the queue.
+    
+    Handlers with emit_batch receive each batch at once, others get the
+    records one by one.
+    """
+
+    # Most records handled in one batch
+    MAX_BATCH = 512
+
+    def _monitor(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            record = self.dequeue(True)
+            while True:
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(self.prepare(record))
+                if len(batch) >= self.MAX_BATCH:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            if batch:
+                self.handle_batch(batch)
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        """
+        Pass records to the handlers that accept their levels.
+        
+        Args:
+            records: The records, in order.
+        """
+        for handler in self.handlers:
+            accepted = [
+                record for record in records
+                if not self.respect_handler_level or record.levelno >= handler.level
+            ]
+            if not accepted:
+                continue
+            if isinstance(handler, BatchFileHandler):
+                accepted = [record for record in accepted if handler.filter(record)]
+                handler.emit_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+
+def stop_game_log() -> None:
+    """Write the queued game events and close the game log."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for handler in list(game_log.handlers):
+        if isinstance(handler, EventQueueHandler):
+            game_log.removeHandler(handler)
 
 
 def setup_logger(log_file: Optional[Path] = None) -> tuple[logging.Logger, logging.Logger]:
     """
     Set up loggers for the application.
     
+    Game events go through a queue to a background thread, which formats
+    them and appends them to the game log in batches, so logging never
+    waits for the disk. The game log is rotated and its old segments
+    compressed off the event loop as well.
+    
     Args:
         log_file: Optional path to the log file. Defaults to 'game_logs.log'.
-        
+    
     Returns:
         tuple: A tuple containing (game_logger, system_logger).
     """
-    # Create a separate logger for the game
-    game_logger = logging.getLogger('game')
-    game_logger.setLevel(logging.INFO)
-
-    # Create a formatter
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    global _listener
+    game_log.setLevel(GAME_LOG_LEVEL)
 
     log_path = Path(log_file) if log_file else Path(GAME_LOGS_FILE)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    file_handler = logging.FileHandler(log_path, encoding='utf-8')
-    file_handler.setFormatter(formatter)
+    file_handler = RotatingBatchFileHandler(
+        log_path, GAME_LOG_MAX_BYTES, GAME_LOG_ROTATE_INTERVAL, GAME_LOG_BACKUPS, encoding='utf-8'
+    )
+    file_handler.setFormatter(GameEventFormatter())
 
-    # Add handlers to logger
-    game_logger.addHandler(file_handler)
+    # Replace the pipeline of an earlier setup
+    stop_game_log()
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    game_log.addHandler(EventQueueHandler(events))
+    _listener = BatchingQueueListener(events, file_handler, respect_handler_level=True)
+    _listener.start()
 
     # Disable log propagation to parent logger
-    game_logger.propagate = False
+    game_log.propagate = False
 
     # Basic setup for system logs
     logging.basicConfig(
@@ -43,4 +339,8 @@ def setup_logger(log_file: Optional[Path] = None) -> tuple[logging.Logger, loggi
     )
     system_logger = logging.getLogger('system')
 
-    return game_logger, system_logger
+    return game_log, system_logger
+
+
+# Never lose queued game events when the process exits
+atexit.register(stop_game_log)
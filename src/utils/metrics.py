@@ -0,0 +1,256 @@
+"""Prometheus metrics of the bot's internals.
+
+Metrics are plain counters, gauges and histograms kept in memory and
+rendered in the Prometheus text format when scraped. Labelled series are
+created once, usually when the code that records them is set up, and the
+recording path only updates numbers on an existing series: no label
+lookups, strings or objects per event.
+"""
+
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+# Buckets in seconds for handler and Bot API latencies
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Buckets in records for user data writes
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+
+# A collector updates gauges right before the metrics are rendered
+Collector = Callable[[], Awaitable[None]]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render label pairs, escaped as the text format requires."""
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, integers without a fraction."""
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class CounterSeries:
+    """One labelled series of a counter."""
+
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Add to the counter."""
+        self.value += amount
+
+
+class GaugeSeries:
+    """One labelled series of a gauge."""
+
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self.value = value
+
+
+class HistogramSeries:
+    """
+    One labelled series of a histogram.
+    
+    Counts are kept per bucket and only summed up into the cumulative
+    counts of the text format when rendered.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """
+    A metric family: a name, a help text and its labelled series.
+    
+    Attributes:
+        name: The metric name.
+        documentation: The help text.
+        labelnames: Names of the labels, in order.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _create(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> object:
+        """
+        Get the series of the label values, creating it on first use.
+        
+        Look series up once and keep them; this is not meant for the
+        recording path.
+        
+        Args:
+            *values: One value per label name.
+        
+        Returns:
+            object: The series.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = self._create()
+        return series
+
+    def samples(self) -> List[str]:
+        """Render the samples of all series."""
+        return [
+            f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}'
+            for values, series in self._series.items()
+        ]
+
+    def render(self) -> str:
+        """Render the family in the text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        return '\n'.join(lines + self.samples())
+
+
+class Counter(Metric):
+    """A counter that only goes up."""
+
+    kind = 'counter'
+
+    def _create(self) -> CounterSeries:
+        return CounterSeries()
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = 'gauge'
+
+    def _create(self) -> GaugeSeries:
+        return GaugeSeries()
+
+
+class Histogram(Metric):
+    """A distribution of observations over fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create(self) -> HistogramSeries:
+        return HistogramSeries(self.buckets)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                labels = _format_labels(self.labelnames + ('le',), values + (le,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series.sum)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """The metric families to expose and the collectors that refresh gauges."""
+
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+        self.collectors: List[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric family and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """Run a collector before every render."""
+        self.collectors.append(collector)
+
+    async def render(self) -> str:
+        """
+        Refresh the gauges and render all metrics.
+        
+        Returns:
+            str: The metrics in the Prometheus text format.
+        """
+        for collector in self.collectors:
+            await collector()
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+# Metrics of this process
+registry = Registry()
+
+HANDLER_LATENCY = registry.register(Histogram(
+    'wordle_handler_seconds', "Time spent in update handlers.", ['handler']
+))
+TELEGRAM_API_LATENCY = registry.register(Histogram(
+    'wordle_telegram_api_seconds', "Time of Bot API requests; the count is the number of calls.", ['method']
+))
+TELEGRAM_API_ERRORS = registry.register(Counter(
+    'wordle_telegram_api_errors_total', "Bot API requests that failed or got an error status.", ['method']
+))
+ACTIVE_GAMES = registry.register(Gauge(
+    'wordle_active_games', "Games in progress by state.", ['state']
+))
+REGISTERED_USERS = registry.register(Gauge(
+    'wordle_registered_users', "Users known to the bot."
+))
+USER_DATA_SAVE_LATENCY = registry.register(Histogram(
+    'wordle_user_data_save_seconds', "Time of save_user_data writes."
+))
+USER_DATA_SAVE_RECORDS = registry.register(Histogram(
+    'wordle_user_data_save_records', "Records written per save_user_data.", buckets=SIZE_BUCKETS
+))
+DISPATCHER_QUEUE_DEPTH = registry.register(Gauge(
+    'wordle_dispatcher_queue_depth', "Outbound calls waiting in the dispatcher by priority lane.", ['priority']
+))
+DISPATCHER_LATENCY = registry.register(Histogram(
+    'wordle_dispatcher_seconds', "Time from queueing an outbound call to its completion.", ['priority']
+))
+DISPATCHER_CALLS = registry.register(Counter(
+    'wordle_dispatcher_calls_total', "Outbound calls by outcome: sent, retried or failed.", ['outcome']
+))
@@ -0,0 +1,128 @@
+"""Sampling profiler of one thread, with flamegraph-compatible output."""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType
+from typing import List, Optional, Tuple
+
+def describe(code: CodeType) -> str:
+    """Name a function by its name, file and first line."""
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Sampling profiler of one thread.
+    
+    A background thread reads the target thread's current stack at a fixed
+    interval, while the sampler is enabled, and counts identical stacks.
+    Nothing runs in the target thread, so code there is not slowed down
+    beyond the cost of sharing the interpreter with the sampling thread.
+    
+    Attributes:
+        stacks: Number of samples per stack, a tuple of code objects from
+            the outermost frame to the innermost.
+        samples: Total number of samples taken.
+        enabled: Whether samples are recorded; the thread keeps running
+            while this is False.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005) -> None:
+        """
+        Initialize the sampler.
+        
+        Args:
+            thread_id: Identifier of the thread to sample.
+            interval: Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.enabled = True
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        """Take samples until stopped."""
+        while not self._stop.wait(self.interval):
+            if not self.enabled:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> List[str]:
+        """
+        Render the samples as collapsed stacks.
+        
+        Each line is the semicolon-separated stack from the outermost
+        function and the number of samples, as flamegraph.pl and
+        speedscope read them.
+        
+        Returns:
+            List[str]: The lines, most sampled stacks first.
+        """
+        return [
+            ';'.join(describe(code) for code in stack) + f' {count}'
+            for stack, count in self.stacks.most_common()
+        ]
+
+    def top(self, limit: int) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """
+        Find the functions with the most samples.
+        
+        Args:
+            limit: Number of functions to list.
+        
+        Returns:
+            Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]: Functions
+                with their own samples, where they were the innermost frame,
+                and with their total samples, where they were anywhere on
+                the stack.
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        return (
+            [(describe(code), count) for code, count in own.most_common(limit)],
+            [(describe(code), count) for code, count in total.most_common(limit)],
+        )
+
+    def write(self, collapsed_file: Path) -> None:
+        """
+        Write the collapsed stacks to a file.
+        
+        Args:
+            collapsed_file: The output file.
+        """
+        collapsed_file.write_text(''.join(line + '\n' for line in self.collapsed()), encoding='utf-8')
@@ -0,0 +1,37 @@
+"""Shared test fixtures."""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Point every data path at a scratch directory before any bot module reads
+# the settings, so tests never touch the user database, journal or logs of
+# the checkout they run in
+_DATA_DIR = Path(tempfile.mkdtemp(prefix="wordle-tests-"))
+os.environ.update({
+    "DATA_DIR": str(_DATA_DIR),
+    "USER_DATA_FILE": str(_DATA_DIR / "user_data.json"),
+    "USER_DB_FILE": str(_DATA_DIR / "user_data.sqlite3"),
+    "JOURNAL_DIR": str(_DATA_DIR / "journal"),
+    "LOGS_DIR": str(_DATA_DIR / "logs"),
+    "GAME_LOGS_FILE": str(_DATA_DIR / "logs" / "game_logs.log"),
+    "MEDIA_CACHE_FILE": str(_DATA_DIR / "media_cache.json"),
+})
+
+from src.bot.dispatcher import dispatcher  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def scratch_data_dir():
+    """The scratch directory behind the data paths, removed after the run."""
+    yield _DATA_DIR
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def unlimited_dispatcher():
+    """Lift the outbound rate limits so handler tests do not wait on them."""
+    dispatcher.configure(1e6, 1e6, 1e6, 1e6, max_retries=3, retry_base_delay=0.001)
+    yield dispatcher
@@ -0,0 +1,74 @@
+"""Tests for the per-chat command menu cache."""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import telegram
+
+from src.bot import commands
+from src.bot.commands import SCOPE_COMMANDS, update_user_commands
+from src.core.game import Game, games
+from src.core.user import user_data
+
+
+@pytest.fixture(autouse=True)
+def cleanup() -> None:
+    """Clean up games, users and cache counters before and after each test."""
+    games.clear()
+    user_data.clear()
+    commands.scope_stats = commands.CommandScopeStats()
+    yield
+    games.clear()
+    user_data.clear()
+
+
+def make_update(username: str, chat_id: int) -> SimpleNamespace:
+    """Create the parts of an update that update_user_commands reads."""
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(username=username),
+        effective_chat=SimpleNamespace(id=chat_id)
+    )
+
+
+async def test_telegram_is_called_only_on_role_change() -> None:
+    """Repeated updates for an unchanged role hit the cache."""
+    context = SimpleNamespace(bot=SimpleNamespace(set_my_commands=AsyncMock()))
+    setter = make_update("alice", 1001)
+
+    await update_user_commands(setter, context)
+    await update_user_commands(setter, context)
+    assert context.bot.set_my_commands.await_count == 1
+    assert context.bot.set_my_commands.await_args.kwargs["commands"] == SCOPE_COMMANDS["default"]
+
+    game = Game("alice", "bob", 1001, 1002, state="waiting_for_guess")
+    games[("alice", "bob")] = game
+    await update_user_commands(setter, context)
+    await update_user_commands(setter, context)
+    assert context.bot.set_my_commands.await_count == 2
+    assert context.bot.set_my_commands.await_args.kwargs["commands"] == SCOPE_COMMANDS["word_setter"]
+
+    assert (commands.scope_stats.hits, commands.scope_stats.misses) == (2, 2)
+
+
+async def test_failed_update_is_retried() -> None:
+    """A failed Telegram call does not mark the chat as updated."""
+    context = SimpleNamespace(bot=SimpleNamespace(set_my_commands=AsyncMock(side_effect=[RuntimeError, None])))
+    update = make_update("alice", 1001)
+
+    await update_user_commands(update, context)
+    await update_user_commands(update, context)
+    assert context.bot.set_my_commands.await_count == 2
+    assert commands.scope_stats.errors == 1
+    assert user_data.get_command_scope(1001) == "default"
+
+
+async def test_flood_limit_is_retried_by_the_dispatcher() -> None:
+    """Menu updates go through the dispatcher, which waits out RetryAfter."""
+    context = SimpleNamespace(bot=SimpleNamespace(
+        set_my_commands=AsyncMock(side_effect=[telegram.error.RetryAfter(0), True])
+    ))
+
+    await update_user_commands(make_update("alice", 1001), context)
+    assert context.bot.set_my_commands.await_count == 2
+    assert context.bot.set_my_commands.await_args.kwargs["scope"].chat_id == 1001
+    assert commands.scope_stats.errors == 0
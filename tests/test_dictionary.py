@@ -0,0 +1,67 @@
+"""Tests for the word dictionary."""
+from pathlib import Path
+
+import pytest
+
+from src.config.settings import ENGLISH_ALPHABET, RUSSIAN_ALPHABET
+from src.core import dictionary as dictionary_module
+from src.core.dictionary import WordDictionary, build_dictionary, detect_language, is_known_word
+
+
+@pytest.fixture
+def russian(tmp_path: Path) -> WordDictionary:
+    """Build a small Russian dictionary."""
+    path = tmp_path / "russian.dict"
+    words = ["слово\n", "Ёлка\n", "книга\n", "кот\n", "абрикосы\n", "яблоко\n", "word\n", "слово\n"]
+    assert build_dictionary(words, RUSSIAN_ALPHABET, path) == 5
+    dictionary = WordDictionary(path, RUSSIAN_ALPHABET)
+    yield dictionary
+    dictionary.close()
+
+
+def test_lookup(russian: WordDictionary) -> None:
+    """Known words are found in any case and with 'ё' or 'е'."""
+    assert len(russian) == 5
+    for word in ["слово", "СЛОВО", "ёлка", "елка", "книга", "абрикосы", "яблоко"]:
+        assert word in russian
+    for word in ["слава", "кот", "word", "книгаа", "", "а"]:
+        assert word not in russian
+
+
+def test_every_word_is_found(tmp_path: Path) -> None:
+    """Lookups agree with a set of the source words across all first letters."""
+    words = [a + b + c + d for a in "abxyz" for b in "aeiou" for c in "mnz" for d in "st"]
+    path = tmp_path / "english.dict"
+    build_dictionary(words[::2], ENGLISH_ALPHABET, path)
+    dictionary = WordDictionary(path, ENGLISH_ALPHABET)
+    for index, word in enumerate(words):
+        assert (word in dictionary) == (index % 2 == 0)
+    dictionary.close()
+
+
+def test_wrong_alphabet_is_rejected(tmp_path: Path) -> None:
+    """A dictionary cannot be opened with another language's alphabet."""
+    path = tmp_path / "english.dict"
+    build_dictionary(["word"], ENGLISH_ALPHABET, path)
+    with pytest.raises(ValueError):
+        WordDictionary(path, RUSSIAN_ALPHABET)
+
+
+def test_check_is_opt_in(monkeypatch: pytest.MonkeyPatch, russian: WordDictionary) -> None:
+    """Words are only rejected when the check is enabled and a dictionary exists."""
+    monkeypatch.setattr(dictionary_module, "_dictionaries", {"russian": russian, "english": None})
+    assert is_known_word("слава", "russian")
+
+    monkeypatch.setattr(dictionary_module, "DICTIONARY_CHECK", True)
+    assert not is_known_word("слава", "russian")
+    assert is_known_word("ёлка", "russian")
+    assert is_known_word("anything", "english")
+
+
+def test_detect_language() -> None:
+    """Words are Russian or English only when all their letters are."""
+    assert detect_language("слово") == "russian"
+    assert detect_language("ёлка") == "russian"
+    assert detect_language("word") == "english"
+    for word in ["слovo", "Слово", "сло-во", "word1"]:
+        assert detect_language(word) is None
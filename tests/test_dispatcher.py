@@ -0,0 +1,106 @@
+"""Tests for the rate-limited outbound dispatcher."""
+import asyncio
+import time
+
+import pytest
+import telegram
+
+from src.bot.dispatcher import MessageDispatcher, Priority
+
+
+async def test_per_chat_rate_limit() -> None:
+    """Calls to one chat are paced by its bucket while other chats are not."""
+    dispatcher = MessageDispatcher(chat_rate=20, chat_burst=2, global_rate=1e6, global_burst=1e6)
+    finished = {}
+
+    async def send(chat_id, index):
+        await dispatcher.call(chat_id, lambda: asyncio.sleep(0))
+        finished[(chat_id, index)] = time.monotonic()
+
+    start = time.monotonic()
+    await asyncio.gather(*(send(1, i) for i in range(6)), send(2, 0))
+
+    # Two calls fit the burst, the remaining four wait 1/20 s each
+    assert finished[(1, 5)] - start >= 0.18
+    assert finished[(2, 0)] - start < 0.05
+
+
+async def test_priority_lanes() -> None:
+    """Queued board updates overtake queued chatter in the same chat."""
+    dispatcher = MessageDispatcher(chat_rate=1e6, chat_burst=1e6, global_rate=1e6, global_burst=1e6)
+    order = []
+    gate = asyncio.Event()
+
+    async def record(label):
+        await gate.wait()
+        order.append(label)
+
+    blocker = asyncio.ensure_future(dispatcher.call(1, lambda: record('first'), Priority.CHATTER))
+    await asyncio.sleep(0)
+    calls = [
+        asyncio.ensure_future(dispatcher.call(1, lambda: record('chatter'), Priority.CHATTER)),
+        asyncio.ensure_future(dispatcher.call(1, lambda: record('board'), Priority.BOARD)),
+    ]
+    await asyncio.sleep(0)
+    assert dispatcher.queue_depth() == {'board': 1, 'notify': 0, 'chatter': 1}
+
+    gate.set()
+    await asyncio.gather(blocker, *calls)
+    assert order == ['first', 'board', 'chatter']
+    assert dispatcher.queue_depth() == {'board': 0, 'notify': 0, 'chatter': 0}
+    assert dispatcher.stats.sent == 3
+    assert dispatcher.latency_percentiles()['p95'] > 0
+
+
+async def test_retry_after_and_timeouts_are_retried() -> None:
+    """RetryAfter and timeouts are retried, bad requests are not."""
+    dispatcher = MessageDispatcher(
+        chat_rate=1e6, chat_burst=1e6, global_rate=1e6, global_burst=1e6,
+        max_retries=3, retry_base_delay=0.001
+    )
+    errors = [telegram.error.RetryAfter(0), telegram.error.TimedOut()]
+
+    async def flaky():
+        if errors:
+            raise errors.pop(0)
+        return 'sent'
+
+    assert await dispatcher.call(1, flaky) == 'sent'
+    assert dispatcher.stats.retries == 2
+
+    async def bad_request():
+        raise telegram.error.BadRequest('Message to delete not found')
+
+    with pytest.raises(telegram.error.BadRequest):
+        await dispatcher.call(1, bad_request)
+    assert dispatcher.stats.retries == 2
+    assert dispatcher.stats.failures == 1
+
+
+async def test_gives_up_after_max_retries() -> None:
+    """A call that keeps timing out fails with the last error."""
+    dispatcher = MessageDispatcher(
+        chat_rate=1e6, chat_burst=1e6, global_rate=1e6, global_burst=1e6,
+        max_retries=2, retry_base_delay=0.001
+    )
+    attempts = []
+
+    async def timeout():
+        attempts.append(1)
+        raise telegram.error.TimedOut()
+
+    with pytest.raises(telegram.error.TimedOut):
+        await dispatcher.call(1, timeout)
+    assert len(attempts) == 3
+
+
+def test_global_limit_is_shared_between_processes() -> None:
+    """Each of several processes sending as one bot keeps its share of the global limit."""
+    dispatcher = MessageDispatcher(global_rate=30, global_burst=30)
+    dispatcher.share_global_limit(4)
+    assert dispatcher.global_bucket.rate == 7.5
+    assert dispatcher.global_bucket.capacity == 7.5
+
+    dispatcher = MessageDispatcher(global_rate=30, global_burst=2)
+    dispatcher.share_global_limit(4)
+    assert dispatcher.global_bucket.capacity == 1
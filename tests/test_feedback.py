@@ -0,0 +1,198 @@
+"""Tests for the guess scoring engine."""
+import random
+from typing import Set, Tuple
+
+import pytest
+
+from src.config.settings import ENGLISH_ALPHABET, MAX_ATTEMPTS, MAX_PATTERN_LENGTH, RUSSIAN_ALPHABET
+from src.core import game as game_module
+from src.core.game import (
+    Game,
+    decode_pattern,
+    encode_pattern,
+    get_feedback,
+    get_feedback_many,
+    pattern_to_feedback,
+)
+
+
+def legacy_get_feedback(secret_word: str, guess: str) -> Tuple[str, str, Set[str], Set[str]]:
+    """The original string-rebuilding implementation, kept as a reference."""
+    secret_word = secret_word.replace('ё', 'е').replace('Ё', 'Е')
+    guess = guess.replace('ё', 'е').replace('Ё', 'Е')
+
+    feedback = ""
+    result = ""
+    correct_letters = set()
+    used_letters = set()
+    secret_chars = list(secret_word)
+    marked_positions = set()
+
+    for i, (s_char, g_char) in enumerate(zip(secret_word, guess)):
+        if g_char == s_char:
+            feedback += "🟩"
+            result += g_char.upper()
+            correct_letters.add(g_char.upper())
+            marked_positions.add(i)
+            secret_chars[i] = None
+        else:
+            feedback += " "
+            result += " "
+
+    for i, g_char in enumerate(guess):
+        if i in marked_positions:
+            continue
+        g_char_upper = g_char.upper()
+        result = result[:i] + g_char_upper + result[i+1:]
+        if g_char in secret_chars:
+            feedback = feedback[:i] + "🟨" + feedback[i+1:]
+            correct_letters.add(g_char_upper)
+            secret_chars.remove(g_char)
+        else:
+            feedback = feedback[:i] + "⬜" + feedback[i+1:]
+            used_letters.add(g_char_upper)
+
+    return result, feedback, correct_letters, used_letters
+
+
+def random_words(alphabet: str, length: int, count: int, seed: int) -> list:
+    """Generate random words over a small alphabet to force repeated letters."""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("alphabet", ["аеёлос", "abeor"])
+@pytest.mark.parametrize("length", [4, 5, 8])
+def test_matches_legacy_implementation(alphabet: str, length: int) -> None:
+    """The rewritten engine is identical to the original one."""
+    words = random_words(alphabet, length, 300, seed=length)
+    for secret_word, guess in zip(words, reversed(words)):
+        assert get_feedback(secret_word, guess) == legacy_get_feedback(secret_word, guess)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_feedback_many_matches_single_scoring(monkeypatch: pytest.MonkeyPatch, use_numpy: bool) -> None:
+    """Batch pattern codes decode to the same squares as get_feedback."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(game_module, "np", None)
+
+    secret_word = "ёлкао"
+    guesses = random_words("аеёклмо", 5, 500, seed=1)
+    codes = get_feedback_many(secret_word, guesses)
+
+    assert len(codes) == len(guesses)
+    for guess, code in zip(guesses, codes):
+        assert pattern_to_feedback(int(code), 5) == get_feedback(secret_word, guess)[1]
+
+
+def test_feedback_many_rejects_wrong_length() -> None:
+    """Guesses must have the length of the secret word."""
+    with pytest.raises(ValueError):
+        get_feedback_many("слово", ["слова", "сло"])
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_feedback_many_rejects_words_too_long_for_patterns(monkeypatch: pytest.MonkeyPatch, use_numpy: bool) -> None:
+    """Words whose pattern codes would overflow 32 bits are refused."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(game_module, "np", None)
+
+    word = "a" * (MAX_PATTERN_LENGTH + 1)
+    with pytest.raises(ValueError):
+        get_feedback_many(word, [word])
+    assert len(get_feedback_many(word[:-1], [word[:-1]])) == 1
+
+
+def test_pattern_code_round_trip() -> None:
+    """Pattern codes pack one base-3 digit per letter."""
+    marks = [2, 1, 0, 0, 2, 1, 1, 0]
+    assert decode_pattern(encode_pattern(marks), len(marks)) == marks
+    assert encode_pattern([2, 2, 2, 2, 2]) == 3 ** 5 - 1
+
+
+def test_game_attempts_match_legacy_bookkeeping() -> None:
+    """Game.add_attempt keeps the same attempts and letter sets as the old handler code."""
+    game = Game("word_setter", "guesser", 1001, 1002, secret_word="ёлкао", language="russian")
+    attempts = []
+    correct_letters: Set[str] = set()
+    used_letters: Set[str] = set()
+
+    for guess in random_words("аеёклмо", 5, 50, seed=2):
+        result, feedback, correct, used = legacy_get_feedback(game.secret_word, guess)
+        attempts.append((result, feedback))
+        correct_letters.update(correct - used_letters)
+        used_letters.update(used - correct_letters)
+
+        assert game.add_attempt(guess) == (result, feedback)
+
+    assert game.attempts == attempts
+    assert game.attempt_count == len(attempts)
+    assert game.correct_letters == correct_letters
+    assert game.used_letters == used_letters
+
+
+@pytest.mark.parametrize("language, alphabet, letters", [
+    ("russian", RUSSIAN_ALPHABET, "аеёклмоя"),
+    ("english", ENGLISH_ALPHABET, "abeorxz"),
+])
+def test_render_alphabet_matches_sorted_sets(language: str, alphabet: str, letters: str) -> None:
+    """The rendered alphabet lines equal the old sorted set arithmetic."""
+    secret_word = random_words(letters, 6, 1, seed=3)[0]
+    game = Game("word_setter", "guesser", 1001, 1002, secret_word=secret_word, language=language)
+    for guess in random_words(letters, 6, 4, seed=4):
+        game.add_attempt(guess)
+        remaining = set(alphabet) - game.correct_letters - game.used_letters
+        assert game.render_alphabet() == (
+            " ".join(sorted(remaining)),
+            " ".join(sorted(game.correct_letters)),
+            " ".join(sorted(game.used_letters)),
+        )
+
+
+def full_board(game: Game) -> str:
+    """Render the board from scratch the way the guess handler used to."""
+    attempts_text = "\n".join(f"`{result}` | `{feedback}`" for result, feedback in game.attempts)
+    remaining, correct, used = game.render_alphabet()
+    return f"{attempts_text}\n\n{remaining}\n\n🟩🟨: {correct}\n\n⬜: {used}"
+
+
+def test_incremental_board_matches_full_render() -> None:
+    """The cached board equals a full render after every guess and /addtry."""
+    game = Game("word_setter", "guesser", 1001, 1002, secret_word="слово", language="russian")
+    for number, guess in enumerate(random_words("вклосаи", 5, 20, seed=5), start=1):
+        if number % 6 == 0:
+            game.add_try()
+        game.add_attempt(guess)
+        assert game.render_board() == full_board(game)
+    assert game.max_attempts == MAX_ATTEMPTS + 3
+
+    restored = Game.from_record(game.to_record())
+    assert restored.render_board() == game.render_board()
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_long_words_keep_their_patterns(monkeypatch: pytest.MonkeyPatch, use_numpy: bool) -> None:
+    """Pattern codes of words longer than ten letters do not overflow."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(game_module, "np", None)
+
+    secret_word = "abcdefghijklmnopqrst"
+    guesses = ["tsrqponmlkjihgfedcba", "abcdefghijklmnopqrst", "xxxxxxxxxxxxxxxxxxxx"]
+    codes = get_feedback_many(secret_word, guesses)
+    for guess, code in zip(guesses, codes):
+        assert pattern_to_feedback(int(code), 20) == get_feedback(secret_word, guess)[1]
+    assert int(codes[1]) == 3 ** 20 - 1
+
+    game = Game("word_setter", "guesser", 1001, 1002, secret_word=secret_word, language="english")
+    for guess in guesses:
+        game.add_attempt(guess)
+    assert [feedback for _, feedback in game.attempts] == [
+        get_feedback(secret_word, guess)[1] for guess in guesses
+    ]
+    assert Game.from_record(game.to_record()).attempts == game.attempts
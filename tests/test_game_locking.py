@@ -0,0 +1,148 @@
+"""Stress test for per-game locking under concurrent updates."""
+import asyncio
+import random
+from collections import defaultdict
+from itertools import count
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+from telegram import Chat, Message, Update, User
+from telegram.ext import ExtBot
+
+from src.bot.handlers.addtry import addtry_command
+from src.bot.handlers.game import cancel_command
+from src.bot.handlers.guess import handle_guess
+from src.config.settings import MAX_ATTEMPTS
+from src.core.game import Game, games
+from src.core.user import user_data
+
+
+class EventRecorder:
+    """Journal stand-in that keeps the recorded game events in memory."""
+
+    def __init__(self) -> None:
+        self.events: List[dict] = []
+
+    def append(self, event: dict) -> None:
+        self.events.append(event)
+
+
+@pytest.fixture(autouse=True)
+def cleanup_games() -> None:
+    """Start and end with no games, user data or journal."""
+    games.clear()
+    user_data.clear()
+    yield
+    games.journal = None
+    games.clear()
+    user_data.clear()
+
+
+@pytest.fixture
+def slow_bot(mocker) -> ExtBot:
+    """A mock bot whose calls take a random short time and track overlap."""
+    bot = mocker.Mock(spec=ExtBot)
+    message_ids = count(100)
+    in_flight = {"now": 0, "max": 0}
+    bot.in_flight = in_flight
+
+    async def call(*args, chat_id=None, **kwargs):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(random.random() * 0.004)
+        in_flight["now"] -= 1
+        return Message(message_id=next(message_ids), date=None, chat=Chat(chat_id or 0, "private"))
+
+    bot.send_message = mocker.AsyncMock(side_effect=call)
+    bot.edit_message_text = mocker.AsyncMock(side_effect=call)
+    bot.delete_message = mocker.AsyncMock(side_effect=call)
+    bot.set_my_commands = mocker.AsyncMock(side_effect=call)
+    return bot
+
+
+def make_update(bot: ExtBot, user_id: int, username: str, text: str) -> Update:
+    """Create an update with a text message from a user in their private chat."""
+    message = Message(
+        message_id=1,
+        date=None,
+        chat=Chat(user_id, "private"),
+        from_user=User(user_id, username, False, username=username),
+        text=text
+    )
+    message.set_bot(bot)
+    return Update(1, message=message)
+
+
+async def test_interleaved_updates_keep_games_consistent(slow_bot: ExtBot) -> None:
+    """Concurrent guesses, /addtry and /cancel never corrupt a game."""
+    rng = random.Random(7)
+    recorder = EventRecorder()
+    games.journal = recorder
+    contexts: Dict[str, SimpleNamespace] = {}
+
+    def context_for(username: str) -> SimpleNamespace:
+        return contexts.setdefault(username, SimpleNamespace(bot=slow_bot, user_data={}, args=[]))
+
+    jobs = []
+    for number in range(8):
+        setter, guesser = f"setter{number}", f"guesser{number}"
+        setter_id, guesser_id = 1000 + number, 2000 + number
+        game = Game(setter, guesser, setter_id, guesser_id, secret_word="слово", language="russian")
+        game.state = "waiting_for_guess"
+        games[(setter, guesser)] = game
+
+        updates = [(handle_guess, guesser_id, guesser, rng.choice(["книга", "сокол", "волос"])) for _ in range(12)]
+        updates += [(addtry_command, setter_id, setter, "/addtry") for _ in range(3)]
+        if number % 2:
+            updates.append((handle_guess, guesser_id, guesser, "слово"))
+        if number % 3 == 0:
+            updates.append((cancel_command, rng.choice([setter_id, guesser_id]), rng.choice([setter, guesser]), "/cancel"))
+        rng.shuffle(updates)
+        for handler, user_id, username, text in updates:
+            jobs.append((handler, make_update(slow_bot, user_id, username, text), context_for(username)))
+
+    rng.shuffle(jobs)
+    await asyncio.gather(*(handler(update, context) for handler, update, context in jobs))
+
+    events_by_game = defaultdict(list)
+    for event in recorder.events:
+        events_by_game[tuple(event["game"])].append(event)
+
+    assert len(events_by_game) == 8
+    for key, records in events_by_game.items():
+        events = [event["type"] for event in records]
+        endings = [index for index, event in enumerate(events) if event in ("finish", "cancel")]
+        # A game ends at most once and nothing happens to it afterwards
+        assert len(endings) <= 1, (key, events)
+        if endings:
+            assert endings[0] == len(events) - 1, (key, events)
+            assert key not in games
+        # Guesses never exceed the attempts allowed at that moment
+        allowed, guesses, last_guess = MAX_ATTEMPTS, 0, None
+        for event in records:
+            if event["type"] == "addtry":
+                allowed += 1
+            elif event["type"] == "guess":
+                guesses += 1
+                last_guess = event["guess"]
+                assert guesses <= allowed, (key, events)
+        if key in games:
+            game = games[key]
+            assert game.attempt_count == guesses < game.max_attempts == allowed
+        elif events[-1] == "finish":
+            # A game finishes on the right word or on the last allowed attempt
+            assert last_guess == "слово" or guesses == allowed, (key, events)
+
+    # Each guesser got one board message, edited in place by later guesses
+    boards = defaultdict(int)
+    for call in slow_bot.send_message.await_args_list:
+        if call.kwargs["text"].startswith("`"):
+            boards[call.kwargs["chat_id"]] += 1
+    assert set(boards.values()) == {1}
+    for key, game in games.items():
+        assert contexts[key[1]].user_data["last_attempt_text"] == game.render_board()
+
+    # Different games were handled in parallel
+    assert slow_bot.in_flight["max"] > 1
+    assert games._locks == {}
@@ -0,0 +1,74 @@
+"""Tests for the indexed game registry."""
+import pytest
+
+from src.core.game import Game, GameRegistry, get_user_role, games
+
+
+@pytest.fixture(autouse=True)
+def cleanup_games() -> None:
+    """Clean up the global registry before and after each test."""
+    games.clear()
+    yield
+    games.clear()
+
+
+def make_game(word_setter: str, guesser: str, state: str = "waiting_for_word") -> Game:
+    """Create a game between two players in the given state."""
+    game = Game(
+        word_setter_username=word_setter,
+        guesser_username=guesser,
+        word_setter_chat_id=1001,
+        guesser_chat_id=1002
+    )
+    game.state = state
+    return game
+
+
+def test_lookups_by_role_and_state() -> None:
+    """Games are found by setter, guesser and participant, filtered by state."""
+    registry = GameRegistry()
+    waiting = make_game("alice", "bob")
+    active = make_game("carol", "bob", state="waiting_for_guess")
+    registry[("alice", "bob")] = waiting
+    registry[("carol", "bob")] = active
+
+    assert registry.find_by_guesser("bob") is waiting
+    assert registry.find_by_guesser("bob", state="waiting_for_guess") is active
+    assert registry.find_by_word_setter("alice") is waiting
+    assert registry.find_by_word_setter("alice", state="waiting_for_guess") is None
+    assert registry.find_by_participant("carol") is active
+    assert registry.find_by_participant("dave") is None
+    assert registry.count_by_state("waiting_for_word") == 1
+    assert registry.count_by_state("waiting_for_guess") == 1
+
+
+def test_state_change_and_delete_update_indexes() -> None:
+    """Changing a game's state or deleting it keeps every index consistent."""
+    registry = GameRegistry()
+    game = make_game("alice", "bob")
+    registry[("alice", "bob")] = game
+
+    game.state = "waiting_for_guess"
+    assert registry.count_by_state("waiting_for_word") == 0
+    assert registry.games_by_state("waiting_for_guess") == [game]
+
+    del registry[("alice", "bob")]
+    assert len(registry) == 0
+    assert registry.find_by_participant("alice") is None
+    assert registry.find_by_participant("bob") is None
+    assert registry.count_by_state("waiting_for_guess") == 0
+
+    # A detached game no longer touches the registry
+    game.state = "waiting_for_word"
+    assert registry.count_by_state("waiting_for_word") == 0
+
+
+def test_get_user_role_uses_active_games() -> None:
+    """Roles are reported only for games that are waiting for guesses."""
+    games[("alice", "bob")] = make_game("alice", "bob")
+    assert get_user_role("alice") is None
+
+    games[("alice", "bob")].state = "waiting_for_guess"
+    assert get_user_role("alice") == "word_setter"
+    assert get_user_role("bob") == "guesser"
+    assert get_user_role("carol") is None
@@ -0,0 +1,94 @@
+"""Tests for the game log statistics CLI."""
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from scripts import game_stats
+from scripts.game_stats import log_segments, parse_line, update_stats
+
+TEXT_LINES = [
+    "2025-01-01 12:00:00,001 - INFO - Game started - Word setter: alice, Guesser: bob, "
+    "Secret word: слово, Language: russian\n",
+    "2025-01-01 12:00:01,001 - INFO - Guess attempt - Player: bob, Secret word: слово, Guess: книга, Attempt #1\n",
+    "2025-01-01 12:00:02,001 - INFO - Game won - Guesser: bob won against alice, "
+    "Secret word: слово, Attempts used: 2/6\n",
+    "2025-01-01 12:00:03,001 - INFO - Game lost - Guesser: alice lost against bob, "
+    "Secret word: house, All 6 attempts used\n",
+]
+
+
+def json_line(event: str, **fields) -> str:
+    """Build a JSON-lines game event."""
+    return json.dumps({"time": "2026-10-17T12:00:00.000+03:00", "event": event, **fields}, ensure_ascii=False) + "\n"
+
+
+def test_parse_text_and_json_lines() -> None:
+    """Both the old text lines and the JSON events are understood."""
+    started, guess, won, lost = (parse_line(line) for line in TEXT_LINES)
+    assert started["event"] == "game_started" and started["language"] == "russian"
+    assert guess["attempt"] == 1 and guess["guesser"] == "bob"
+    assert won == {
+        "event": "game_won", "guesser": "bob", "word_setter": "alice",
+        "secret_word": "слово", "attempts": 2, "max_attempts": 6,
+    }
+    assert lost["attempts"] == 6 and lost["word_setter"] == "bob"
+    assert parse_line(json_line("guess", guesser="bob", attempt=3))["attempt"] == 3
+    assert parse_line("2025-01-01 12:00:00,001 - INFO - something else\n") is None
+
+
+def test_incremental_runs_follow_rotation(tmp_path: Path) -> None:
+    """A rotated and compressed log is resumed where the last run stopped."""
+    log_file = tmp_path / "game_logs.log"
+    log_file.write_text("".join(TEXT_LINES[:2]) + TEXT_LINES[2][:40], encoding="utf-8")
+    stats, checkpoint = update_stats(log_file)
+    assert stats.totals["game_started"] == 1 and stats.totals["game_won"] == 0
+
+    # The partial line is completed, then the log is rotated and compressed
+    content = "".join(TEXT_LINES[:3]).encode("utf-8")
+    with gzip.open(tmp_path / "game_logs.log.20261017-120000-000001.gz", "wb") as f:
+        f.write(content)
+    log_file.write_text(
+        TEXT_LINES[3] + json_line(
+            "game_won", guesser="carol", word_setter="bob", secret_word="кошка",
+            language="russian", word_length=5, attempts=4, max_attempts=6
+        ),
+        encoding="utf-8"
+    )
+    assert [path.name for path in log_segments(log_file)][-1] == "game_logs.log"
+
+    stats, checkpoint = update_stats(log_file, json.loads(json.dumps(checkpoint)))
+    full, _ = update_stats(log_file)
+    assert stats.to_dict()["players"] == full.to_dict()["players"]
+    assert stats.totals["game_won"] == 2 and stats.totals["game_lost"] == 1
+    assert stats.players["bob"]["wins"] == 1 and stats.players["bob"]["words_not_guessed"] == 1
+    assert stats.languages["russian"]["win_attempts"] == 6
+    assert stats.languages["english"]["losses"] == 1
+    assert stats.word_lengths["5"]["games"] == 3
+
+    # Nothing new, nothing read
+    again, _ = update_stats(log_file, checkpoint)
+    assert again.totals["bytes_read"] == stats.totals["bytes_read"]
+
+
+def test_compressed_segments_are_read_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A compressed segment read to the end is skipped by later runs."""
+    log_file = tmp_path / "game_logs.log"
+    segment = tmp_path / "game_logs.log.20261017-120000-000001.gz"
+    with gzip.open(segment, "wb") as f:
+        f.write("".join(TEXT_LINES[:3]).encode("utf-8"))
+    log_file.write_text(TEXT_LINES[3], encoding="utf-8")
+    stats, checkpoint = update_stats(log_file)
+    assert checkpoint["done"] == {segment.name: segment.stat().st_size}
+    assert list(checkpoint["offsets"].values()) == [len(TEXT_LINES[3].encode("utf-8"))]
+
+    opened = []
+    real_open = game_stats._open
+    monkeypatch.setattr(game_stats, "_open", lambda path: opened.append(path.name) or real_open(path))
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(TEXT_LINES[0])
+    again, checkpoint = update_stats(log_file, json.loads(json.dumps(checkpoint)))
+    assert segment.name not in opened
+    assert again.totals["game_started"] == stats.totals["game_started"] + 1
+    assert again.totals["game_won"] == stats.totals["game_won"]
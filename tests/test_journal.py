@@ -0,0 +1,144 @@
+"""Tests for the game event journal."""
+import json
+from pathlib import Path
+
+import pytest
+
+from src.core.game import Game, GameRegistry, create_game, delete_game, games
+from src.core.journal import GameJournal, open_game_journal
+
+
+@pytest.fixture(autouse=True)
+def cleanup_games() -> None:
+    """Detach any journal and clean up the global registry."""
+    games.clear()
+    yield
+    games.journal = None
+    games.clear()
+
+
+def play_events() -> None:
+    """Drive the global registry through every kind of event."""
+    active = create_game("alice", "bob", 1, 2)
+    active.set_word("слово", "russian")
+    active.add_attempt("книга")
+    active.add_try()
+    active.add_attempt("солнц")
+
+    waiting = create_game("carol", "dave", 3, 4)
+    assert waiting.state == "waiting_for_word"
+
+    create_game("erin", "frank", 5, 6).set_word("word", "english")
+    delete_game("erin", "frank", reason="cancel")
+
+    won = create_game("gina", "hank", 7, 8)
+    won.set_word("test", "english")
+    won.add_attempt("test")
+    delete_game("gina", "hank")
+
+
+def recover(directory: Path) -> GameRegistry:
+    """Replay a journal directory into a fresh registry."""
+    registry = GameRegistry()
+    GameJournal(directory).replay(registry)
+    return registry
+
+
+def assert_same_games(restored: GameRegistry, original: GameRegistry) -> None:
+    """Check that two registries hold identical games."""
+    assert sorted(restored) == sorted(original)
+    for key, game in original.items():
+        assert restored[key].to_record() == game.to_record()
+    assert restored.count_by_state("waiting_for_guess") == original.count_by_state("waiting_for_guess")
+
+
+def test_replay_restores_active_games(tmp_path: Path) -> None:
+    """Games journaled before a restart come back in the same state."""
+    journal = open_game_journal(games, tmp_path)
+    play_events()
+    journal.close()
+
+    restored = recover(tmp_path)
+    assert_same_games(restored, games)
+    assert restored[("alice", "bob")].max_attempts == 7
+    assert restored[("alice", "bob")].attempts == games[("alice", "bob")].attempts
+
+
+def test_compaction_bounds_replay(tmp_path: Path) -> None:
+    """Snapshots replace the segments they cover."""
+    journal = GameJournal(tmp_path, commit_interval=0, compact_events=3)
+    journal.attach(games)
+    play_events()
+    journal.flush()
+    journal.close()
+
+    assert len(list(tmp_path.glob("events-*.jsonl"))) == 1
+    registry = GameRegistry()
+    replayed = GameJournal(tmp_path).replay(registry)
+    assert replayed < 3
+    assert_same_games(registry, games)
+
+
+def test_torn_record_is_ignored(tmp_path: Path) -> None:
+    """A partially written last record from a crash does not break recovery."""
+    journal = open_game_journal(games, tmp_path)
+    create_game("alice", "bob", 1, 2).set_word("слово", "russian")
+    journal.close()
+
+    segment = sorted(tmp_path.glob("events-*.jsonl"))[-1]
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('{"type":"guess","game":["alice","bo')
+
+    assert_same_games(recover(tmp_path), games)
+
+
+def test_undecodable_record_is_skipped(tmp_path: Path) -> None:
+    """A bad record before the end of a segment does not stop the replay."""
+    journal = open_game_journal(games, tmp_path)
+    game = create_game("alice", "bob", 1, 2)
+    game.set_word("слово", "russian")
+    journal.close()
+
+    segment = sorted(tmp_path.glob("events-*.jsonl"))[-1]
+    with open(segment, "ab") as f:
+        f.write(b'{"type":"guess","game":["alice","bo\n\xff\n')
+        f.write('{"type":"guess","game":["alice","bob"],"guess":"книга"}\n'.encode("utf-8"))
+    game.add_attempt("книга")
+
+    assert_same_games(recover(tmp_path), games)
+
+
+def test_games_waiting_for_word_are_dropped(tmp_path: Path) -> None:
+    """Recovery drops games whose word setter lost the conversation, for good."""
+    journal = open_game_journal(games, tmp_path)
+    play_events()
+    journal.close()
+
+    registry = GameRegistry()
+    journal = open_game_journal(registry, tmp_path)
+    journal.close()
+    assert sorted(registry) == [("alice", "bob")]
+    assert [(game.word_setter_username, game.guesser_username) for game in journal.dropped_games] == [
+        ("carol", "dave")
+    ]
+
+    assert sorted(recover(tmp_path)) == [("alice", "bob")]
+
+
+def test_snapshot_captures_games_at_compaction(tmp_path: Path) -> None:
+    """Changes made after compact() are not in the snapshot, only in the newer segment."""
+    journal = GameJournal(tmp_path, commit_interval=0.05, compact_events=0)
+    journal.attach(games)
+    game = create_game("alice", "bob", 1, 2)
+    game.set_word("слово", "russian")
+    game.add_attempt("книга")
+    record = game.to_record()
+    assert Game.record_from_snapshot(game.snapshot()) == record
+
+    journal.compact()
+    game.add_attempt("сокол")
+    journal.close()
+
+    snapshot = json.loads((tmp_path / "snapshot.json").read_text(encoding="utf-8"))
+    assert snapshot["games"] == [record]
+    assert_same_games(recover(tmp_path), games)
@@ -0,0 +1,105 @@
+"""Tests for the game event log."""
+import calendar
+import gzip
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from src.utils import logger
+from src.utils.logger import GameEventFormatter, log_game_event, setup_logger, stop_game_log
+
+
+def test_events_are_written_as_json_lines(tmp_path: Path) -> None:
+    """Events reach the file as JSON objects, formatted off the logging thread."""
+    log_file = tmp_path / "game.log"
+    threads = set()
+    format_event = GameEventFormatter.format
+
+    def recording_format(self, record: logging.LogRecord) -> str:
+        threads.add(threading.current_thread())
+        return format_event(self, record)
+
+    GameEventFormatter.format = recording_format
+    try:
+        setup_logger(log_file)
+        log_game_event("game_started", word_setter="alice", guesser="bob", language="russian", word_length=5)
+        for attempt in range(1, 4):
+            log_game_event("guess", word_setter="alice", guesser="bob", guess="книга", attempt=attempt)
+        stop_game_log()
+    finally:
+        GameEventFormatter.format = format_event
+
+    events = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [event["event"] for event in events] == ["game_started", "guess", "guess", "guess"]
+    assert events[0]["word_length"] == 5 and events[0]["guesser"] == "bob"
+    assert [event["attempt"] for event in events[1:]] == [1, 2, 3]
+    assert all("time" in event for event in events)
+    assert threading.current_thread() not in threads
+
+
+def test_disabled_level_skips_events(tmp_path: Path, monkeypatch) -> None:
+    """No record is created when game events are turned off."""
+    log_file = tmp_path / "game.log"
+    monkeypatch.setattr(logger, "GAME_LOG_LEVEL", "WARNING")
+    setup_logger(log_file)
+    records = []
+    logger.game_log.addFilter(lambda record: records.append(record))
+    try:
+        log_game_event("guess", guesser="bob", attempt=1)
+    finally:
+        stop_game_log()
+        logger.game_log.filters.clear()
+        logger.game_log.setLevel(logging.INFO)
+    assert records == []
+    assert log_file.read_text(encoding="utf-8") == ""
+
+
+def test_rotated_segments_are_compressed_in_order(tmp_path: Path) -> None:
+    """Rotation by size keeps the newest segments, gzipped and named in write order."""
+    log_file = tmp_path / "game.log"
+    handler = logger.RotatingBatchFileHandler(log_file, max_bytes=200, backups=3, encoding="utf-8")
+    handler.setFormatter(GameEventFormatter())
+    for attempt in range(1, 11):
+        record = logger.game_log.makeRecord(
+            "game", logging.INFO, __file__, 0, "guess", (), None, extra={"fields": {"attempt": attempt}}
+        )
+        handler.emit_batch([record, record])
+    handler.close()
+
+    segments = sorted(path.name for path in tmp_path.iterdir() if path.name != "game.log")
+    assert len(segments) == 3 and all(name.endswith(".gz") for name in segments)
+    attempts = []
+    for name in segments:
+        with gzip.open(tmp_path / name, "rt", encoding="utf-8") as f:
+            attempts += [json.loads(line)["attempt"] for line in f]
+    attempts += [json.loads(line)["attempt"] for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert attempts == sorted(attempts) and attempts[-1] == 10
+
+
+def test_age_counts_from_the_first_event(tmp_path: Path) -> None:
+    """A restart does not reset the age of a log that was written to recently."""
+    log_file = tmp_path / "game.log"
+    started = datetime.now(timezone.utc) - timedelta(hours=2)
+    log_file.write_text(json.dumps({"time": started.isoformat(), "event": "guess"}) + "\n", encoding="utf-8")
+
+    handler = logger.RotatingBatchFileHandler(log_file, interval=3600, encoding="utf-8")
+    handler.setFormatter(GameEventFormatter())
+    assert handler.rollover_at == pytest.approx(started.timestamp() + 3600)
+    record = logger.game_log.makeRecord(
+        "game", logging.INFO, __file__, 0, "guess", (), None, extra={"fields": {"attempt": 1}}
+    )
+    handler.emit_batch([record])
+    handler.close()
+
+    segments = [path.name for path in tmp_path.iterdir() if path.name != "game.log"]
+    assert len(segments) == 1
+    # Segments are named by the UTC time of the rotation
+    stamp = segments[0].split(".")[2]
+    rotated = calendar.timegm(time.strptime(stamp[:15], "%Y%m%d-%H%M%S"))
+    assert abs(rotated - time.time()) < 60
+    assert handler.rollover_at > time.time() + 3500
@@ -0,0 +1,111 @@
+"""Tests for the media file_id cache."""
+import asyncio
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import telegram
+
+from src.bot import media as media_module
+from src.bot.media import MediaCache
+
+
+def make_message(file_ids: list) -> SimpleNamespace:
+    """Create a message whose replies return animations with the given file IDs."""
+    replies = [SimpleNamespace(animation=SimpleNamespace(file_id=file_id)) for file_id in file_ids]
+    return SimpleNamespace(chat_id=1, reply_animation=AsyncMock(side_effect=replies))
+
+
+@pytest.fixture
+def gif_dir(tmp_path: Path) -> Path:
+    """A directory with one GIF."""
+    directory = tmp_path / "win"
+    directory.mkdir()
+    (directory / "1.gif").write_bytes(b"GIF89a first")
+    return directory
+
+
+async def test_uploads_once_and_persists(gif_dir: Path, tmp_path: Path) -> None:
+    """A GIF is uploaded once; later sends, also after a restart, use its file_id."""
+    cache_path = tmp_path / "media_cache.json"
+    cache = MediaCache(cache_path)
+    message = make_message(["id-1", "unused"])
+
+    await cache.send_random_animation(message, gif_dir)
+    await cache.send_random_animation(message, gif_dir)
+
+    first, second = message.reply_animation.await_args_list
+    assert isinstance(first.kwargs["animation"], bytes)
+    assert second.kwargs["animation"] == "id-1"
+
+    message = make_message(["unused"])
+    await MediaCache(cache_path).send_random_animation(message, gif_dir)
+    assert message.reply_animation.await_args.kwargs["animation"] == "id-1"
+
+
+async def test_directory_changes_are_reindexed(
+    gif_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Files are hashed once and the directory is listed again only after it changes."""
+    hashed = []
+    file_digest = media_module.hashlib.file_digest
+    monkeypatch.setattr(
+        media_module.hashlib, "file_digest",
+        lambda f, name: hashed.append(f.name) or file_digest(f, name)
+    )
+    cache = MediaCache(tmp_path / "media_cache.json")
+
+    assert [path.name for path, _ in cache.files(gif_dir)] == ["1.gif"]
+    assert [path.name for path, _ in cache.files(gif_dir)] == ["1.gif"]
+    assert len(hashed) == 1
+
+    (gif_dir / "2.gif").write_bytes(b"GIF89a second")
+    stat = gif_dir.stat()
+    os.utime(gif_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    files = cache.files(gif_dir)
+    assert [path.name for path, _ in files] == ["1.gif", "2.gif"]
+    assert len(hashed) == 2
+    assert files[0][1] != files[1][1]
+
+
+async def test_rejected_file_id_is_uploaded_again(gif_dir: Path, tmp_path: Path) -> None:
+    """A file_id that Telegram rejects is replaced by a fresh upload."""
+    cache = MediaCache(tmp_path / "media_cache.json")
+    (_, digest), = cache.files(gif_dir)
+    await cache.remember(digest, "stale")
+
+    message = make_message([])
+    message.reply_animation.side_effect = [
+        telegram.error.BadRequest("Wrong file identifier"),
+        SimpleNamespace(animation=SimpleNamespace(file_id="fresh")),
+    ]
+    await cache.send_random_animation(message, gif_dir)
+
+    assert message.reply_animation.await_count == 2
+    assert cache.file_ids == {digest: "fresh"}
+
+
+async def test_concurrent_first_sends_upload_once(gif_dir: Path, tmp_path: Path) -> None:
+    """Sends racing before the first upload finishes reuse its file_id."""
+    cache = MediaCache(tmp_path / "media_cache.json")
+    release = asyncio.Event()
+    sent = []
+
+    async def reply_animation(animation, **kwargs) -> SimpleNamespace:
+        sent.append(animation)
+        if isinstance(animation, bytes):
+            await release.wait()
+        return SimpleNamespace(animation=SimpleNamespace(file_id="id-1"))
+
+    message = SimpleNamespace(chat_id=1, reply_animation=reply_animation)
+    sends = [asyncio.create_task(cache.send_random_animation(message, gif_dir)) for _ in range(3)]
+    await asyncio.sleep(0.1)
+    release.set()
+    await asyncio.gather(*sends)
+
+    assert sum(isinstance(animation, bytes) for animation in sent) == 1
+    assert sent.count("id-1") == 2
@@ -0,0 +1,91 @@
+"""Tests for the Prometheus metrics."""
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import CommandHandler, ConversationHandler, MessageHandler, filters
+
+from scripts.shard_benchmark import OfflineRequest
+from src.bot import metrics
+from src.bot.dispatcher import MessageDispatcher, Priority
+from src.bot.metrics import InstrumentedRequest, MetricsServer, instrument_handlers
+from src.core.state import SqliteBackend
+from src.utils.metrics import registry
+
+API_URL = "https://api.telegram.org/bot123:offline"
+
+
+def sample(body: str, name: str) -> float:
+    """Value of the sample with the given name and labels."""
+    for line in body.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not in the metrics")
+
+
+async def test_metrics_endpoint(mocker, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Handler and Bot API calls are recorded, and state gauges are read when scraped."""
+    backend = SqliteBackend(tmp_path / "state.sqlite3")
+    monkeypatch.setattr(metrics, "state", backend)
+    await backend.create_game("alice", "bob", 1, 2)
+    await backend.update_user("alice", 1)
+    await backend.update_user("bob", 2)
+
+    async def receive_word(update, context) -> int:
+        return 1
+
+    conversation = ConversationHandler(
+        entry_points=[CommandHandler("new_game", receive_word)],
+        states={0: [MessageHandler(filters.TEXT, receive_word)]},
+        fallbacks=[],
+    )
+    instrument_handlers([conversation])
+    assert await conversation.states[0][0].callback(None, None) == 1
+    assert conversation.entry_points[0].callback.__name__ == "receive_word"
+
+    async with TestClient(TestServer(MetricsServer().build_app())) as client:
+        before = await (await client.get("/metrics")).text()
+
+        request = InstrumentedRequest(OfflineRequest())
+        await request.do_request(f"{API_URL}/getMe", "POST")
+        failing = mocker.Mock()
+        failing.do_request = mocker.AsyncMock(return_value=(429, b"{}"))
+        await InstrumentedRequest(failing).do_request(f"{API_URL}/sendMessage", "POST")
+        await conversation.entry_points[0].callback(None, None)
+
+        response = await client.get("/metrics")
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = await response.text()
+
+    handler_count = 'wordle_handler_seconds_count{handler="receive_word"}'
+    assert sample(body, handler_count) == sample(before, handler_count) + 1
+    assert sample(body, 'wordle_handler_seconds_bucket{handler="receive_word",le="+Inf"}') == sample(body, handler_count)
+    assert sample(body, 'wordle_telegram_api_seconds_count{method="getMe"}') >= 1
+    assert sample(body, 'wordle_telegram_api_errors_total{method="sendMessage"}') >= 1
+    assert sample(body, 'wordle_active_games{state="waiting_for_word"}') == 1
+    assert sample(body, 'wordle_active_games{state="waiting_for_guess"}') == 0
+    assert sample(body, "wordle_registered_users") == 2
+    await backend.close()
+
+
+async def test_dispatcher_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Queue depth, call counts and latencies of the dispatcher are exported."""
+    dispatcher = MessageDispatcher(chat_rate=1e6, chat_burst=1e6, global_rate=1e6, global_burst=1e6)
+    monkeypatch.setattr(metrics, "dispatcher", dispatcher)
+    gate = asyncio.Event()
+
+    latency_count = 'wordle_dispatcher_seconds_count{priority="board"}'
+    before = await registry.render()
+    blocker = asyncio.ensure_future(dispatcher.call(1, gate.wait, Priority.BOARD))
+    queued = asyncio.ensure_future(dispatcher.call(1, gate.wait, Priority.CHATTER))
+    await asyncio.sleep(0)
+    body = await registry.render()
+    assert sample(body, 'wordle_dispatcher_queue_depth{priority="chatter"}') == 1
+
+    gate.set()
+    await asyncio.gather(blocker, queued)
+    body = await registry.render()
+    assert sample(body, 'wordle_dispatcher_queue_depth{priority="chatter"}') == 0
+    assert sample(body, 'wordle_dispatcher_calls_total{outcome="sent"}') == 2
+    assert sample(body, latency_count) == sample(before, latency_count) + 1
@@ -0,0 +1,79 @@
+"""Tests for on-demand handler profiling."""
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from telegram.ext import Application, CommandHandler, ConversationHandler, ExtBot, MessageHandler, filters
+
+from src.bot import profiling
+from src.bot.handlers import profile as profile_handler
+from src.bot.profiling import current_profile, start_profiling
+from src.config.strings import PROFILE_USAGE_MESSAGE
+
+
+def spin(seconds: float) -> None:
+    """Keep the CPU busy for a while."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def busy_handler(update, context) -> int:
+    spin(0.05)
+    return 1
+
+
+async def idle_handler(update, context) -> None:
+    return None
+
+
+async def test_window_wraps_samples_and_restores_handlers(
+    mocker, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Handlers are profiled only inside the window, and the report lands in the logs directory."""
+    monkeypatch.setattr(profiling, "LOGS_DIR", tmp_path)
+    application = Application.builder().bot(mocker.Mock(spec=ExtBot)).build()
+    conversation = ConversationHandler(
+        entry_points=[CommandHandler("new_game", idle_handler)],
+        states={0: [MessageHandler(filters.TEXT, busy_handler)]},
+        fallbacks=[],
+    )
+    application.add_handler(conversation)
+    nested = conversation.states[0][0]
+
+    profile = start_profiling(application, 60)
+    assert current_profile() is profile
+    assert start_profiling(application, 60) is None
+    assert nested.callback is not busy_handler
+    for _ in range(4):
+        assert await nested.callback(None, None) == 1
+    await conversation.entry_points[0].callback(None, None)
+
+    collapsed_file, summary_file = await profile.stop()
+    assert nested.callback is busy_handler
+    assert conversation.entry_points[0].callback is idle_handler
+    assert current_profile() is None
+
+    assert collapsed_file.parent == tmp_path
+    stacks = collapsed_file.read_text(encoding="utf-8").splitlines()
+    assert stacks and all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert any("busy_handler (test_profiling.py" in line and "spin (" in line for line in stacks)
+    summary = summary_file.read_text(encoding="utf-8")
+    assert "busy_handler" in summary and "idle_handler" in summary
+    assert "Top 30 functions by own samples" in summary
+
+
+@pytest.mark.parametrize("argument", ["nan", "inf", "-inf", "-1", "0", "301", "soon"])
+async def test_bad_window_is_refused(mocker, monkeypatch: pytest.MonkeyPatch, argument: str) -> None:
+    """Only a finite window up to PROFILE_MAX_SECONDS starts profiling."""
+    monkeypatch.setattr(profile_handler, "ADMIN_USERNAMES", frozenset({"admin"}))
+    monkeypatch.setattr(profile_handler, "PROFILE_MAX_SECONDS", 300.0)
+    reply = mocker.patch.object(profile_handler, "reply_text", mocker.AsyncMock())
+    start = mocker.patch.object(profile_handler, "start_profiling")
+    update = SimpleNamespace(effective_user=SimpleNamespace(username="admin"), message=object())
+    context = SimpleNamespace(args=[argument])
+
+    await profile_handler.profile_command(update, context)
+    start.assert_not_called()
+    reply.assert_awaited_once_with(update.message, PROFILE_USAGE_MESSAGE.format(max_seconds=300.0))
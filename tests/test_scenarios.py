@@ -1,16 +1,23 @@
 """Test scenarios for the Telegram Wordle bot game."""
+import asyncio
+import time
 from typing import TYPE_CHECKING, AsyncGenerator, Dict, Tuple
 
 import pytest
 from telegram import Update, User, Message, Chat
-from telegram.ext import ContextTypes, CallbackContext, Application, ExtBot
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes, CallbackContext, Application, ConversationHandler, ExtBot
 
-from src.bot.handlers.game import set_player, receive_word, cancel_command
+from src.bot.handlers.addtry import addtry_command
+from src.bot.handlers.game import set_player, receive_word, cancel_command, WAITING_FOR_WORD
 from src.bot.handlers.guess import handle_guess
 from src.bot.handlers.start import start_command
 from src.core.game import Game, games, create_game, delete_game, get_feedback
+from src.core.state import GameConflictError, state
 from src.core.user import user_data
 from src.config.strings import (
+    GAME_ALREADY_EXISTS_MESSAGE,
+    GAME_CHANGED_MESSAGE,
     INVALID_WORD_MESSAGE,
     NO_ACTIVE_GAME_MESSAGE,
     OUT_OF_ATTEMPTS_MESSAGE,
@@ -34,17 +41,26 @@ def mock_bot(mocker: "MockerFixture") -> ExtBot:
     mock_bot = mocker.Mock(spec=ExtBot)
     mock_bot.send_message = mocker.AsyncMock()
     mock_bot.delete_message = mocker.AsyncMock()
+    mock_bot.edit_message_text = mocker.AsyncMock()
     mock_bot.set_my_commands = mocker.AsyncMock()
     return mock_bot
 
 
+class MockContext(CallbackContext):
+    """Callback context whose storage can be replaced directly by the tests."""
+
+    @property
+    def user_data(self) -> Dict:
+        return self._user_data
+
+
 @pytest.fixture
 def mock_context(mock_bot: ExtBot) -> CallbackContext:
     """Create a mock Context object for testing."""
     mock_application = Application.builder().bot(mock_bot).build()
     
     # Create a context with empty dictionaries for data storage
-    context = CallbackContext(mock_application)
+    context = MockContext(mock_application)
     context._user_data = {}  # Use protected attribute to bypass immutability
     context._chat_data = {}
     context._bot_data = {}
@@ -63,14 +79,15 @@ async def cleanup_games() -> AsyncGenerator[None, None]:
 
 def create_message(chat: Chat, user: User, text: str, bot: ExtBot) -> Message:
     """Create a Message object with the given parameters."""
-    return Message(
+    message = Message(
         message_id=1,
         date=None,
         chat=chat,
         from_user=user,
-        text=text,
-        bot=bot
+        text=text
     )
+    message.set_bot(bot)
+    return message
 
 
 @pytest.mark.asyncio
@@ -203,8 +220,8 @@ async def test_feedback_mechanism() -> None:
     """Test the feedback mechanism for guesses."""
     secret_word = "слово"
     test_cases = [
-        ("книга", "КНИГА", "🟩🟨🟨⬜⬜"),  # First letter matches, 'и' and 'а' are in wrong positions
-        ("солнц", "СОЛНЦ", "🟩⬜⬜⬜⬜"),  # Only first letter matches
+        ("книга", "КНИГА", "⬜⬜⬜⬜⬜"),  # No letters in common
+        ("солнц", "СОЛНЦ", "🟩🟨🟨⬜⬜"),  # First letter matches, 'о' and 'л' are in wrong positions
         ("слово", "СЛОВО", "🟩🟩🟩🟩🟩"),  # Exact match
     ]
     
@@ -306,3 +323,215 @@ async def test_invalid_inputs(
     mock_update = Update(1, message=message)
     await handle_guess(mock_update, mock_context)
     assert len(game.attempts) == 0  # Guess should not be recorded
+
+
+@pytest.mark.asyncio
+async def test_guess_latency_budget(
+    mock_bot: ExtBot,
+    mock_context: CallbackContext
+) -> None:
+    """
+    Test that a winning guess overlaps its Telegram calls.
+    
+    Every call to the bot takes a fixed delay. Sent one after another, the
+    seven calls of a winning first guess would take seven delays;
+    overlapped, the guesser's chat (attempt, board, win message) is the
+    longest chain. The board must reach the guesser right after the
+    attempt, ahead of everything else in that chat.
+    
+    Args:
+        mock_bot: Mock bot instance
+        mock_context: Mock Context object
+    """
+    delay = 0.1
+    sent: Dict[Tuple[int, str], float] = {}
+
+    async def slow_send(chat_id: int, text: str, **kwargs) -> Message:
+        await asyncio.sleep(delay)
+        sent[(chat_id, text)] = time.monotonic()
+        return Message(message_id=len(sent) + 10, date=None, chat=Chat(chat_id, "private"))
+
+    async def slow_call(*args, **kwargs) -> bool:
+        await asyncio.sleep(delay)
+        return True
+
+    mock_bot.send_message.side_effect = slow_send
+    mock_bot.delete_message.side_effect = slow_call
+    mock_bot.set_my_commands.side_effect = slow_call
+
+    game = Game(
+        word_setter_username="word_setter",
+        guesser_username="guesser",
+        word_setter_chat_id=1001,
+        guesser_chat_id=1002
+    )
+    game.secret_word = "слово"
+    game.state = "waiting_for_guess"
+    game.language = "russian"
+    games[("word_setter", "guesser")] = game
+    mock_context._user_data = {"last_attempt_message": 5}
+
+    guesser = User(2, "guesser", False, username="guesser")
+    message = create_message(Chat(1002, "private"), guesser, "слово", mock_bot)
+    start = time.monotonic()
+    await handle_guess(Update(1, message=message), mock_context)
+    elapsed = time.monotonic() - start
+
+    board_sent = next(t for (chat_id, text), t in sent.items() if chat_id == 1002 and text.startswith("`"))
+    assert board_sent - start < 2.5 * delay
+    assert sent[(1002, GUESSER_WIN_MESSAGE)] > board_sent
+    assert sent[(1001, WORD_SETTER_WIN_MESSAGE.format(guesser_username="guesser"))] - start < 2.5 * delay
+    assert mock_bot.delete_message.await_count == 0
+    assert mock_bot.set_my_commands.await_count == 2
+    assert elapsed < 4.5 * delay
+    assert ("word_setter", "guesser") not in games
+
+
+@pytest.mark.asyncio
+async def test_board_is_edited_in_place(
+    mock_bot: ExtBot,
+    mock_context: CallbackContext
+) -> None:
+    """
+    Test that later guesses edit the board sent for the first guess.
+    
+    Args:
+        mock_bot: Mock bot instance
+        mock_context: Mock Context object
+    """
+    mock_bot.send_message.side_effect = lambda chat_id, text, **kwargs: Message(
+        message_id=mock_bot.send_message.await_count + 100, date=None, chat=Chat(chat_id, "private")
+    )
+    game = Game(
+        word_setter_username="word_setter",
+        guesser_username="guesser",
+        word_setter_chat_id=1001,
+        guesser_chat_id=1002
+    )
+    game.secret_word = "слово"
+    game.state = "waiting_for_guess"
+    game.language = "russian"
+    games[("word_setter", "guesser")] = game
+    # A board left over from a previous game is not touched
+    mock_context._user_data = {"last_attempt_message": 5}
+
+    guesser = User(2, "guesser", False, username="guesser")
+    chat = Chat(1002, "private")
+
+    def board_sends() -> list:
+        return [call for call in mock_bot.send_message.await_args_list if call.kwargs["text"].startswith("`")]
+
+    await handle_guess(Update(1, message=create_message(chat, guesser, "книга", mock_bot)), mock_context)
+    assert len(board_sends()) == 1
+    board_message_id = mock_context.user_data["last_attempt_message"]
+    assert board_message_id != 5
+    mock_bot.edit_message_text.assert_not_awaited()
+
+    await handle_guess(Update(1, message=create_message(chat, guesser, "сокол", mock_bot)), mock_context)
+    assert len(board_sends()) == 1
+    edit = mock_bot.edit_message_text.await_args
+    assert edit.kwargs["message_id"] == board_message_id
+    assert "`СОКОЛ`" in edit.kwargs["text"]
+    assert mock_context.user_data["last_attempt_text"] == edit.kwargs["text"]
+    mock_bot.delete_message.assert_not_awaited()
+
+    # A board that can no longer be edited is sent again
+    mock_bot.edit_message_text.side_effect = BadRequest("Message to edit not found")
+    await handle_guess(Update(1, message=create_message(chat, guesser, "книга", mock_bot)), mock_context)
+    assert len(board_sends()) == 2
+    assert mock_context.user_data["last_attempt_message"] != board_message_id
+
+
+@pytest.mark.asyncio
+async def test_failed_board_edit_still_notifies_word_setter(
+    mock_bot: ExtBot,
+    mock_context: CallbackContext,
+    caplog: "LogCaptureFixture"
+) -> None:
+    """
+    Test that an unexpected error in the guesser's chat does not stop the word setter's notification.
+    
+    Args:
+        mock_bot: Mock bot instance
+        mock_context: Mock Context object
+        caplog: Log capture fixture
+    """
+    mock_bot.send_message.side_effect = lambda chat_id, text, **kwargs: Message(
+        message_id=mock_bot.send_message.await_count + 100, date=None, chat=Chat(chat_id, "private")
+    )
+    mock_bot.edit_message_text.side_effect = RuntimeError("connection reset")
+    game = Game(
+        word_setter_username="word_setter",
+        guesser_username="guesser",
+        word_setter_chat_id=1001,
+        guesser_chat_id=1002
+    )
+    game.secret_word = "слово"
+    game.state = "waiting_for_guess"
+    game.language = "russian"
+    games[("word_setter", "guesser")] = game
+    mock_context._user_data = {"last_attempt_message": 5, "last_attempt_text": ""}
+
+    guesser = User(2, "guesser", False, username="guesser")
+    message = create_message(Chat(1002, "private"), guesser, "книга", mock_bot)
+    # The board of a previous guess is edited, not replaced
+    game.add_attempt("сокол")
+    await handle_guess(Update(1, message=message), mock_context)
+
+    setter_texts = [call.kwargs["text"] for call in mock_bot.send_message.await_args_list if call.kwargs["chat_id"] == 1001]
+    assert any("КНИГА" in text for text in setter_texts)
+    assert "Failed to deliver a guess notification" in caplog.text
+    assert len(game.attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_conflicting_writes_are_answered(
+    mock_bot: ExtBot,
+    mock_context: CallbackContext,
+    monkeypatch: "MonkeyPatch"
+) -> None:
+    """
+    Test that every handler answers a write rejected as based on an outdated game.
+    
+    Args:
+        mock_bot: Mock bot instance
+        mock_context: Mock Context object
+        monkeypatch: Monkeypatch fixture
+    """
+    async def conflict(game: Game, *args, **kwargs) -> None:
+        raise GameConflictError((game.word_setter_username, game.guesser_username))
+
+    async def create_conflict(word_setter_username: str, guesser_username: str, *args) -> None:
+        raise GameConflictError((word_setter_username, guesser_username))
+
+    monkeypatch.setattr(state, "save_game", conflict)
+    monkeypatch.setattr(state, "delete_game", conflict)
+    monkeypatch.setattr(state, "create_game", create_conflict)
+
+    def replies() -> list:
+        return [call.kwargs["text"] for call in mock_bot.send_message.await_args_list]
+
+    word_setter = User(1, "word_setter", False, username="word_setter")
+    chat = Chat(1001, "private")
+    user_data["word_setter"] = {"chat_id": 1001}
+    user_data["guesser"] = {"chat_id": 1002}
+
+    update = Update(1, message=create_message(chat, word_setter, "@guesser", mock_bot))
+    assert await set_player(update, mock_context) == ConversationHandler.END
+    assert replies()[-1] == GAME_ALREADY_EXISTS_MESSAGE.format(second_player="@guesser")
+
+    game = create_game("word_setter", "guesser", 1001, 1002)
+    mock_context._user_data = {"word_setter_username": "word_setter", "guesser_username": "guesser"}
+    update = Update(2, message=create_message(chat, word_setter, "слово", mock_bot))
+    assert await receive_word(update, mock_context) == WAITING_FOR_WORD
+    assert replies()[-1] == GAME_CHANGED_MESSAGE
+
+    game.state = "waiting_for_guess"
+    update = Update(3, message=create_message(chat, word_setter, "/addtry", mock_bot))
+    await addtry_command(update, mock_context)
+    assert replies()[-1] == GAME_CHANGED_MESSAGE
+
+    update = Update(4, message=create_message(chat, word_setter, "/cancel", mock_bot))
+    assert await cancel_command(update, mock_context) == ConversationHandler.END
+    assert replies()[-1] == GAME_CHANGED_MESSAGE
+    assert ("word_setter", "guesser") in games
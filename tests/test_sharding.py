@@ -0,0 +1,67 @@
+"""Tests for update routing and cross-shard claims in sharded mode."""
+import asyncio
+import queue
+
+from scripts.webhook_client import synthetic_update
+from src.bot.sharding import (
+    RoutingTable,
+    ShardClient,
+    ShardEvents,
+    claim_players,
+    shard_of,
+    update_sender,
+)
+from src.core.game import Game, GameRegistry
+
+
+def test_routing_is_stable_and_follows_pins() -> None:
+    """Users go to their hash shard unless a game pins them elsewhere."""
+    table = RoutingTable(4)
+    assert update_sender(synthetic_update(1, 7, "alice", "hi")) == "alice"
+    assert update_sender({"update_id": 1}) is None
+    assert table.route("alice") == shard_of("alice", 4) == table.route("alice")
+
+    other = (shard_of("bob", 4) + 1) % 4
+    assert table.claim(["alice", "bob"], other)
+    assert table.route("alice") == table.route("bob") == other
+
+    table.release(["alice", "bob"])
+    assert table.route("bob") == shard_of("bob", 4)
+
+
+def test_claims_conflict_across_shards() -> None:
+    """A player pinned by a game on one shard cannot join a game on another."""
+    table = RoutingTable(2)
+    assert table.claim(["alice", "bob"], 0)
+    assert not table.claim(["carol", "bob"], 1)
+    assert table.route("carol") == shard_of("carol", 2)
+
+    # A second game on the same shard keeps bob pinned until both end
+    assert table.claim(["carol", "bob"], 0)
+    table.release(["alice", "bob"])
+    assert table.route("bob") == 0
+    table.release(["carol", "bob"])
+    assert table.claim(["carol", "bob"], 1)
+
+
+async def test_client_claims_and_releases_through_messages() -> None:
+    """The worker side sends claims, waits for answers and releases on game end."""
+    outbox = queue.Queue()
+    client = ShardClient(1, outbox)
+    assert await claim_players("alice", "bob")
+
+    claim = asyncio.create_task(client.claim(["alice", "bob"]))
+    await asyncio.sleep(0)
+    kind, shard, request_id, usernames = outbox.get_nowait()
+    assert (kind, shard, usernames) == ("claim", 1, ["alice", "bob"])
+    client.resolve(request_id, True)
+    assert await claim
+
+    registry = GameRegistry()
+    registry.journal = ShardEvents(None, client)
+    game = Game("alice", "bob", 1, 2)
+    registry.record("guess", game, guess="книга")
+    registry.record("finish", game)
+    assert outbox.get_nowait() == ("release", ["alice", "bob"])
+    assert outbox.empty()
+
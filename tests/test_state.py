@@ -0,0 +1,212 @@
+"""Tests for the SQLite and Redis state backends."""
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+from telegram import Chat, Message, Update, User
+from telegram.ext import Application, CallbackContext, ExtBot
+
+from scripts.fake_redis_server import FakeRedisServer
+from src.bot import commands
+from src.bot.handlers import guess
+from src.core.resp import RedisClient
+from src.core.state import GameConflictError, RedisBackend, SqliteBackend, StoredBackend
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+async def backend(request: pytest.FixtureRequest, tmp_path: Path) -> AsyncGenerator[StoredBackend, None]:
+    """Create each stored backend on empty storage."""
+    if request.param == "sqlite":
+        backend = SqliteBackend(tmp_path / "state.sqlite3")
+        yield backend
+        await backend.close()
+        return
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(RedisClient(server.url), prefix="test:")
+    yield backend
+    await backend.close()
+    await server.stop()
+
+
+async def test_games_and_users_round_trip(backend: StoredBackend) -> None:
+    """Games are found by player, role and state, and users keep their partner."""
+    game = await backend.create_game("alice", "bob", 1, 2)
+    await backend.create_game("carol", "alice", 3, 1)
+    assert (await backend.find_game("alice")).guesser_username == "bob"
+    assert (await backend.find_game("alice", role="guesser")).word_setter_username == "carol"
+    assert await backend.find_game("alice", state="waiting_for_guess") is None
+
+    game.set_word("слово", "russian")
+    game.add_attempt("книга")
+    await backend.save_game(game)
+    stored = await backend.find_game("bob", role="guesser", state="waiting_for_guess")
+    assert stored.secret_word == "слово" and stored.attempts == game.attempts
+    assert await backend.get_user_role("bob") == "guesser"
+
+    await backend.delete_game(stored)
+    assert await backend.get_game("alice", "bob") is None
+    assert await backend.find_game("bob") is None
+
+    assert await backend.get_user("alice") is None
+    await backend.update_user("alice", 1)
+    await backend.update_user("alice", 1, "bob")
+    assert await backend.get_user("alice") == {"chat_id": 1, "last_partner": "bob"}
+    assert await backend.get_user_chat_id("alice") == 1
+    await backend.set_command_scope(1, "word_setter")
+    assert await backend.get_command_scope(1) == "word_setter"
+
+
+async def test_batch_commits_all_or_nothing(backend: StoredBackend) -> None:
+    """Writes of a batch are applied together when it ends, and not at all on error."""
+    async with backend.batch():
+        await backend.create_game("alice", "bob", 1, 2)
+        await backend.update_user("alice", 1, "bob")
+        assert await backend.get_game("alice", "bob") is None
+    assert await backend.get_game("alice", "bob") is not None
+
+    with pytest.raises(RuntimeError):
+        async with backend.batch():
+            await backend.update_user("bob", 2, "alice")
+            raise RuntimeError("handler failed")
+    assert await backend.get_user("bob") is None
+
+
+async def test_lock_reloads_a_game_written_after_it_was_read(backend: StoredBackend) -> None:
+    """A copy read before another handler saved the game is replaced under the lock."""
+    game = await backend.create_game("alice", "bob", 1, 2)
+    game.set_word("слово", "russian")
+    await backend.save_game(game)
+
+    first = await backend.find_game("bob", role="guesser")
+    second = await backend.find_game("bob", role="guesser")
+    async with backend.lock(first) as locked:
+        assert locked is first
+        locked.add_attempt("книга")
+        await backend.save_game(locked)
+    async with backend.lock(second) as locked:
+        assert locked is not second
+        assert locked.attempts == first.attempts
+
+
+async def test_write_based_on_an_outdated_copy_is_rejected(backend: StoredBackend) -> None:
+    """A copy read before another process saved the game cannot overwrite it, nor can a second create."""
+    game = await backend.create_game("alice", "bob", 1, 2)
+    game.set_word("слово", "russian")
+    await backend.save_game(game)
+
+    first = await backend.get_game("alice", "bob")
+    second = await backend.get_game("alice", "bob")
+    first.add_attempt("книга")
+    await backend.save_game(first)
+
+    second.add_attempt("место")
+    with pytest.raises(GameConflictError):
+        async with backend.batch():
+            await backend.update_user("bob", 2, "alice")
+            await backend.save_game(second)
+    with pytest.raises(GameConflictError):
+        await backend.delete_game(second)
+    with pytest.raises(GameConflictError):
+        await backend.create_game("alice", "bob", 1, 2)
+    assert await backend.get_user("bob") is None
+
+    stored = await backend.get_game("alice", "bob")
+    assert [word for word, _ in stored.attempts] == ["КНИГА"]
+    stored.add_attempt("место")
+    async with backend.batch():
+        await backend.save_game(stored)
+        await backend.save_game(stored)
+    await backend.delete_game(stored)
+    assert await backend.get_game("alice", "bob") is None
+
+    # A game created and changed in one batch
+    async with backend.batch():
+        game = await backend.create_game("alice", "bob", 1, 2)
+        game.set_word("слово", "russian")
+        await backend.save_game(game)
+    assert (await backend.get_game("alice", "bob")).secret_word == "слово"
+
+
+async def test_guess_costs_one_read_and_one_write(mocker, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A guess on Redis reads the game once and writes it back in one transaction."""
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(RedisClient(server.url), prefix="test:")
+    monkeypatch.setattr(guess, "state", backend)
+    monkeypatch.setattr(commands, "state", backend)
+
+    bot = mocker.Mock(spec=ExtBot)
+    bot.send_message = mocker.AsyncMock(
+        side_effect=lambda chat_id, text, **kwargs: Message(1, None, Chat(chat_id, "private"))
+    )
+    bot.set_my_commands = mocker.AsyncMock()
+    context = CallbackContext(Application.builder().bot(bot).build(), chat_id=2, user_id=2)
+    guesser = User(2, "bob", False, username="bob")
+
+    async def send_guess(text: str) -> None:
+        message = Message(1, None, Chat(2, "private"), from_user=guesser, text=text)
+        message.set_bot(bot)
+        await guess.handle_guess(Update(1, message=message), context)
+
+    try:
+        game = await backend.create_game("alice", "bob", 1, 2)
+        game.set_word("слово", "russian")
+        await backend.save_game(game)
+
+        round_trips, commands_served = backend.client.round_trips, server.commands
+        await send_guess("книга")
+        assert backend.client.round_trips - round_trips == 2
+        # HGETALL, then one script that checks the version and writes both players' copies
+        assert server.commands - commands_served == 2
+        assert [word for word, _ in (await backend.get_game("alice", "bob")).attempts] == ["КНИГА"]
+
+        await send_guess("слово")
+        assert await backend.find_game("bob") is None
+        assert (await backend.get_user("bob"))["last_partner"] == "alice"
+    finally:
+        await backend.close()
+        await server.stop()
+
+
+async def test_counts_games_by_state_and_users(backend: StoredBackend) -> None:
+    """Games are counted once each, by state, for the metrics gauges."""
+    game = await backend.create_game("alice", "bob", 1, 2)
+    await backend.create_game("carol", "alice", 3, 1)
+    game.set_word("слово", "russian")
+    await backend.save_game(game)
+    await backend.update_user("alice", 1)
+    await backend.update_user("bob", 2)
+    assert await backend.count_games() == {"waiting_for_guess": 1, "waiting_for_word": 1}
+    assert await backend.count_users() == 2
+
+    await backend.delete_game(game)
+    assert await backend.count_games() == {"waiting_for_word": 1}
+
+
+async def test_redis_counts_are_kept_by_writes() -> None:
+    """Counting reads two keys instead of scanning, and counts missing from older data are rebuilt once."""
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(RedisClient(server.url), prefix="test:")
+    try:
+        async with backend.batch():
+            game = await backend.create_game("alice", "bob", 1, 2)
+            game.set_word("слово", "russian")
+            await backend.save_game(game)
+            await backend.create_game("carol", "alice", 3, 1)
+        await backend.update_user("alice", 1)
+        await backend.update_user("alice", 1, "bob")
+
+        assert await backend.count_games() == {"waiting_for_guess": 1, "waiting_for_word": 1}
+        commands_served = server.commands
+        assert await backend.count_users() == 1
+        assert server.commands - commands_served == 1
+
+        del server.data["test:counts"], server.data["test:users"]
+        rebuilt = RedisBackend(backend.client, prefix="test:")
+        assert await rebuilt.count_games() == {"waiting_for_guess": 1, "waiting_for_word": 1}
+        assert await rebuilt.count_users() == 1
+    finally:
+        await backend.close()
+        await server.stop()
@@ -0,0 +1,164 @@
+"""Tests for the SQLite user store and its write-behind persistence."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.core import user as user_module
+from src.core.state import MemoryBackend
+from src.core.user import (
+    UserStore,
+    flush_user_data,
+    get_user_chat_id,
+    start_user_data_flusher,
+    stop_user_data_flusher,
+    update_user_data,
+)
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> UserStore:
+    """Point the user module at a fresh database in a temporary directory."""
+    store = UserStore(tmp_path / "users.sqlite3")
+    monkeypatch.setattr(user_module, "user_data", store)
+    monkeypatch.setattr(user_module, "USER_DATA_FLUSH_INTERVAL", 0.05)
+    yield store
+    stop_user_data_flusher()
+    store.close()
+
+
+def stored_rows(store: UserStore) -> list:
+    """Read the committed rows with a separate connection."""
+    with sqlite3.connect(store.path) as connection:
+        return connection.execute(
+            "SELECT username, chat_id, last_partner FROM users ORDER BY username"
+        ).fetchall()
+
+
+def test_updates_are_written_behind(store: UserStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Many updates within one flush interval are written in a single batch."""
+    flushes = []
+    flush = store.flush
+    monkeypatch.setattr(store, "flush", lambda: flushes.append(flush()))
+
+    start_user_data_flusher()
+    for chat_id in range(100):
+        update_user_data("alice", chat_id, "bob")
+    update_user_data("bob", 7)
+    assert get_user_chat_id("alice") == 99
+    assert stored_rows(store) == []
+
+    deadline = time.monotonic() + 5
+    while not flushes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    assert flushes == [2]
+    assert stored_rows(store) == [("alice", 99, "bob"), ("bob", 7, None)]
+
+
+def test_stop_flushes_pending_changes(store: UserStore) -> None:
+    """Stopping the flusher writes changes made just before shutdown."""
+    start_user_data_flusher()
+    update_user_data("alice", 1)
+    stop_user_data_flusher()
+
+    assert stored_rows(store) == [("alice", 1, None)]
+
+
+def test_mapping_interface(store: UserStore) -> None:
+    """The store reads like the old user dictionary before and after a flush."""
+    store["alice"] = {"chat_id": 1}
+    update_user_data("alice", 2, "bob")
+    assert store["alice"] == {"chat_id": 2, "last_partner": "bob"}
+    assert "alice" in store and "bob" not in store
+
+    flush_user_data()
+    update_user_data("bob", 3)
+    assert sorted(store) == ["alice", "bob"]
+    assert len(store) == 2
+    assert store.get("carol", {}).get("chat_id") is None
+
+    del store["alice"]
+    assert len(store) == 1
+    store.flush()
+    assert list(store) == ["bob"]
+    assert stored_rows(store) == [("bob", 3, None)]
+
+
+def test_writes_during_flushes_are_kept(store: UserStore) -> None:
+    """Changes made by another thread while flushes run are neither lost nor flushed twice."""
+    def write() -> None:
+        for number in range(2000):
+            store[f"user{number}"] = {"chat_id": number}
+            store.set_command_scope(number, "guesser")
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        store.flush()
+    writer.join()
+    store.flush()
+
+    assert len(store) == 2000
+    assert len(stored_rows(store)) == 2000
+    assert store.get_command_scope(1999) == "guesser"
+
+
+def test_clear_drops_unwritten_changes(store: UserStore) -> None:
+    """Records buffered or already written are gone after a clear."""
+    store["alice"] = {"chat_id": 1}
+    store.flush()
+    store["bob"] = {"chat_id": 2}
+    store.clear()
+
+    assert len(store) == 0
+    store.flush()
+    assert stored_rows(store) == []
+
+
+def test_json_is_imported_once(store: UserStore, tmp_path: Path) -> None:
+    """The legacy JSON file is imported on the first run only."""
+    json_path = tmp_path / "user_data.json"
+    json_path.write_text(json.dumps({
+        "alice": {"chat_id": 1, "last_partner": "bob"},
+        "bob": {"chat_id": 2}
+    }), encoding="utf-8")
+
+    assert store.import_json(json_path) == 2
+    assert store["alice"] == {"chat_id": 1, "last_partner": "bob"}
+
+    update_user_data("alice", 5)
+    store.flush()
+    assert store.import_json(json_path) == 0
+    assert store["alice"]["chat_id"] == 5
+
+
+def test_command_scopes_survive_restart(store: UserStore) -> None:
+    """Applied command menus are written with the user data and read back."""
+    store.set_command_scope(1001, "guesser")
+    assert store.get_command_scope(1001) == "guesser"
+    assert store.flush() == 1
+
+    reopened = UserStore(store.path)
+    assert reopened.get_command_scope(1001) == "guesser"
+    assert reopened.get_command_scope(1002) is None
+    reopened.close()
+
+
+async def test_write_through_changes_are_visible_at_once(store: UserStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    """In sharded mode another process reads user changes as soon as they are made."""
+    monkeypatch.setattr(user_module, "write_through", True)
+    backend = MemoryBackend()
+    await backend.update_user("alice", 1, "bob")
+    await backend.set_command_scope(1, "guesser")
+
+    other = UserStore(store.path)
+    try:
+        assert other["alice"] == {"chat_id": 1, "last_partner": "bob"}
+        assert other.get_command_scope(1) == "guesser"
+    finally:
+        other.close()
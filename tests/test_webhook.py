@@ -0,0 +1,92 @@
+"""Tests for the webhook server."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from telegram import Update
+from telegram.ext import Application, ExtBot, MessageHandler, filters
+
+from scripts.webhook_client import synthetic_update
+from src.bot.webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+
+@pytest.fixture
+def application(mocker) -> Application:
+    """An application around a mock bot."""
+    bot = mocker.Mock(spec=ExtBot)
+    bot.initialize = mocker.AsyncMock()
+    bot.shutdown = mocker.AsyncMock()
+    bot.defaults = None
+    return Application.builder().bot(bot).concurrent_updates(True).build()
+
+
+async def test_rejects_wrong_secret_and_malformed_updates(application: Application) -> None:
+    """Requests without the secret token or with a broken body are not queued."""
+    server = WebhookServer(application, path="/telegram", secret_token="s3cret")
+    async with TestClient(TestServer(server.build_app())) as client:
+        update = synthetic_update(1, 42, "alice", "привет")
+        response = await client.post("/telegram", json=update)
+        assert response.status == 403
+        response = await client.post("/telegram", json=update, headers={SECRET_TOKEN_HEADER: "wrong"})
+        assert response.status == 403
+
+        headers = {SECRET_TOKEN_HEADER: "s3cret"}
+        response = await client.post("/telegram", data=b"not json", headers=headers)
+        assert response.status == 400
+        response = await client.post("/telegram", json={"message": {}}, headers=headers)
+        assert response.status == 400
+
+    assert application.update_queue.empty()
+
+
+async def test_generates_secret_when_none_is_configured(application: Application) -> None:
+    """Without a configured secret token the server still rejects requests that lack one."""
+    server = WebhookServer(application, path="/telegram", secret_token="")
+    assert server.secret_token
+    async with TestClient(TestServer(server.build_app())) as client:
+        update = synthetic_update(1, 42, "alice", "привет")
+        response = await client.post("/telegram", json=update)
+        assert response.status == 403
+        response = await client.post("/telegram", json=update, headers={SECRET_TOKEN_HEADER: server.secret_token})
+        assert response.status == 200
+
+    application.bot.set_webhook = AsyncMock()
+    await server.set_webhook("https://bot.example.com")
+    assert application.bot.set_webhook.await_args.kwargs["secret_token"] == server.secret_token
+
+
+async def test_acknowledges_before_processing(application: Application) -> None:
+    """Updates are acknowledged at once and processed by the running application."""
+    release = asyncio.Event()
+    handled = []
+
+    async def slow_handler(update: Update, context) -> None:
+        await release.wait()
+        handled.append(update.message.text)
+
+    application.add_handler(MessageHandler(filters.TEXT, slow_handler))
+    server = WebhookServer(application, path="/telegram", secret_token="s3cret")
+
+    async with application:
+        await application.start()
+        async with TestClient(TestServer(server.build_app())) as client:
+            responses = await asyncio.gather(*(
+                client.post(
+                    "/telegram",
+                    json=synthetic_update(number, 42, "alice", f"guess{number}"),
+                    headers={SECRET_TOKEN_HEADER: "s3cret"}
+                )
+                for number in range(1, 6)
+            ))
+            assert [response.status for response in responses] == [200] * 5
+            assert handled == []
+
+            release.set()
+            for _ in range(100):
+                if len(handled) == 5:
+                    break
+                await asyncio.sleep(0.01)
+        await application.stop()
+
+    assert sorted(handled) == [f"guess{number}" for number in range(1, 6)]